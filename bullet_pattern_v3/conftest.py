@@ -0,0 +1,28 @@
+# conftest.py
+# pytest 用。このディレクトリ（bullet_pattern_v3/）を import の起点にして、core / tools をそのまま読めるようにする。
+#
+#   python -m pytest -q            （bullet_pattern_v3/ で）
+
+import json
+import numpy as np
+import pytest
+from core.paths import PATTERNS_PATH
+from core.record import REC_KEYS, Recording
+
+@pytest.fixture
+def patterns():
+    """デモのパターン定義（"patterns" の中身、毎回新しい dict）"""
+    with open(PATTERNS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)["patterns"]
+
+@pytest.fixture
+def recording():
+    """
+    乱数の種を固定した入力の記録（方向キーをおよそ 20 フレームごとに持ち替え、途中でパターンを2回選ぶ）。
+    ステージの台本も動かす
+    """
+    rng = np.random.default_rng(1234)
+    frames = 600
+    masks = np.repeat(rng.integers(0, 16, frames // 20 + 1), 20)[:frames].astype(np.uint8)
+    return Recording(REC_KEYS, masks.tobytes(), [(30, "spinner"), (300, "rolling_fire_1943")],
+                     {"W": 200, "H": 150, "panel_w": 70, "bullet_backend": "numpy", "timeline_enabled": True})
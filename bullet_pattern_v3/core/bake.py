@@ -0,0 +1,221 @@
+# bake.py
+# プレイヤーに依存しないパターン（spawn がフレーム番号だけで決まるもの）を事前にシミュレーションし、
+# 「フレーム -> その回に置く弾の (x, y, vx, vy, color)」の表としてバイナリに焼く。
+# 再生（BakedPattern）は表を memmap で読み、そのフレームの行を spawn_many で一括投入するだけ。
+# 座標は発射元からの相対値で持つので、表は発射元の位置によらない。
+#
+# ファイル形式（.bake）:
+#   b"BPBK" + version(u8) + ヘッダ長(u32, big endian) + ヘッダ JSON（8バイト境界まで空白で詰める）
+#   + offsets(int64, frames+1) + x, y, vx, vy(float64, 各 n) + c(uint8, n)
+#   （座標・速度は生のパターンと同じ値になるよう float64 のまま持つ。どちらのバックエンドでも一致する）
+#   フレーム f の弾は [offsets[f], offsets[f+1]) の行
+
+import hashlib
+import json
+import os
+import struct
+from fractions import Fraction
+import numpy as np
+from .paths import data_path
+from .patterns import PatternFactory
+
+MAGIC = b"BPBK"
+VERSION = 1
+BAKE_DIR = data_path("baked")
+
+def cfg_digest(cfg):
+    """パターン定義の sha1（表が今の定義から焼かれたものか確かめる）"""
+    return hashlib.sha1(json.dumps(cfg, sort_keys=True).encode("utf-8")).hexdigest()
+
+def bakeable(cfg):
+    """
+    焼けるパターンか。circular / spinner は常に、rolling_fire は seed を明示したとき
+    （アクション付きの弾を撃つパターンは、親が消える・位置を追うので表にできない）
+    """
+    typ = cfg.get("type")
+    if typ in ("circular", "spinner"):
+        return True
+    if typ == "rolling_fire":
+        return "seed" in cfg
+    return False
+
+def loop_period(cfg):
+    """終わらないパターンが同じ弾を繰り返す周期（フレーム）。終わるパターンは None"""
+    typ = cfg["type"]
+    if typ == "circular":
+        return cfg.get("cooldown", 30) + 1
+    if typ == "spinner":
+        # 1回撃つごとに w*(cd+1) 度回る。k 回で 360 の倍数になれば一周
+        cd = cfg.get("cooldown", 3)
+        turn = Fraction(cfg.get("angular_speed_deg", 3)).limit_denominator(1000) * (cd + 1)
+        return (turn / 360).denominator * (cd + 1)
+    return None
+
+class _NoPlayer(dict):
+    """ctx の代わり。プレイヤー座標を読もうとしたら焼けないパターン"""
+    def __getitem__(self, key):
+        raise ValueError(f"pattern reads ctx[{key!r}]; it depends on the player and cannot be baked")
+
+    def __contains__(self, key):
+        return False
+
+class _SpawnLog:
+    """spawn / spawn_many を記録するだけの弾システム（spawn_later は予定のフレームの行に入れる）"""
+    def __init__(self):
+        self.rows = []
+        self.frame = 0
+        self.later = {}   # frame -> spawn_many の引数の列
+
+    def _check(self, r, life, behavior, action=None):
+        if (behavior is not None or action is not None
+                or np.any(np.asarray(life) != -1) or np.any(np.asarray(r) != 1)):
+            raise ValueError("only plain bullets (r=1, no life, no behavior, no action) can be baked")
+
+    def spawn(self, x, y, vx, vy, r=1, c=7, life=-1, behavior=None, action=None):
+        self._check(r, life, behavior, action)
+        self.rows.append(np.array([[x, y, vx, vy, c]], dtype=np.float64))
+
+    def spawn_many(self, x, y, vx, vy, r=1, c=7, life=-1, behavior=None, action=None):
+        self._check(r, life, behavior, action)
+        cols = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64) for a in (x, y, vx, vy, c)))
+        self.rows.append(np.column_stack([a.ravel() for a in cols]))
+
+    def spawn_later(self, delay, x, y, vx, vy, r=1, c=7, life=-1, behavior=None, action=None):
+        self._check(r, life, behavior, action)
+        self.later.setdefault(self.frame + delay, []).append((x, y, vx, vy, r, c))
+
+    def release(self):
+        """このフレームに来た spawn_later を行に加え、次のフレームへ進む"""
+        for args in self.later.pop(self.frame, ()):
+            self.spawn_many(*args)
+        self.frame += 1
+
+    def clear_all(self):
+        pass
+
+class _Emitter:
+    """発射元を原点に置いた記録用の Emitter"""
+    def __init__(self, pattern):
+        self.x = self.y = 0
+        self.bullets = _SpawnLog()
+        self.active = pattern
+        self.active_name = "bake"
+
+def simulate(pattern, frames):
+    """pattern を frames フレーム回し、(フレームごとの行の配列のリスト, 途中で止まったか) を返す"""
+    em = _Emitter(pattern)
+    log = em.bullets
+    ctx = _NoPlayer()
+    out = []
+    for _ in range(frames):
+        log.rows.clear()
+        if em.active is not None:
+            pattern.update_and_fire(em, ctx)
+        log.release()
+        rows = log.rows
+        out.append(np.concatenate(rows) if rows else np.zeros((0, 5)))
+        # 止まっても予約済みの弾が残っていれば、出し切るまで記録する
+        if em.active is None and not log.later:
+            return out, True
+    return out, False
+
+def bake(name, cfg, max_frames=36000):
+    """パターン定義 cfg を焼いた SpawnTable を返す（焼けなければ ValueError）"""
+    if not bakeable(cfg):
+        raise ValueError(f"{name}: pattern type {cfg.get('type')!r} is not bakeable with this config")
+    make = lambda: PatternFactory({name: cfg}).make(name)
+    period = loop_period(cfg)
+    if period is not None:
+        if period > max_frames:
+            raise ValueError(f"{name}: loop period {period} exceeds {max_frames} frames")
+        # 2周回して、2周目が1周目と同じか確かめてから1周ぶんを使う
+        rows, stopped = simulate(make(), 2 * period)
+        for a, b in zip(rows[:period], rows[period:]):
+            if a.shape != b.shape or not np.allclose(a, b, atol=1e-4):
+                raise ValueError(f"{name}: spawns do not repeat every {period} frames")
+        rows = rows[:period]
+    else:
+        rows, stopped = simulate(make(), max_frames)
+        if not stopped:
+            raise ValueError(f"{name}: pattern did not finish within {max_frames} frames")
+    return SpawnTable.from_rows(rows, loop=period is not None, stop=stopped and period is None,
+                                meta={"name": name, "cfg": cfg_digest(cfg)})
+
+class SpawnTable:
+    """
+    offsets : フレーム f の弾が [offsets[f], offsets[f+1]) の行
+    x, y, vx, vy, c : 全フレームぶんを並べた列（x, y は発射元からの相対）
+    loop    : 最後まで来たら先頭から繰り返す
+    stop    : 最後の行を出したフレームでパターンを止める
+    """
+    def __init__(self, offsets, x, y, vx, vy, c, loop=False, stop=True, meta=None):
+        self.offsets = offsets
+        self.x, self.y, self.vx, self.vy, self.c = x, y, vx, vy, c
+        self.loop = loop
+        self.stop = stop
+        self.meta = dict(meta or {})
+
+    @property
+    def frames(self):
+        return self.offsets.size - 1
+
+    @classmethod
+    def from_rows(cls, rows, loop=False, stop=True, meta=None):
+        counts = np.array([r.shape[0] for r in rows], dtype=np.int32)
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        allr = np.concatenate(rows) if rows else np.zeros((0, 5))
+        col = lambda k: np.ascontiguousarray(allr[:, k])
+        return cls(offsets, col(0), col(1), col(2), col(3), allr[:, 4].astype(np.uint8), loop, stop, meta)
+
+    def save(self, path):
+        header = json.dumps({
+            "frames": self.frames, "n": int(self.x.size),
+            "loop": self.loop, "stop": self.stop, "meta": self.meta,
+        }).encode("utf-8")
+        # 配列が 8 バイト境界から始まるように詰める
+        pad = -(len(MAGIC) + 5 + len(header)) % 8
+        header += b" " * pad
+        with open(path, "wb") as f:
+            f.write(MAGIC + struct.pack(">BI", VERSION, len(header)))
+            f.write(header)
+            for a in (self.offsets, self.x, self.y, self.vx, self.vy, self.c):
+                f.write(np.ascontiguousarray(a).tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """表を memmap で開く（行はアクセスしたときに読まれる）"""
+        with open(path, "rb") as f:
+            head = f.read(9)
+            if head[:4] != MAGIC:
+                raise ValueError(f"{path}: not a spawn table")
+            version, hlen = struct.unpack(">BI", head[4:9])
+            if version != VERSION:
+                raise ValueError(f"{path}: unsupported spawn table version {version}")
+            header = json.loads(f.read(hlen).decode("utf-8"))
+        pos = 9 + hlen
+        frames, n = header["frames"], header["n"]
+        arrays = []
+        for dtype, size in ((np.int64, frames + 1), (np.float64, n), (np.float64, n),
+                            (np.float64, n), (np.float64, n), (np.uint8, n)):
+            arrays.append(np.memmap(path, dtype=dtype, mode="r", offset=pos, shape=(size,)) if size
+                          else np.zeros(0, dtype=dtype))
+            pos += np.dtype(dtype).itemsize * size
+        return cls(*arrays, loop=header["loop"], stop=header["stop"], meta=header["meta"])
+
+def load_baked(patterns, bake_dir=BAKE_DIR):
+    """
+    bake_dir にある表のうち、今のパターン定義から焼かれたものだけを {名前: SpawnTable} で返す
+    （定義が変わった表・今は焼けない種類の表は使わない。ディレクトリがなければ空）
+    """
+    tables = {}
+    if not os.path.isdir(bake_dir):
+        return tables
+    for name, cfg in patterns.items():
+        path = os.path.join(bake_dir, f"{name}.bake")
+        if not bakeable(cfg) or not os.path.exists(path):
+            continue
+        table = SpawnTable.load(path)
+        if table.meta.get("cfg") == cfg_digest(cfg):
+            tables[name] = table
+    return tables
@@ -0,0 +1,164 @@
+# behavior.py
+# 弾の「ふるまい」定義（dict）を spawn 前に一度だけ検証・変換した固定レコード。
+# BulletSystem.update は毎フレーム dict を引かず、このレコードの属性で計算だけを行う。
+# 同じパターンから撃つ弾は1つのレコードを共有する。
+# 動き方（ふるまい）とは別に、契機が来たら子弾を撃つ「アクション」も弾ごとに1つ持てる。
+
+import math
+import numpy as np
+
+# ふるまい種別（NumPy 版では uint8 の配列に入れる）
+NONE            = 0
+GRAV            = 1
+SPEED_SCHEDULE  = 2
+
+# アクションの契機（NumPy 版では uint8 の配列に入れる。0 はなし）
+AFTER = 1   # spawn から frames フレーム後の update の頭
+DEATH = 2   # 寿命が尽きたとき（画面外に出て消えたときは撃たない）
+NEAR  = 3   # プレイヤーが radius 以内に入ったとき（vanish しなければ入っている間毎フレーム）
+TRIGGERS = {"after": AFTER, "death": DEATH, "near": NEAR}
+
+class Gravity:
+    """引力/斥力。sign=+1 で引き寄せ、-1 で押しやる"""
+    __slots__ = ("g", "sign", "max_speed")
+    kind = GRAV
+    def __init__(self, g=0.03, mode="attract", max_speed=3.0):
+        if mode not in ("attract", "repel"):
+            raise ValueError(f"grav: unknown mode {mode!r}")
+        self.g = float(g)
+        self.sign = 1.0 if mode == "attract" else -1.0
+        self.max_speed = float(max_speed)
+
+class SpeedSchedule:
+    """
+    変速スケジュール。steps は at 昇順の (at, speed) タプル。
+    aim_player なら速さが正になるステップでプレイヤー方向へ向け直す。
+    events は弾の spawn 時にタイミングホイールへ積む (at, speeds) の並び
+    """
+    __slots__ = ("steps", "events", "aim_player")
+    kind = SPEED_SCHEDULE
+    def __init__(self, steps=(), aim_player=False):
+        parsed = []
+        for step in steps:
+            at = int(step.get("at", -1))
+            spd = max(0.0, float(step.get("speed", 0.0)))
+            parsed.append((at, spd))
+        parsed.sort(key=lambda s: s[0])
+        self.steps = tuple(parsed)
+        # 同じフレームに複数ステップがあれば定義順に全部適用する
+        by_at = {}
+        for at, spd in self.steps:
+            by_at.setdefault(at, []).append(spd)
+        # 経過フレームは 0 以上なので、負の at は決して来ない
+        self.events = tuple((at, tuple(spds)) for at, spds in by_at.items() if at >= 0)
+        self.aim_player = bool(aim_player)
+
+    def apply(self, spds, x, y, vx, vy, px, py):
+        """そのフレームの変速ステップを適用した新しい速度 (vx, vy) を返す"""
+        for spd in spds:
+            if spd > 0 and self.aim_player:
+                # プレイヤー方向へ向け直す（座標がなければ 0 度）
+                ang = math.atan2(py - y, px - x) if px is not None else 0.0
+            else:
+                # 現在の進行方向を保持
+                ang = math.atan2(vy, vx) if (vx or vy) else 0.0
+            vx = math.cos(ang) * spd
+            vy = math.sin(ang) * spd
+        return vx, vy
+
+class Action:
+    """
+    弾ごとのイベントアクション。契機が来たら弾の位置から count 発の子弾を撃つ。
+    子弾の向きは spread_deg の扇（360 以上なら全周等分）か、offsets_deg で並べた角度（count はその数）で、
+    扇の中心は direction で決まる:
+      "absolute" : angle_deg
+      "relative" : 親の進行方向 + angle_deg
+      "aim"      : 親からプレイヤーへの向き + angle_deg（座標がなければ angle_deg）
+    vanish なら撃った親を消す。child は子弾に付けるアクション（連鎖用）
+    """
+    __slots__ = ("trigger", "frames", "radius2", "count", "speed", "color",
+                 "direction", "angle", "vanish", "child", "ux", "uy")
+    def __init__(self, trigger, frames=0, radius=18, count=1, speed=1.0, color=10,
+                 spread_deg=360, angle_deg=0.0, direction="absolute", vanish=False, child=None,
+                 offsets_deg=None):
+        if trigger not in (AFTER, DEATH, NEAR):
+            raise ValueError(f"action: unknown trigger {trigger!r}")
+        if direction not in ("absolute", "relative", "aim"):
+            raise ValueError(f"action: unknown direction {direction!r}")
+        if offsets_deg is not None:
+            count = len(offsets_deg)
+        self.trigger = trigger
+        self.frames = max(0, int(frames))
+        self.radius2 = float(radius) ** 2
+        self.count = int(count)
+        self.speed = float(speed)
+        self.color = int(color)
+        self.direction = direction
+        self.angle = math.radians(float(angle_deg))
+        self.vanish = bool(vanish)
+        self.child = compile_action(child)
+        if self.count <= 0:
+            raise ValueError("action: count must be positive")
+        # 扇の中心から見た子弾の単位ベクトル
+        n, spread = self.count, float(spread_deg)
+        if offsets_deg is not None:
+            off = np.radians(np.asarray(offsets_deg, dtype=np.float64))
+        elif spread >= 360:
+            off = 2 * math.pi * np.arange(n) / n
+        elif n > 1:
+            off = np.radians(-spread / 2 + np.arange(n) * (spread / (n - 1)))
+        else:
+            off = np.zeros(1)
+        self.ux, self.uy = np.cos(off), np.sin(off)
+
+    def children(self, x, y, vx, vy, px=None, py=None):
+        """親 m 発の位置・速度から、子弾 m*count 発の (x, y, vx, vy) を親の順に並べて返す"""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if self.direction == "relative":
+            base = np.arctan2(vy, vx)
+        elif self.direction == "aim" and px is not None:
+            base = np.arctan2(py - y, px - x)
+        else:
+            base = np.zeros(x.size)
+        base = base + self.angle
+        cb, sb = np.cos(base)[:, None], np.sin(base)[:, None]
+        n = self.count
+        cvx = (cb * self.ux - sb * self.uy) * self.speed
+        cvy = (sb * self.ux + cb * self.uy) * self.speed
+        return np.repeat(x, n), np.repeat(y, n), cvx.ravel(), cvy.ravel()
+
+def compile_behavior(beh):
+    """
+    ふるまい dict をレコードに変換する。None/空ならそのまま None、
+    既にレコードならそのまま返す。未知の type は ValueError。
+    """
+    if not beh:
+        return None
+    if not isinstance(beh, dict):
+        return beh
+    typ = beh.get("type")
+    if typ == "grav":
+        return Gravity(beh.get("g", 0.03), beh.get("mode", "attract"), beh.get("max_speed", 3.0))
+    if typ == "speed_schedule":
+        return SpeedSchedule(beh.get("steps", []), beh.get("aim_player", False))
+    raise ValueError(f"unknown behavior: {typ}")
+
+def compile_action(act):
+    """
+    アクション dict をレコードに変換する（None/空は None、レコードはそのまま）。
+    例: {"on": "after", "frames": 3, "count": 1, "speed": 1.5, "angle_deg": 180, "vanish": true}
+        {"on": "near", "radius": 18, "count": 16, "speed": 1.0, "color": 10, "vanish": true}
+        {"on": "death", "count": 8, "speed": 1.2, "direction": "aim"}
+        {"on": "after", "frames": 12, "offsets_deg": [-30, 30], "direction": "relative"}
+    """
+    if not act:
+        return None
+    if not isinstance(act, dict):
+        return act
+    on = act.get("on")
+    if on not in TRIGGERS:
+        raise ValueError(f"unknown action trigger: {on}")
+    kw = {k: act[k] for k in ("frames", "radius", "count", "speed", "color", "spread_deg",
+                              "angle_deg", "direction", "vanish", "child", "offsets_deg") if k in act}
+    return Action(TRIGGERS[on], **kw)
@@ -2,124 +2,559 @@
 
 import pyxel
 import math
+import numpy as np
+from .behavior import GRAV, SPEED_SCHEDULE, AFTER, DEATH, NEAR, compile_action, compile_behavior
+from .sched import TimingWheel
+from .spatial import UniformGrid
 
 class Bullet:
-    __slots__ = ("x","y","vx","vy","r","c","alive","t","life","behavior")
-    def __init__(self):
+    __slots__ = ("x","y","vx","vy","f0","r","c","alive","born","life","exit","behavior","action","gen","slot")
+    def __init__(self, slot=0):
         self.alive = False
+        # 位置は「update f0 の直前に (x, y)、以後 1 update ごとに (vx, vy) 進む」で持つ。
+        # 今の位置は BulletSystem.pos(b)。ふるまいで速度が変わるたびに基準を付け替える
         self.x = self.y = 0.0
         self.vx = self.vy = 0.0
+        self.f0 = 0
         self.r = 0
         self.c = 7
-        self.t = 0
+        self.born = 0         # 最初に動く update の番号（寿命はここから数える）
         self.life = -1        # -1 は無制限
-        self.behavior = None  # dict | None
+        self.exit = None      # 直進弾が消える update の番号（None は消えない・毎フレーム判定する弾）
+        self.behavior = None  # behavior.py のレコード | None
+        self.action = None    # behavior.Action | None
+        self.gen = 0          # spawn ごとに増える世代（再利用前の予定を見分ける）
+        self.slot = slot      # pool 内の位置
+
+def grown_capacity(cap, factor, ceiling):
+    """満杯時の次の容量（factor 倍、ceiling で頭打ち）。これ以上増やせなければ cap を返す"""
+    return min(ceiling, max(cap + 1, int(cap * factor)))
+
+def canonical_order(s):
+    """snapshot の行 (x, y, vx, vy, c) をスロットの並びによらない順（x, y, vx, vy, c の辞書順）に並べる"""
+    return s[np.lexsort(s.T[::-1])]
+
+def exit_step(p, v, lo, hi):
+    """p + v*n が [lo, hi] の外に出る最小の n（1 以上）。出ないなら None"""
+    if v > 0:
+        if p + v < lo:
+            return 1
+        n = max(1, math.floor((hi - p) / v) + 1)
+    elif v < 0:
+        if p + v > hi:
+            return 1
+        n = max(1, math.floor((lo - p) / v) + 1)
+    else:
+        return 1 if p < lo or p > hi else None
+    if n > 1 << 31:
+        # 止まりかけの弾（丸め残りの小さな速度）は出ないものとする
+        return None
+    # 割り算の丸めで 1 ずれうるので、実際に計算する位置で合わせる
+    out = lambda k: not lo <= p + v * k <= hi
+    while n > 1 and out(n - 1):
+        n -= 1
+    while not out(n):
+        n += 1
+    return n
+
+def exit_steps(p, v, lo, hi):
+    """exit_step を弾の配列でまとめて求める（float64 の配列）。出ない弾は -1"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pos, neg, still = v > 0, v < 0, v == 0
+        q = np.floor((np.where(pos, hi, lo) - p) / v) + 1
+    first = (pos & (p + v < lo)) | (neg & (p + v > hi)) | (still & ((p < lo) | (p > hi)))
+    never = ~first & (still | (q > 1 << 31))
+    solve = ~first & ~never
+    n = np.where(solve, np.maximum(q, 1), 1).astype(np.int64)
+    # 割り算の丸めで 1 ずれうるので、実際に計算する位置で合わせる
+    def out(k):
+        at = p + v * k
+        return (at < lo) | (at > hi)
+    m = solve & (n > 1) & out(n - 1)
+    while m.any():
+        n[m] -= 1
+        m = solve & (n > 1) & out(n - 1)
+    m = solve & ~out(n)
+    while m.any():
+        n[m] += 1
+        m = solve & ~out(n)
+    n[never] = -1
+    return n
+
+def concat_spawns(items):
+    """spawn_many の引数の組 (x, y, vx, vy, r, c, life) の列を、弾ごとの配列の1組にまとめる"""
+    cols = zip(*(np.broadcast_arrays(*map(np.asarray, args)) for args in items))
+    return [np.concatenate([a.ravel() for a in col]) for col in cols]
+
+def thin_keep(seq, n, thin):
+    """通し番号 seq から始まる n 発を thin 発に1発だけ残すとき、残す添字（0..n-1）"""
+    return np.arange((-seq) % thin, n, thin)
+
+class PoolStats:
+    """プールの伸縮と取りこぼしの記録（ステージごとの容量見積もり用）"""
+    __slots__ = ("high_water", "grow_events", "shrink_events", "dropped", "spawned", "thinned", "quiet")
+    def __init__(self):
+        self.high_water = 0     # 同時に生きていた弾数の最大
+        self.grow_events = 0    # 拡張した回数
+        self.shrink_events = 0  # 縮小した回数
+        self.dropped = 0        # 上限に達して捨てた spawn の数
+        self.spawned = 0        # 置けた弾の累計
+        self.thinned = 0        # 間引き（thin）で置かなかった spawn の数
+        self.quiet = 0          # 縮小判定用: 使用率が低いまま続いたフレーム数
+
+    def as_dict(self):
+        return {
+            "high_water": self.high_water,
+            "grow_events": self.grow_events,
+            "shrink_events": self.shrink_events,
+            "dropped": self.dropped,
+            "spawned": self.spawned,
+            "thinned": self.thinned,
+        }
 
 class BulletSystem:
-    def __init__(self, w, h, capacity=512):
+    """
+    capacity    : 初期容量
+    max_capacity: 満杯時に grow_factor 倍ずつ拡張する上限（capacity と同じなら固定長）
+    shrink_after: 使用数が縮小後容量の半分以下のまま、このフレーム数続いたら縮小（0で無効）
+
+    ふるまいのない弾（と変速スケジュールの弾の変速と変速の間）は直進なので、update では動かさない。
+    位置は spawn 時の位置・速度・フレームから必要なとき（描画・当たり判定）に計算し、
+    画面外に出る／寿命が尽きる update を spawn 時に求めて予定表に積んでおく。
+    update が毎フレーム触るのは、重力の弾・近接アクションの弾と、そのフレームに消える／撃つ弾だけ
+    """
+    def __init__(self, w, h, capacity=512, max_capacity=8192, grow_factor=2.0, shrink_after=0):
         self.w, self.h = w, h
         self.capacity = capacity
-        self.pool = [Bullet() for _ in range(capacity)]
+        self.min_capacity = capacity
+        self.max_capacity = max(capacity, max_capacity)
+        self.grow_factor = grow_factor
+        self.shrink_after = shrink_after
+        self.stats = PoolStats()
+        self.pool = [Bullet(i) for i in range(capacity)]
+        # 空きスロット番号のスタック（末尾から取り出す＝若い番号から使う）
+        self.free = list(range(capacity - 1, -1, -1))
+        # update の通し番号と、変速ステップの予定表（frame -> (弾, 世代, 速さ列)）
+        self.frame = 0
+        self.events = TimingWheel()
+        # 直進弾が消える予定表（frame -> (弾, 世代)）と、毎フレーム動かす弾（重力）
+        self.exits = TimingWheel()
+        self.stepped = {}
+        # アクション: AFTER の予定表（frame -> (弾, 世代)）と、毎フレーム距離を見る NEAR の弾
+        self.triggers = TimingWheel()
+        self.near = {}
+        # spawn_later で後から置く弾の予定表（frame -> ((x, y, vx, vy, r, c, life), behavior, action)）
+        self.deferred = TimingWheel()
+        # spawn した弾が最初に動く update の番号（update 中に生まれた子弾は次の update から）
+        self._birth = 0
+        # 当たり判定用のグリッド（弾が動いた・増えた・消えた後の最初の問い合わせで作り直す）
+        self.grid = UniformGrid(w, h)
+        self._grid_dirty = True
+        # 新しい弾を thin 発に1発だけ置く（負荷が高いときの間引き。1で無効）
+        self.thin = 1
+        self._thin_seq = 0
+
+    @property
+    def live_count(self):
+        return self.capacity - len(self.free)
 
     def clear_all(self):
         for b in self.pool:
             b.alive = False
+        self.free = list(range(self.capacity - 1, -1, -1))
+        self.events.clear()
+        self.exits.clear()
+        self.stepped.clear()
+        self.triggers.clear()
+        self.near.clear()
+        self.deferred.clear()
+        self._grid_dirty = True
 
-    def spawn(self, x, y, vx, vy, r=1, c=7, life=-1, behavior=None):
-        for b in self.pool:
-            if not b.alive:
-                b.alive = True
-                b.x, b.y = x, y
-                b.vx, b.vy = vx, vy
-                b.r, b.c = r, c
-                b.t = 0
-                b.life = life
-                b.behavior = behavior
-                return b
-        return None
+    def _grow(self):
+        new_cap = grown_capacity(self.capacity, self.grow_factor, self.max_capacity)
+        if new_cap <= self.capacity:
+            return False
+        self.pool.extend(Bullet(i) for i in range(self.capacity, new_cap))
+        # 増えた分は既存の空きより後に使われるよう、スタックの底へ積む
+        self.free[:0] = range(new_cap - 1, self.capacity - 1, -1)
+        self.capacity = new_cap
+        self.stats.grow_events += 1
+        return True
+
+    def _maybe_shrink(self):
+        target = max(self.min_capacity, int(self.capacity / self.grow_factor))
+        if target >= self.capacity or self.live_count > target // 2:
+            self.stats.quiet = 0
+            return
+        self.stats.quiet += 1
+        if self.stats.quiet < self.shrink_after:
+            return
+        # 生きている弾を前半に詰めてから切り詰める
+        pool = self.pool
+        holes = [i for i in range(target) if not pool[i].alive]
+        for i in range(target, self.capacity):
+            if pool[i].alive:
+                j = holes.pop()
+                pool[i], pool[j] = pool[j], pool[i]
+                pool[i].slot, pool[j].slot = i, j
+        del pool[target:]
+        self.free = [i for i in range(target - 1, -1, -1) if not pool[i].alive]
+        self.capacity = target
+        self.stats.quiet = 0
+        self.stats.shrink_events += 1
+
+    def pos(self, b):
+        """弾 b の今の位置"""
+        n = self.frame - b.f0
+        return b.x + b.vx * n, b.y + b.vy * n
+
+    def _schedule_exit(self, b):
+        """直進弾 b が画面外に出る／寿命が尽きる update を求めて予定表に積む（基準 f0 からの直進）"""
+        w, h = self.w, self.h
+        nx = exit_step(b.x, b.vx, -4, w + 4)
+        ny = exit_step(b.y, b.vy, -4, h + 4)
+        n = nx if ny is None else ny if nx is None else min(nx, ny)
+        at = None if n is None else b.f0 + n - 1
+        if b.life >= 0:
+            # 1回目の update で t = 1 になるので、寿命 0 も 1 と同じく最初の update で消える
+            end = b.born + max(b.life, 1) - 1
+            at = end if at is None else min(at, end)
+        b.exit = at
+        if at is not None:
+            self.exits.schedule(at, (b, b.gen))
+
+    def spawn(self, x, y, vx, vy, r=1, c=7, life=-1, behavior=None, action=None):
+        # behavior / action は compile 済みのレコード推奨（dict もここで変換する）
+        if self.thin > 1:
+            self._thin_seq += 1
+            if (self._thin_seq - 1) % self.thin:
+                self.stats.thinned += 1
+                return None
+        if not self.free and not self._grow():
+            self.stats.dropped += 1
+            return None
+        b = self.pool[self.free.pop()]
+        b.alive = True
+        b.x, b.y = x, y
+        b.vx, b.vy = vx, vy
+        b.f0 = b.born = self._birth
+        b.r, b.c = r, c
+        b.life = life
+        b.gen += 1
+        self._grid_dirty = True
+        beh = b.behavior = compile_behavior(behavior)
+        if beh is not None and beh.kind == GRAV:
+            b.exit = None
+            self.stepped[b] = None
+        else:
+            self._schedule_exit(b)
+            if beh is not None and beh.kind == SPEED_SCHEDULE:
+                # 弾の経過フレーム t == at になる update で取り出す
+                for at, spds in beh.events:
+                    self.events.schedule(self.frame + at, (b, b.gen, spds))
+        act = b.action = compile_action(action)
+        if act is not None:
+            if act.trigger == AFTER:
+                self.triggers.schedule(b.born + act.frames, (b, b.gen))
+            elif act.trigger == NEAR:
+                self.near[b] = None
+        self.stats.spawned += 1
+        live = self.capacity - len(self.free)
+        if live > self.stats.high_water:
+            self.stats.high_water = live
+        return b
+
+    def spawn_many(self, x, y, vx, vy, r=1, c=7, life=-1, behavior=None, action=None):
+        """
+        複数の弾をまとめて置く（NumpyBulletSystem.spawn_many と同じ引数）。
+        スカラーは全弾共通、配列/列は弾ごと。戻り値は置けた Bullet のリスト。
+        空きスロットはスタックからまとめて取り、消える予定は配列で求めてフレームごとに1回で積む
+        （1発ずつ spawn したのと同じ弾・同じ予定になる）
+        """
+        vx = np.asarray(vx, dtype=np.float64).ravel()
+        n = vx.size
+        shared = behavior is None or isinstance(behavior, dict) or not hasattr(behavior, "__len__")
+        keep = None
+        if self.thin > 1:
+            keep = thin_keep(self._thin_seq, n, self.thin)
+            self._thin_seq += n
+            self.stats.thinned += n - keep.size
+        k = n if keep is None else keep.size
+        # 足りない分だけ広げ、それでも入らない分は後ろから捨てる
+        while len(self.free) < k and self._grow():
+            pass
+        take = min(k, len(self.free))
+        self.stats.dropped += k - take
+        if not take:
+            return []
+        pick = np.arange(n) if keep is None else keep
+        pick = pick[:take]
+        col = lambda a, dtype=None: np.broadcast_to(np.asarray(a, dtype=dtype), (n,))[pick]
+        x, y, vy = (col(a, np.float64) for a in (x, y, vy))
+        vx = vx[pick]
+        r, c, life = (col(a).tolist() for a in (r, c, life))
+        if shared:
+            behs = [compile_behavior(behavior)] * take
+        else:
+            behs = [compile_behavior(behavior[i]) for i in pick.tolist()]
+        act = compile_action(action)
+
+        # 消える update（spawn の _schedule_exit と同じ計算。基準 f0 は今の _birth）
+        birth = self._birth
+        nx = exit_steps(x, vx, -4, self.w + 4)
+        ny = exit_steps(y, vy, -4, self.h + 4)
+        steps = np.where(nx < 0, ny, np.where(ny < 0, nx, np.minimum(nx, ny)))
+        at = np.where(steps < 0, -1, birth + steps - 1)
+        lv = np.asarray(life, dtype=np.int64)
+        end = birth + np.maximum(lv, 1) - 1
+        at = np.where(lv >= 0, np.where(at < 0, end, np.minimum(at, end)), at).tolist()
+
+        free = self.free
+        slots = free[-take:]
+        del free[-take:]
+        pool = self.pool
+        out = []
+        exits, events, afters = {}, {}, []
+        frame = self.frame
+        for s, bx, by, bvx, bvy, br, bc, bl, ba, beh in zip(
+                reversed(slots), x.tolist(), y.tolist(), vx.tolist(), vy.tolist(), r, c, life, at, behs):
+            b = pool[s]
+            b.alive = True
+            b.x, b.y, b.vx, b.vy = bx, by, bvx, bvy
+            b.f0 = b.born = birth
+            b.r, b.c, b.life = br, bc, bl
+            b.gen += 1
+            b.behavior = beh
+            b.action = act
+            if beh is not None and beh.kind == GRAV:
+                b.exit = None
+                self.stepped[b] = None
+            else:
+                b.exit = None if ba < 0 else ba
+                if ba >= 0:
+                    exits.setdefault(ba, []).append((b, b.gen))
+                if beh is not None and beh.kind == SPEED_SCHEDULE:
+                    for t, spds in beh.events:
+                        events.setdefault(frame + t, []).append((b, b.gen, spds))
+            if act is not None:
+                if act.trigger == AFTER:
+                    afters.append((b, b.gen))
+                elif act.trigger == NEAR:
+                    self.near[b] = None
+            out.append(b)
+        for f, items in exits.items():
+            self.exits.schedule_many(f, items)
+        for f, items in events.items():
+            self.events.schedule_many(f, items)
+        if afters:
+            self.triggers.schedule_many(birth + act.frames, afters)
+        self._grid_dirty = True
+        self.stats.spawned += take
+        live = self.capacity - len(free)
+        if live > self.stats.high_water:
+            self.stats.high_water = live
+        return out
+
+    def spawn_later(self, delay, x, y, vx, vy, r=1, c=7, life=-1, behavior=None, action=None):
+        """
+        delay フレーム後の update の直前に spawn_many(x, y, vx, vy, ...) する予定を積む
+        （update の前に呼べば、delay=0 はこのフレームの update の直前）
+        """
+        self.deferred.schedule(self.frame + delay, ((x, y, vx, vy, r, c, life), behavior, action))
+
+    def _release_deferred(self):
+        """このフレームに来た spawn_later をまとめて置く（ふるまい・アクションのない弾は1回の spawn_many）"""
+        due = self.deferred.pop_due(self.frame)
+        if not due:
+            return
+        plain = [args for args, beh, act in due if beh is None and act is None]
+        if plain:
+            self.spawn_many(*concat_spawns(plain))
+        for args, beh, act in due:
+            if beh is not None or act is not None:
+                self.spawn_many(*concat_spawns([args]), behavior=beh, action=act)
+
+    # spawn した弾をパターン側から1発ずつ扱う（BulletML の弾の action 用）。
+    # ref は (弾, 世代) で、弾が消えたりスロットが使い回されたりしたら state は None を返す
+    def ref(self, b):
+        return (b, b.gen)
+
+    def state(self, ref):
+        """ref の弾の今の (x, y, vx, vy)。もういなければ None"""
+        b, gen = ref
+        if not b.alive or b.gen != gen:
+            return None
+        x, y = self.pos(b)
+        return x, y, b.vx, b.vy
+
+    def set_velocity(self, ref, vx, vy):
+        """ref の弾の速度を変える（直進弾は今の位置を基準に付け替え、消える予定も立て直す）"""
+        b, gen = ref
+        if not b.alive or b.gen != gen:
+            return
+        if b in self.stepped:
+            b.vx, b.vy = vx, vy
+            return
+        b.x, b.y = self.pos(b)
+        b.vx, b.vy = vx, vy
+        b.f0 = self.frame
+        self._schedule_exit(b)
+
+    def vanish(self, ref):
+        b, gen = ref
+        if b.alive and b.gen == gen:
+            self._kill(b)
+
+    def _kill(self, b):
+        b.alive = False
+        self.stepped.pop(b, None)
+        self.near.pop(b, None)
+        self.free.append(b.slot)
+        self._grid_dirty = True
+
+    def _fire(self, fired, px, py):
+        """契機が来た (弾, x, y) の列から、アクションごとにまとめて子弾を撃つ（vanish の親は消す）"""
+        groups = {}
+        for b, x, y in fired:
+            act = b.action
+            groups.setdefault(act, []).append((x, y, b.vx, b.vy))
+            if act.vanish and b.alive:
+                self._kill(b)
+        for act, rows in groups.items():
+            x, y, vx, vy = np.array(rows, dtype=np.float64).T
+            self.spawn_many(*act.children(x, y, vx, vy, px, py), r=1, c=act.color, action=act.child)
+
+    def _near(self, px, py):
+        near, pool = self.near, self.pool
+        rad = math.sqrt(max(b.action.radius2 for b in near))
+        # グリッドの座標は float32 なので少し広く拾い、距離は今の位置で測り直す
+        fired = []
+        for s in np.sort(self.query_radius(px, py, rad + 1e-3)).tolist():
+            b = pool[s]
+            if b in near:
+                x, y = self.pos(b)
+                if (px - x)**2 + (py - y)**2 <= b.action.radius2:
+                    fired.append((b, x, y))
+        if fired:
+            self._fire(fired, px, py)
 
     def update(self, ctx=None):
         # ctx からプレイヤー座標（なければ None）
         px, py = (None, None)
         if ctx and "player_pos" in ctx:
             px, py = ctx["player_pos"]
+        f = self.frame
+        # 予定していた弾と、AFTER アクションの子弾は update の前に置いた弾と同じく、このフレームから動く
+        self._release_deferred()
+        fired = []
+        for b, gen in self.triggers.pop_due(f):
+            if b.alive and b.gen == gen:
+                fired.append((b, *self.pos(b)))
+        if fired:
+            self._fire(fired, px, py)
+        self._birth = f + 1
 
-        for b in self.pool:
+        # このフレームに来た変速ステップだけを処理（死んだ・入れ替わった弾の予定は捨てる）。
+        # 速度が変わるので今の位置を基準に付け替え、消える予定も立て直す
+        for b, gen, spds in self.events.pop_due(f):
+            if b.alive and b.gen == gen:
+                x, y = self.pos(b)
+                b.vx, b.vy = b.behavior.apply(spds, x, y, b.vx, b.vy, px, py)
+                b.x, b.y, b.f0 = x, y, f
+                self._schedule_exit(b)
+
+        # NEAR アクション: グリッドでプレイヤー周辺の弾だけを調べ、半径内に入った弾から（スロット順に）撃つ
+        if px is not None and self.near:
+            self._near(px, py)
+
+        # 重力の弾は毎フレーム位置を進める（基準は常に今のフレーム）
+        died = []   # 寿命で消えた DEATH アクションの弾
+        for b in list(self.stepped):
             if not b.alive:
                 continue
-
-            # --- ふるまい（任意） ---
             beh = b.behavior
-            if beh:
-                typ = beh.get("type")
-
-                # 1) 重力（引力/斥力）
-                if typ == "grav" and px is not None:
-                    g = float(beh.get("g", 0.03))
-                    mode = beh.get("mode", "attract")
-                    vmax = float(beh.get("max_speed", 3.0))
-                    dx, dy = (px - b.x), (py - b.y)
-                    d = max(1e-5, math.hypot(dx, dy))
-                    ax, ay = g * (dx/d), g * (dy/d)
-                    if mode == "repel":
-                        ax, ay = -ax, -ay
-                    b.vx += ax; b.vy += ay
-                    spd = math.hypot(b.vx, b.vy)
-                    if spd > vmax:
-                        k = vmax / spd
-                        b.vx *= k; b.vy *= k
-
-                # 2) 変速スケジュール
-                elif typ == "speed_schedule":
-                    for step in beh.get("steps", []):
-                        if b.t == int(step.get("at", -1)):
-                            spd = max(0.0, float(step.get("speed", 0.0)))
-
-                            # --- ここを修正 ---
-                            if spd > 0 and "aim_player" in beh and beh["aim_player"]:
-                                # ctx からプレイヤー座標を取る
-                                if ctx and "player_pos" in ctx:
-                                    px, py = ctx["player_pos"]
-                                    dx, dy = px - b.x, py - b.y
-                                    ang = math.atan2(dy, dx)
-                                else:
-                                    ang = 0.0
-                            else:
-                                # 従来通り：現在の進行方向を保持
-                                ang = math.atan2(b.vy, b.vx) if (b.vx or b.vy) else 0.0
-
-                            # 新しい速度ベクトルに置き換え
-                            b.vx = math.cos(ang) * spd
-                            b.vy = math.sin(ang) * spd
-                            
-                                                       
-                # 3) 近接爆発
-                elif typ == "proximity_burst" and px is not None:
-                    rad = float(beh.get("radius", 18))
-                    if (px - b.x)**2 + (py - b.y)**2 <= rad*rad:
-                        ch = beh.get("child", {})
-                        n   = int(ch.get("count", 12))
-                        v   = float(ch.get("speed", 1.2))
-                        col = int(ch.get("color", 10))
-                        for i in range(n):
-                            a = (2*math.pi) * (i / n)
-                            self.spawn(b.x, b.y, math.cos(a)*v, math.sin(a)*v, r=1, c=col)
-                        if beh.get("once", True):
-                            b.alive = False
-                            continue  # 親が消えたので位置更新へ進まず次弾へ
+
+            # 重力（引力/斥力）
+            if px is not None:
+                dx, dy = (px - b.x), (py - b.y)
+                d = max(1e-5, math.hypot(dx, dy))
+                k = beh.g * beh.sign / d
+                b.vx += dx * k; b.vy += dy * k
+                spd = math.hypot(b.vx, b.vy)
+                vmax = beh.max_speed
+                if spd > vmax:
+                    k = vmax / spd
+                    b.vx *= k; b.vy *= k
 
             # 位置・寿命
             b.x += b.vx
             b.y += b.vy
-            b.t += 1
-            if b.life >= 0 and b.t >= b.life:
-                b.alive = False
+            b.f0 = f + 1
+            if b.life >= 0 and f + 1 - b.born >= b.life:
+                self._kill(b)
+                if b.action is not None and b.action.trigger == DEATH:
+                    died.append((b, b.x, b.y))
+                continue
 
             # 画面外で消す
             if b.x < -4 or b.x > self.w + 4 or b.y < -4 or b.y > self.h + 4:
-                b.alive = False
+                self._kill(b)
+
+        # 直進弾はこのフレームに消える予定のものだけ（立て直し前の古い予定は exit が合わない）
+        for b, gen in self.exits.pop_due(f):
+            if b.alive and b.gen == gen and b.exit == f:
+                self._kill(b)
+                act = b.action
+                if act is not None and act.trigger == DEATH and b.life >= 0 and f >= b.born + max(b.life, 1) - 1:
+                    n = f + 1 - b.f0
+                    died.append((b, b.x + b.vx * n, b.y + b.vy * n))
+        if died:
+            died.sort(key=lambda e: e[0].slot)
+            self._fire(died, px, py)
+
+        if self.shrink_after > 0:
+            self._maybe_shrink()
+        self._grid_dirty = True
+        self.frame += 1
+        self._birth = self.frame
+
+    def _live_arrays(self):
+        """生きている弾の (スロット, x, y, vx, vy, r, c) の配列（位置は今のフレームで計算）"""
+        live = [b for b in self.pool if b.alive]
+        n = len(live)
+        col = lambda key, dtype=np.float64: np.fromiter(map(key, live), dtype=dtype, count=n)
+        vx, vy = col(lambda b: b.vx), col(lambda b: b.vy)
+        age = self.frame - col(lambda b: b.f0, np.int64)
+        x = col(lambda b: b.x) + vx * age
+        y = col(lambda b: b.y) + vy * age
+        return (col(lambda b: b.slot, np.int64), x, y, vx, vy,
+                col(lambda b: b.r, np.float32), col(lambda b: b.c, np.uint8))
+
+    def _ensure_grid(self):
+        if self._grid_dirty:
+            idx, x, y, _, _, r, _ = self._live_arrays()
+            self.grid.rebuild(idx, x.astype(np.float32), y.astype(np.float32), r)
+            self._grid_dirty = False
+        return self.grid
+
+    def snapshot(self):
+        """生きている弾の (x, y, vx, vy, c) を canonical_order の順で返す（バックエンド間の比較用）"""
+        _, x, y, vx, vy, _, c = self._live_arrays()
+        return canonical_order(np.column_stack([x, y, vx, vy, c.astype(np.float64)]))
+
+    def query_radius(self, x, y, r):
+        """(x, y) から半径 r 以内にいる弾のスロット番号"""
+        return self._ensure_grid().query(x, y, r)
+
+    def hits(self, x, y, r):
+        """半径 r の円（プレイヤー等）と重なっている弾のスロット番号"""
+        return self._ensure_grid().overlaps(x, y, r)
 
-    def draw(self):
+    def draw(self, img=None):
+        # img: 描画先の pyxel.Image（既定は画面）
+        circ = pyxel.circ if img is None else img.circ
+        frame = self.frame
         for b in self.pool:
             if b.alive:
-                pyxel.circ(b.x, b.y, 0, b.c)
+                n = frame - b.f0
+                circ(b.x + b.vx * n, b.y + b.vy * n, 0, b.c)
@@ -0,0 +1,520 @@
+# bullet_np.py
+# BulletSystem と同じ API（spawn / update / draw / clear_all）を持つ NumPy 版バックエンド。
+# 弾1発ごとの Bullet オブジェクトではなく、属性ごとの連続配列（Structure of Arrays）で保持し、
+# 直進移動・寿命切れ・画面外判定を配列演算でまとめて処理する。
+
+import math
+from functools import lru_cache
+import numpy as np
+import pyxel
+from .bullet import PoolStats, canonical_order, concat_spawns, grown_capacity, thin_keep
+from .behavior import GRAV, SPEED_SCHEDULE, AFTER, DEATH, NEAR, compile_action, compile_behavior
+from .sched import TimingWheel
+from .spatial import UniformGrid
+
+# 容量に合わせて伸縮させる配列属性
+_ARRAYS = ("x", "y", "vx", "vy", "t", "life", "c", "r", "alive", "kind", "gen",
+           "grav_g", "grav_vmax", "act", "trig", "near_r2")
+
+def gravity_kernel(x, y, vx, vy, g, vmax, idx, px, py):
+    """
+    重力弾 idx をまとめて1フレーム分加速する（BulletSystem の "grav" と同じ式）。
+    g は符号付き（引力 +、斥力 -）、vmax は弾ごとの速さ上限。vx, vy を書き換える
+    """
+    dx = px - x[idx].astype(np.float64)
+    dy = py - y[idx].astype(np.float64)
+    k = g[idx] / np.maximum(np.hypot(dx, dy), 1e-5)
+    nvx = vx[idx] + dx * k
+    nvy = vy[idx] + dy * k
+    spd = np.hypot(nvx, nvy)
+    lim = vmax[idx].astype(np.float64)
+    over = spd > lim
+    scale = np.where(over, lim / np.where(over, spd, 1.0), 1.0)
+    vx[idx] = nvx * scale
+    vy[idx] = nvy * scale
+
+@lru_cache(maxsize=None)
+def circle_stamp(radius):
+    """
+    pyxel.circ(x, y, radius) が塗る画素の中心からのずれ (dy, dx)。
+    実際に Pyxel で小さな画像に描いて取り出すので形は完全に一致する
+    """
+    size = 2 * radius + 1
+    img = pyxel.Image(size, size)
+    img.cls(0)
+    img.circ(radius, radius, radius, 1)
+    mask = np.frombuffer(img.data_ptr(), dtype=np.uint8).reshape(size, size) == 1
+    dy, dx = np.nonzero(mask)
+    return dy - radius, dx - radius
+
+def framebuffer(img):
+    """Pyxel の Image の画素列を (height, width) の uint8 配列として直接見る（コピーなし）"""
+    return np.frombuffer(img.data_ptr(), dtype=np.uint8).reshape(img.height, img.width)
+
+class NumpyBulletSystem:
+    """容量・伸縮の引数は BulletSystem と同じ"""
+    draw_radius = 0   # 描画半径（当たり判定の r とは別。従来どおり 1 画素）
+    def __init__(self, w, h, capacity=4096, max_capacity=131072, grow_factor=2.0, shrink_after=0):
+        self.w, self.h = w, h
+        self.capacity = capacity
+        self.min_capacity = capacity
+        self.max_capacity = max(capacity, max_capacity)
+        self.grow_factor = grow_factor
+        self.shrink_after = shrink_after
+        self.stats = PoolStats()
+        n = capacity
+        self.x  = np.zeros(n, dtype=np.float32)
+        self.y  = np.zeros(n, dtype=np.float32)
+        self.vx = np.zeros(n, dtype=np.float32)
+        self.vy = np.zeros(n, dtype=np.float32)
+        self.t     = np.zeros(n, dtype=np.int32)
+        self.life  = np.full(n, -1, dtype=np.int32)   # -1 は無制限
+        self.c     = np.full(n, 7, dtype=np.uint8)
+        self.r     = np.zeros(n, dtype=np.uint8)
+        self.alive = np.zeros(n, dtype=np.bool_)
+        # ふるまい付きの弾だけは Python 側で個別処理する（kind は behavior.py の種別、0 はなし）
+        self.kind     = np.zeros(n, dtype=np.uint8)
+        self.behavior = [None] * n
+        # 重力弾のパラメータ（gravity_kernel で一括処理するため配列に展開）
+        self.grav_g    = np.zeros(n, dtype=np.float32)   # 符号付き加速度
+        self.grav_vmax = np.zeros(n, dtype=np.float32)
+        # アクション: actions[act] のレコードと契機（trig は behavior.py の AFTER/DEATH/NEAR、0 はなし）。
+        # NEAR の判定半径の2乗はグリッド問い合わせの絞り込み用に配列で持つ
+        self.act     = np.zeros(n, dtype=np.uint16)
+        self.trig    = np.zeros(n, dtype=np.uint8)
+        self.near_r2 = np.zeros(n, dtype=np.float32)
+        self.actions = [None]
+        self._act_ids = {}
+        # 空きスロット番号のスタック: free[:nfree] が空き。末尾から取り出す
+        self.free = np.arange(n - 1, -1, -1, dtype=np.int32)
+        self.nfree = n
+        # spawn ごとに増える世代（スロット再利用前の予定を見分ける）
+        self.gen = np.zeros(n, dtype=np.uint32)
+        # update の通し番号と、変速ステップの予定表（frame -> (スロット, 世代, 速さ列)）
+        self.frame = 0
+        self.events = TimingWheel()
+        # AFTER アクションの予定表（frame -> (スロットの配列, 世代の配列)）
+        self.triggers = TimingWheel()
+        # spawn_later で後から置く弾の予定表（frame -> ((x, y, vx, vy, r, c, life), behavior, action)）
+        self.deferred = TimingWheel()
+        # 近接判定・当たり判定用のグリッド。位置が変わったら次の問い合わせで作り直す
+        self.grid = UniformGrid(w, h)
+        self._grid_dirty = True
+        # 新しい弾を thin 発に1発だけ置く（負荷が高いときの間引き。1で無効）
+        self.thin = 1
+        self._thin_seq = 0
+
+    @property
+    def live_count(self):
+        return self.capacity - self.nfree
+
+    def clear_all(self):
+        self.alive[:] = False
+        self.kind[:] = 0
+        self.trig[:] = 0
+        self.act[:] = 0
+        self.actions = [None]
+        self._act_ids.clear()
+        self._grid_dirty = True
+        self.free[:] = np.arange(self.capacity - 1, -1, -1, dtype=np.int32)
+        self.nfree = self.capacity
+        self.events.clear()
+        self.triggers.clear()
+        self.deferred.clear()
+
+    def _resize(self, n):
+        """各配列を長さ n に付け替える（先頭 min(n, capacity) 要素は保持）"""
+        keep = min(n, self.capacity)
+        for name in _ARRAYS:
+            old = getattr(self, name)
+            new = np.zeros(n, dtype=old.dtype)
+            new[:keep] = old[:keep]
+            setattr(self, name, new)
+        if n > self.capacity:
+            self.behavior.extend([None] * (n - self.capacity))
+        else:
+            del self.behavior[n:]
+
+    def _grow(self):
+        old = self.capacity
+        new_cap = grown_capacity(old, self.grow_factor, self.max_capacity)
+        if new_cap <= old:
+            return False
+        self._resize(new_cap)
+        # 拡張は空きが尽きたときだけなので、空きスタックは増えた分だけになる
+        free = np.empty(new_cap, dtype=np.int32)
+        free[:new_cap - old] = np.arange(new_cap - 1, old - 1, -1, dtype=np.int32)
+        free[new_cap - old:new_cap - old + self.nfree] = self.free[:self.nfree]
+        self.free = free
+        self.nfree += new_cap - old
+        self.capacity = new_cap
+        self.stats.grow_events += 1
+        return True
+
+    def _maybe_shrink(self):
+        target = max(self.min_capacity, int(self.capacity / self.grow_factor))
+        if target >= self.capacity or self.live_count > target // 2:
+            self.stats.quiet = 0
+            return
+        self.stats.quiet += 1
+        if self.stats.quiet < self.shrink_after:
+            return
+        # 後半に残っている弾を前半の空きへ移してから切り詰める
+        src = np.flatnonzero(self.alive[target:]) + target
+        dst = np.flatnonzero(~self.alive[:target])[:src.size]
+        # 予定表のスロット番号の付け替え表（死んだ弾の予定は古いので捨てる）
+        remap = np.where(self.alive, np.arange(self.capacity), -1)
+        remap[src] = dst
+        for name in _ARRAYS:
+            a = getattr(self, name)
+            a[dst] = a[src]
+        for i, j in zip(src.tolist(), dst.tolist()):
+            self.behavior[j] = self.behavior[i]
+        self.events.map_items(lambda e: (int(remap[e[0]]),) + e[1:] if remap[e[0]] >= 0 else None)
+
+        def remap_many(e):
+            slots = remap[e[0]]
+            keep = slots >= 0
+            return (slots[keep], e[1][keep]) if keep.any() else None
+        self.triggers.map_items(remap_many)
+        self.alive[src] = False
+        self._resize(target)
+        self.capacity = target
+        holes = np.flatnonzero(~self.alive)[::-1]
+        self.free = np.zeros(target, dtype=np.int32)
+        self.free[:holes.size] = holes
+        self.nfree = holes.size
+        self.stats.quiet = 0
+        self.stats.shrink_events += 1
+        self._grid_dirty = True
+
+    def _action_id(self, act):
+        """アクションのレコードを actions に登録して番号を返す（同じレコードは同じ番号）"""
+        k = self._act_ids.get(act)
+        if k is None:
+            k = self._act_ids[act] = len(self.actions)
+            self.actions.append(act)
+        return k
+
+    def _set_action(self, slots, act):
+        """slots の弾にアクション act を付ける（AFTER は予定表に1件で積む）"""
+        if act is None:
+            self.trig[slots] = 0
+            return
+        self.act[slots] = self._action_id(act)
+        self.trig[slots] = act.trigger
+        if act.trigger == AFTER:
+            slots = np.atleast_1d(slots)
+            self.triggers.schedule(self.frame + act.frames, (slots, self.gen[slots].copy()))
+        elif act.trigger == NEAR:
+            self.near_r2[slots] = act.radius2
+
+    def spawn(self, x, y, vx, vy, r=1, c=7, life=-1, behavior=None, action=None):
+        """空きスロットに弾を1発置く。戻り値はスロット番号（上限まで埋まっている・間引いたときは None）"""
+        if self.thin > 1:
+            self._thin_seq += 1
+            if (self._thin_seq - 1) % self.thin:
+                self.stats.thinned += 1
+                return None
+        if self.nfree == 0 and not self._grow():
+            self.stats.dropped += 1
+            return None
+        self.nfree -= 1
+        i = int(self.free[self.nfree])
+        self.alive[i] = True
+        self.x[i], self.y[i] = x, y
+        self.vx[i], self.vy[i] = vx, vy
+        self.r[i], self.c[i] = r, c
+        self.t[i] = 0
+        self.life[i] = life
+        beh = compile_behavior(behavior)
+        self.behavior[i] = beh
+        self.kind[i] = beh.kind if beh is not None else 0
+        self.gen[i] += 1
+        if beh is not None:
+            if beh.kind == GRAV:
+                self.grav_g[i] = beh.g * beh.sign
+                self.grav_vmax[i] = beh.max_speed
+            elif beh.kind == SPEED_SCHEDULE:
+                g = int(self.gen[i])
+                for at, spds in beh.events:
+                    self.events.schedule(self.frame + at, (i, g, spds))
+        self._set_action(i, compile_action(action))
+        self._grid_dirty = True
+        self.stats.spawned += 1
+        live = self.capacity - self.nfree
+        if live > self.stats.high_water:
+            self.stats.high_water = live
+        return i
+
+    def spawn_many(self, x, y, vx, vy, r=1, c=7, life=-1, behavior=None, action=None):
+        """
+        複数の弾をまとめて置く。x, y, vx, vy, r, c, life はスカラーか同じ長さの配列
+        （スカラーは全弾共通）。behavior は全弾共通のレコード/dict か、弾ごとの列。
+        戻り値は置けた弾のスロット番号の配列（上限を超えた分は捨てて dropped に数える）
+        """
+        vx = np.asarray(vx, dtype=np.float32).ravel()
+        n = vx.size
+        if behavior is not None and not isinstance(behavior, dict) and hasattr(behavior, "__len__"):
+            # 弾ごとに違うふるまい → 1発ずつ
+            cols = np.broadcast_arrays(*(np.asarray(a) for a in (x, y, vx, vy, r, c, life)))
+            out = [self.spawn(*(a[k] for a in cols), behavior=behavior[k], action=action) for k in range(n)]
+            return np.array([i for i in out if i is not None], dtype=np.int64)
+        if self.thin > 1:
+            keep = thin_keep(self._thin_seq, n, self.thin)
+            self._thin_seq += n
+            self.stats.thinned += n - keep.size
+            x, y, vy, r, c, life = (
+                a[keep] if a.ndim else a for a in map(np.asarray, (x, y, vy, r, c, life))
+            )
+            vx = vx[keep]
+            n = keep.size
+
+        while self.nfree < n and self._grow():
+            pass
+        m = min(n, self.nfree)
+        self.stats.dropped += n - m
+        # 空きスタックの上から m 個（spawn を m 回呼んだのと同じ順）
+        slots = self.free[self.nfree - m:self.nfree][::-1].astype(np.int64)
+        self.nfree -= m
+
+        self.alive[slots] = True
+        self.x[slots] = np.broadcast_to(np.asarray(x, dtype=np.float32), (n,))[:m]
+        self.y[slots] = np.broadcast_to(np.asarray(y, dtype=np.float32), (n,))[:m]
+        self.vx[slots] = vx[:m]
+        self.vy[slots] = np.broadcast_to(np.asarray(vy, dtype=np.float32), (n,))[:m]
+        self.r[slots] = np.broadcast_to(np.asarray(r), (n,))[:m]
+        self.c[slots] = np.broadcast_to(np.asarray(c), (n,))[:m]
+        self.life[slots] = np.broadcast_to(np.asarray(life), (n,))[:m]
+        self.t[slots] = 0
+        self.gen[slots] += 1
+
+        beh = compile_behavior(behavior)
+        if beh is None:
+            # kind が 0 のスロットの behavior は参照されないので書き換えない
+            self.kind[slots] = 0
+        else:
+            self.kind[slots] = beh.kind
+            sl = slots.tolist()
+            for i in sl:
+                self.behavior[i] = beh
+            if beh.kind == GRAV:
+                self.grav_g[slots] = beh.g * beh.sign
+                self.grav_vmax[slots] = beh.max_speed
+            elif beh.kind == SPEED_SCHEDULE:
+                gens = self.gen[slots].tolist()
+                for at, spds in beh.events:
+                    for i, g in zip(sl, gens):
+                        self.events.schedule(self.frame + at, (i, g, spds))
+        self._set_action(slots, compile_action(action))
+
+        self._grid_dirty = True
+        self.stats.spawned += m
+        live = self.capacity - self.nfree
+        if live > self.stats.high_water:
+            self.stats.high_water = live
+        return slots
+
+    def spawn_later(self, delay, x, y, vx, vy, r=1, c=7, life=-1, behavior=None, action=None):
+        """
+        delay フレーム後の update の直前に spawn_many(x, y, vx, vy, ...) する予定を積む
+        （update の前に呼べば、delay=0 はこのフレームの update の直前）
+        """
+        self.deferred.schedule(self.frame + delay, ((x, y, vx, vy, r, c, life), behavior, action))
+
+    def _release_deferred(self):
+        """このフレームに来た spawn_later をまとめて置く（ふるまい・アクションのない弾は1回の spawn_many）"""
+        due = self.deferred.pop_due(self.frame)
+        if not due:
+            return
+        plain = [args for args, beh, act in due if beh is None and act is None]
+        if plain:
+            self.spawn_many(*concat_spawns(plain))
+        for args, beh, act in due:
+            if beh is not None or act is not None:
+                self.spawn_many(*concat_spawns([args]), behavior=beh, action=act)
+
+    # spawn した弾をパターン側から1発ずつ扱う（BulletSystem と同じ）。ref は (スロット, 世代)。
+    # プールの縮小で動いた弾の ref は使えなくなる（state が None を返す）
+    def ref(self, i):
+        return (i, int(self.gen[i]))
+
+    def state(self, ref):
+        """ref の弾の今の (x, y, vx, vy)。もういなければ None"""
+        i, gen = ref
+        if i >= self.capacity or not self.alive[i] or self.gen[i] != gen:
+            return None
+        return float(self.x[i]), float(self.y[i]), float(self.vx[i]), float(self.vy[i])
+
+    def set_velocity(self, ref, vx, vy):
+        if self.state(ref) is not None:
+            i = ref[0]
+            self.vx[i], self.vy[i] = vx, vy
+
+    def vanish(self, ref):
+        if self.state(ref) is not None:
+            self._free(np.array([ref[0]], dtype=np.int32))
+            self._grid_dirty = True
+
+    def _free(self, idx):
+        """update の外で消した弾 idx をすぐ空きスタックへ戻す"""
+        self.alive[idx] = False
+        self.kind[idx] = 0
+        self.trig[idx] = 0
+        k = idx.size
+        self.free[self.nfree:self.nfree + k] = idx[::-1]
+        self.nfree += k
+
+    def _fire(self, idx, x, y, px, py):
+        """
+        契機が来た弾 idx（位置 x, y）から、アクションごとにまとめて子弾を撃つ。
+        vanish の親は alive を落とすだけ（空きスタックへ戻すのは呼び出し側）
+        """
+        ids = self.act[idx]
+        vx = self.vx[idx].astype(np.float64)
+        vy = self.vy[idx].astype(np.float64)
+        for k in np.unique(ids).tolist():
+            m = ids == k
+            act = self.actions[k]
+            if act.vanish:
+                self.alive[idx[m]] = False
+            cx, cy, cvx, cvy = act.children(x[m], y[m], vx[m], vy[m], px, py)
+            self.spawn_many(cx, cy, cvx, cvy, r=1, c=act.color, action=act.child)
+
+    def _fire_after(self, px, py):
+        """このフレームに来た AFTER アクションを撃つ（子弾はこのフレームから動く）"""
+        due = self.triggers.pop_due(self.frame)
+        if not due:
+            return
+        idx = np.concatenate([s for s, _ in due])
+        gens = np.concatenate([g for _, g in due])
+        ok = self.alive[idx] & (self.gen[idx] == gens) & (self.trig[idx] == AFTER)
+        idx = np.sort(idx[ok])
+        if not idx.size:
+            return
+        self._fire(idx, self.x[idx].astype(np.float64), self.y[idx].astype(np.float64), px, py)
+        gone = idx[~self.alive[idx]]
+        if gone.size:
+            self._free(gone)
+
+    def update(self, ctx=None):
+        px, py = (None, None)
+        if ctx and "player_pos" in ctx:
+            px, py = ctx["player_pos"]
+
+        # 予定していた弾と、AFTER アクションの子弾は update の前に置いた弾と同じく、このフレームから動く
+        self._release_deferred()
+        self._fire_after(px, py)
+
+        # この時点で生きている弾だけを進める（ふるまいで生まれた子弾は次フレームから）
+        live_before = self.alive.copy()
+
+        # このフレームに来た変速ステップだけを処理（死んだ・入れ替わった弾の予定は捨てる）
+        alive, gen = self.alive, self.gen
+        for i, g, spds in self.events.pop_due(self.frame):
+            if alive[i] and gen[i] == g:
+                self.vx[i], self.vy[i] = self.behavior[i].apply(
+                    spds, float(self.x[i]), float(self.y[i]),
+                    float(self.vx[i]), float(self.vy[i]), px, py)
+
+        kind = self.kind
+        if px is not None:
+            grav = np.flatnonzero(kind == GRAV)
+            if grav.size:
+                gravity_kernel(self.x, self.y, self.vx, self.vy,
+                               self.grav_g, self.grav_vmax, grav, px, py)
+
+            near = np.flatnonzero(self.trig == NEAR)
+            if near.size:
+                self._near(near, px, py)
+
+        if live_before.size < self.capacity:
+            # ふるまい処理中の spawn でプールが拡張された
+            live_before = np.concatenate(
+                [live_before, np.zeros(self.capacity - live_before.size, dtype=np.bool_)])
+        live = live_before & self.alive
+        x, y, t = self.x, self.y, self.t
+
+        # 位置・寿命
+        np.add(x, self.vx, out=x, where=live)
+        np.add(y, self.vy, out=y, where=live)
+        np.add(t, 1, out=t, where=live)
+        expired = (self.life >= 0) & (t >= self.life)
+
+        # 画面外で消す
+        out = (x < -4) | (x > self.w + 4) | (y < -4) | (y > self.h + 4)
+
+        # 寿命で消える DEATH アクションの弾は、消えた位置から撃つ
+        died = np.flatnonzero(live & expired & (self.trig == DEATH))
+        self.alive &= ~(live & (expired | out))
+        if died.size:
+            self._fire(died, x[died].astype(np.float64), y[died].astype(np.float64), px, py)
+        self.kind[~self.alive] = 0
+        self.trig[~self.alive] = 0
+
+        # このフレームで消えた弾（ふるまいで消えた親も含む）をまとめて空きスタックへ戻す
+        # （DEATH の子弾でプールが拡張されていても、増えた分は空きのまま）
+        dead = np.flatnonzero(live_before & ~self.alive[:live_before.size])
+        k = dead.size
+        if k:
+            self.free[self.nfree:self.nfree + k] = dead[::-1]
+            self.nfree += k
+
+        if self.shrink_after > 0:
+            self._maybe_shrink()
+        self._grid_dirty = True
+        self.frame += 1
+
+    def snapshot(self):
+        """生きている弾の (x, y, vx, vy, c) を canonical_order の順で返す（バックエンド間の比較用）"""
+        idx = np.flatnonzero(self.alive)
+        return canonical_order(np.column_stack(
+            [self.x[idx], self.y[idx], self.vx[idx], self.vy[idx], self.c[idx]]).astype(np.float64))
+
+    def _ensure_grid(self):
+        if self._grid_dirty:
+            idx = np.flatnonzero(self.alive)
+            self.grid.rebuild(idx, self.x[idx], self.y[idx], self.r[idx])
+            self._grid_dirty = False
+        return self.grid
+
+    def query_radius(self, x, y, r):
+        """(x, y) から半径 r 以内にいる弾のスロット番号"""
+        return self._ensure_grid().query(x, y, r)
+
+    def hits(self, x, y, r):
+        """半径 r の円（プレイヤー等）と重なっている弾のスロット番号"""
+        return self._ensure_grid().overlaps(x, y, r)
+
+    def _near(self, near, px, py):
+        """NEAR アクション: グリッドでプレイヤー周辺の弾だけを調べ、半径内に入った弾から子弾を撃つ"""
+        rad = math.sqrt(float(self.near_r2[near].max()))
+        cand = self.query_radius(px, py, rad)
+        cand = cand[self.trig[cand] == NEAR]
+        d2 = (self.x[cand] - px)**2 + (self.y[cand] - py)**2
+        idx = np.sort(cand[d2 <= self.near_r2[cand]])
+        if idx.size:
+            self._fire(idx, self.x[idx].astype(np.float64), self.y[idx].astype(np.float64), px, py)
+
+    def draw(self, img=None):
+        """
+        生きている弾を画面（既定は pyxel.screen）の画素配列へまとめて書き込む。
+        pyxel.circ を1発ずつ呼ぶのと同じ画素・同じ色になる（カメラ・パレット変更は非対応）
+        """
+        idx = np.flatnonzero(self.alive)
+        if not idx.size:
+            return
+        img = pyxel.screen if img is None else img
+        buf = framebuffer(img)
+        h, w = buf.shape
+        # Pyxel と同じく 0.5 は 0 から遠い側へ丸める
+        x = self.x[idx]; y = self.y[idx]
+        xi = np.trunc(x + np.copysign(0.5, x)).astype(np.int32)
+        yi = np.trunc(y + np.copysign(0.5, y)).astype(np.int32)
+        # 弾ごとにスタンプの画素を並べ、弾の順に1回で書き込む（重なりは後の弾が上になる）
+        oy, ox = circle_stamp(self.draw_radius)
+        px = (xi[:, None] + ox).ravel()
+        py = (yi[:, None] + oy).ravel()
+        col = np.repeat(self.c[idx], ox.size)
+        m = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+        buf[py[m], px[m]] = col[m]
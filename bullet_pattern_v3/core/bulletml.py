@@ -0,0 +1,518 @@
+# bulletml.py
+# BulletML（XML）を読み、手で移植せずにそのままパターンとして動かす。
+# XML は lxml で読み、<action>/<fire>/<bullet> の木を ラベル参照を解決した命令のタプルへコンパイルする。
+# 式（$rand, $rank, $1..）は Python の式へ訳しておき、定数は読み込み時に畳み込む。
+# コンパイル結果はファイル内容の sha1 をキーに CACHE_DIR へ pickle で置き、次からは XML を読まない。
+#
+# 対応する要素: bulletml(type=vertical/horizontal), action, actionRef, fire, fireRef, bullet, bulletRef,
+#               repeat(times), wait, vanish, changeDirection(direction, term), changeSpeed(speed, term),
+#               direction(aim/absolute/relative/sequence), speed(absolute/relative/sequence), param
+# 未対応の要素（accel など）があるファイルは読み込み時に ValueError
+#
+# 向きは BulletML の度（vertical は上が 0 で時計回り、horizontal は右が 0）で持ち、速度にするときだけ画面の角度へ直す。
+# ルート（label が "top" で始まる action）は発射元の位置で、弾についた action はその弾の位置で動く。
+
+import hashlib
+import math
+import os
+import random
+import re
+from functools import lru_cache
+from lxml import etree
+from .datacache import read_cache, write_cache
+from .paths import data_path, resolve
+from .patterns import rng_from_state
+
+CACHE_DIR = data_path("cache", "bulletml")
+VERSION = 2   # コンパイル結果の形式を変えたら上げる（古いキャッシュを使わない）
+
+# 命令（コンパイル後のタプルの先頭）
+FIRE, FIRE_REF, ACTION, ACTION_REF, REPEAT, WAIT, VANISH, CHANGE_DIR, CHANGE_SPEED = range(9)
+
+# 1回の step で実行してよい命令数（wait のない無限 repeat で止まらないように）
+MAX_OPS = 100000
+
+# ---- 式 ----
+
+_TOKEN = re.compile(r"\s*(\$rand|\$rank|\$\d+|\d+\.?\d*|\.\d+|[-+*/%()])")
+
+def compile_expr(text):
+    """BulletML の式を、定数なら float、そうでなければ Python の式の文字列にする"""
+    src = (text or "").strip()
+    if not src:
+        raise ValueError("bulletml: empty expression")
+    out = []
+    pos = 0
+    while pos < len(src):
+        m = _TOKEN.match(src, pos)
+        if m is None:
+            raise ValueError(f"bulletml: bad expression {src!r}")
+        tok = m.group(1)
+        if tok == "$rand":
+            out.append("R()")
+        elif tok == "$rank":
+            out.append("K")
+        elif tok.startswith("$"):
+            out.append(f"P({int(tok[1:]) - 1})")
+        else:
+            out.append(tok)
+        pos = m.end()
+        while pos < len(src) and src[pos].isspace():
+            pos += 1
+    py = " ".join(out)
+    if "R()" in py or "K" in py or "P(" in py:
+        return py
+    return float(eval(py, {"__builtins__": {}}))
+
+@lru_cache(maxsize=None)
+def _expr_fn(py):
+    return eval(f"lambda P, R, K: ({py})", {"__builtins__": {}})
+
+def evaluate(e, params, rand, rank):
+    """compile_expr の結果を評価する（params は $1.. の値の列。足りない分は 0）"""
+    if isinstance(e, float):
+        return e
+    return float(_expr_fn(e)(lambda k: params[k] if k < len(params) else 0.0, rand, rank))
+
+# ---- XML -> 命令のタプル ----
+
+def _tag(el):
+    return etree.QName(el).localname
+
+def _children(el):
+    return [c for c in el if isinstance(c.tag, str)]
+
+def _child(el, name):
+    for c in _children(el):
+        if _tag(c) == name:
+            return c
+    return None
+
+def _params(el):
+    return tuple(compile_expr(c.text) for c in _children(el) if _tag(c) == "param")
+
+def _spec(el, kinds, default):
+    """<direction>/<speed> を (type, 式) に。要素がなければ None"""
+    if el is None:
+        return None
+    typ = el.get("type", default)
+    if typ not in kinds:
+        raise ValueError(f"bulletml: unknown {_tag(el)} type {typ!r}")
+    return (typ, compile_expr(el.text))
+
+def _change(el, name, kinds, default):
+    """<changeDirection>/<changeSpeed> を (<name> の (type, 式), term の式) に。どちらも必須"""
+    spec, term = _child(el, name), _child(el, "term")
+    if spec is None:
+        raise ValueError(f"bulletml: <{_tag(el)}> needs <{name}>")
+    if term is None:
+        raise ValueError(f"bulletml: <{_tag(el)}> needs <term>")
+    return _spec(spec, kinds, default), compile_expr(term.text)
+
+_DIR_TYPES = ("aim", "absolute", "relative", "sequence")
+_SPEED_TYPES = ("absolute", "relative", "sequence")
+
+def _compile_bullet(el):
+    """<bullet> -> (direction, speed, actions)。actions は ACTION / ACTION_REF 命令のタプル"""
+    actions = []
+    for c in _children(el):
+        t = _tag(c)
+        if t == "action":
+            actions.append((ACTION, _compile_action(c)))
+        elif t == "actionRef":
+            actions.append((ACTION_REF, c.get("label"), _params(c)))
+        elif t not in ("direction", "speed"):
+            raise ValueError(f"bulletml: unsupported element <{t}> in <bullet>")
+    return (_spec(_child(el, "direction"), _DIR_TYPES, "aim"),
+            _spec(_child(el, "speed"), _SPEED_TYPES, "absolute"),
+            tuple(actions))
+
+def _compile_fire(el):
+    """<fire> -> (direction, speed, bullet)。bullet は ("bullet", 定義) か ("ref", label, params)"""
+    b = _child(el, "bullet")
+    if b is not None:
+        bullet = ("bullet", _compile_bullet(b))
+    else:
+        ref = _child(el, "bulletRef")
+        if ref is None:
+            raise ValueError("bulletml: <fire> needs <bullet> or <bulletRef>")
+        bullet = ("ref", ref.get("label"), _params(ref))
+    for c in _children(el):
+        if _tag(c) not in ("direction", "speed", "bullet", "bulletRef"):
+            raise ValueError(f"bulletml: unsupported element <{_tag(c)}> in <fire>")
+    return (_spec(_child(el, "direction"), _DIR_TYPES, "aim"),
+            _spec(_child(el, "speed"), _SPEED_TYPES, "absolute"),
+            bullet)
+
+def _compile_action(el):
+    ops = []
+    for c in _children(el):
+        t = _tag(c)
+        if t == "fire":
+            ops.append((FIRE, _compile_fire(c)))
+        elif t == "fireRef":
+            ops.append((FIRE_REF, c.get("label"), _params(c)))
+        elif t == "action":
+            ops.append((ACTION, _compile_action(c)))
+        elif t == "actionRef":
+            ops.append((ACTION_REF, c.get("label"), _params(c)))
+        elif t == "repeat":
+            times = _child(c, "times")
+            body = _child(c, "action")
+            if body is not None:
+                body = (ACTION, _compile_action(body))
+            else:
+                ref = _child(c, "actionRef")
+                if ref is None:
+                    raise ValueError("bulletml: <repeat> needs <action> or <actionRef>")
+                body = (ACTION_REF, ref.get("label"), _params(ref))
+            if times is None:
+                raise ValueError("bulletml: <repeat> needs <times>")
+            ops.append((REPEAT, compile_expr(times.text), body))
+        elif t == "wait":
+            ops.append((WAIT, compile_expr(c.text)))
+        elif t == "vanish":
+            ops.append((VANISH,))
+        elif t == "changeDirection":
+            ops.append((CHANGE_DIR, *_change(c, "direction", _DIR_TYPES, "aim")))
+        elif t == "changeSpeed":
+            ops.append((CHANGE_SPEED, *_change(c, "speed", _SPEED_TYPES, "absolute")))
+        else:
+            raise ValueError(f"bulletml: unsupported element <{t}>")
+    return tuple(ops)
+
+def _check_refs(doc):
+    """参照先のラベルがすべてあるか確かめる"""
+    kinds = {ACTION_REF: "actions", FIRE_REF: "fires"}
+    def walk(ops):
+        for op in ops:
+            if op[0] in kinds and op[1] not in doc[kinds[op[0]]]:
+                raise ValueError(f"bulletml: unknown {kinds[op[0]][:-1]} label {op[1]!r}")
+            if op[0] == ACTION:
+                walk(op[1])
+            elif op[0] == REPEAT:
+                walk((op[2],))
+            elif op[0] == FIRE:
+                fire(op[1])
+    def fire(f):
+        b = f[2]
+        if b[0] == "ref":
+            if b[1] not in doc["bullets"]:
+                raise ValueError(f"bulletml: unknown bullet label {b[1]!r}")
+        else:
+            walk(b[1][2])
+    for ops in doc["actions"].values():
+        walk(ops)
+    for f in doc["fires"].values():
+        fire(f)
+    for b in doc["bullets"].values():
+        walk(b[2])
+
+def compile_bulletml(data):
+    """BulletML の XML（bytes）を命令の dict にコンパイルする"""
+    root = etree.fromstring(data)
+    if _tag(root) != "bulletml":
+        raise ValueError("bulletml: root element must be <bulletml>")
+    doc = {"type": root.get("type", "vertical"), "actions": {}, "fires": {}, "bullets": {}}
+    if doc["type"] not in ("vertical", "horizontal", "none"):
+        raise ValueError(f"bulletml: unknown type {doc['type']!r}")
+    for c in _children(root):
+        t = _tag(c)
+        label = c.get("label")
+        if t == "action":
+            doc["actions"][label] = _compile_action(c)
+        elif t == "fire":
+            doc["fires"][label] = _compile_fire(c)
+        elif t == "bullet":
+            doc["bullets"][label] = _compile_bullet(c)
+        else:
+            raise ValueError(f"bulletml: unsupported top-level element <{t}>")
+    doc["top"] = tuple(sorted(k for k in doc["actions"] if k and k.startswith("top")))
+    if not doc["top"]:
+        raise ValueError("bulletml: no action labelled 'top'")
+    _check_refs(doc)
+    return doc
+
+_loaded = {}
+
+def load_bulletml(path, cache_dir=CACHE_DIR):
+    """
+    path の BulletML をコンパイル済みの dict で返す（相対パスはパッケージから）。
+    ファイル内容の sha1 をキーに cache_dir の pickle を使い、なければコンパイルして書き出す
+    """
+    with open(resolve(path), "rb") as f:
+        data = f.read()
+    key = f"{hashlib.sha1(data).hexdigest()}-v{VERSION}"
+    doc = _loaded.get(key)
+    if doc is not None:
+        return doc
+    cpath = os.path.join(cache_dir, f"{key}.pkl") if cache_dir else None
+    # 壊れた・読めないキャッシュはコンパイルし直し、書けなければ次もコンパイルするだけ（datacache と同じ）
+    entry = read_cache(cpath, key) if cpath else None
+    if entry is not None:
+        doc = entry["doc"]
+    else:
+        try:
+            doc = compile_bulletml(data)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+        if cpath:
+            write_cache(cpath, {"key": key, "doc": doc})
+    _loaded[key] = doc
+    return doc
+
+# ---- 実行 ----
+
+def _norm(deg):
+    """-180 < deg <= 180 へ"""
+    deg = math.fmod(deg, 360.0)
+    if deg > 180:
+        deg -= 360
+    elif deg <= -180:
+        deg += 360
+    return deg
+
+class _Runner:
+    """
+    action を1本ずつ実行する状態。ref が None ならルート（発射元）、そうでなければ弾の参照。
+    stack は [命令列, 次の位置, params, 残りの繰り返し回数] の列
+    """
+    __slots__ = ("ref", "stack", "dir", "spd", "prev_dir", "prev_spd", "wait",
+                 "cd_step", "cd_left", "cd_to", "cs_step", "cs_left", "cs_to", "done")
+    def __init__(self, ref, ops, params, direction, speed):
+        self.ref = ref
+        self.stack = [[ops, 0, params, 0]]
+        self.dir = direction
+        self.spd = speed
+        self.prev_dir = direction
+        self.prev_spd = speed
+        self.wait = 0
+        # 向き・速さの変化: 1フレームの変化量・残りフレーム・最後に合わせる値（sequence は None）
+        self.cd_step = self.cd_left = 0
+        self.cs_step = self.cs_left = 0
+        self.cd_to = self.cs_to = None
+        self.done = False
+
+class BulletMLPattern:
+    """
+    コンパイル済みの BulletML を発射元から動かすパターン。
+    rank        : $rank の値（0..1）
+    speed_scale : BulletML の速さに掛ける倍率（画面の大きさに合わせる）
+    color       : action のない弾の色、color_shell : action を持つ弾の色
+    loop        : ルートの action が終わったら最初から繰り返す（False なら弾の action も終わったら止まる）
+    弾の参照は bullets.ref で取るので、プールの縮小でスロットが動いた弾はそれ以降 action を続けない
+    """
+    def __init__(self, doc, rank=0.5, seed=0, speed_scale=1.0, color=8, color_shell=None, loop=False):
+        self.doc = doc
+        self.rank = float(rank)
+        self.rng = random.Random(seed)
+        self.scale = float(speed_scale)
+        self.color = int(color)
+        self.color_shell = self.color if color_shell is None else int(color_shell)
+        self.loop = bool(loop)
+        # vertical は上が 0、horizontal は右が 0（画面の角度 = BulletML の角度 + offset）
+        self.offset = -90.0 if doc["type"] == "vertical" else 0.0
+        self.runners = []
+        self._rng_state = None   # clone 用（プロトタイプの乱数の状態）
+        self._start()
+
+    def clone(self):
+        """まだ動かしていないこのパターンと同じ状態の別インスタンス（コンパイル結果は共有）"""
+        if self._rng_state is None:
+            self._rng_state = self.rng.getstate()
+        c = object.__new__(BulletMLPattern)
+        c.__dict__.update(self.__dict__)
+        c.rng = rng_from_state(self._rng_state)
+        c._rng_state = None
+        c.runners = []
+        c._start()
+        return c
+
+    def _start(self):
+        # ルートは下向きを自分の向きとする（relative の基準）
+        down = 90.0 - self.offset
+        self.runners[:0] = [_Runner(None, self.doc["actions"][k], (), down, 0.0) for k in self.doc["top"]]
+
+    def _aim(self, x, y, ctx):
+        px, py = ctx["player_pos"]
+        return math.degrees(math.atan2(py - y, px - x)) - self.offset
+
+    def _velocity(self, deg, spd):
+        a = math.radians(deg + self.offset)
+        s = spd * self.scale
+        return math.cos(a) * s, math.sin(a) * s
+
+    def _eval(self, e, params):
+        return evaluate(e, params, self.rng.random, self.rank)
+
+    def update_and_fire(self, em, ctx):
+        bullets = em.bullets
+        # 新しく撃った弾の runner も同じフレームのうちに回す（リストの伸びに合わせて進む）
+        i = 0
+        while i < len(self.runners):
+            self._step(self.runners[i], em, bullets, ctx)
+            i += 1
+        self.runners = [r for r in self.runners if not r.done]
+        if not any(r.ref is None for r in self.runners):
+            if self.loop:
+                self._start()
+            elif not self.runners:
+                em.active = None
+                em.active_name = None
+
+    def _step(self, r, em, bullets, ctx):
+        if r.ref is None:
+            x, y = em.x, em.y
+        else:
+            st = bullets.state(r.ref)
+            if st is None:
+                r.done = True
+                return
+            x, y = st[0], st[1]
+
+        if r.wait > 0:
+            r.wait -= 1
+        if r.wait <= 0 and r.stack:
+            self._run(r, x, y, em, bullets, ctx)
+            if r.done:
+                return
+
+        changed = False
+        if r.cd_left > 0:
+            r.cd_left -= 1
+            r.dir = r.cd_to if r.cd_left == 0 and r.cd_to is not None else r.dir + r.cd_step
+            changed = True
+        if r.cs_left > 0:
+            r.cs_left -= 1
+            # 足し続けた丸めが残らないよう、最後のフレームは目標の値にする
+            r.spd = r.cs_to if r.cs_left == 0 and r.cs_to is not None else r.spd + r.cs_step
+            changed = True
+        if changed and r.ref is not None:
+            bullets.set_velocity(r.ref, *self._velocity(r.dir, r.spd))
+        if not r.stack and not r.cd_left and not r.cs_left:
+            # 命令を出し切った（弾はそのまま直進を続ける）
+            r.done = True
+
+    def _run(self, r, x, y, em, bullets, ctx):
+        """wait か終わりに来るまで命令を実行する"""
+        stack = r.stack
+        n = 0
+        while stack:
+            fr = stack[-1]
+            ops, pc, params = fr[0], fr[1], fr[2]
+            if pc >= len(ops):
+                if fr[3] > 0:
+                    fr[3] -= 1
+                    fr[1] = 0
+                else:
+                    stack.pop()
+                continue
+            n += 1
+            if n > MAX_OPS:
+                raise ValueError("bulletml: action loops without <wait>")
+            op = ops[pc]
+            fr[1] = pc + 1
+            code = op[0]
+            if code == WAIT:
+                r.wait = int(self._eval(op[1], params))
+                if r.wait > 0:
+                    return
+            elif code == FIRE:
+                self._fire(r, op[1], params, x, y, bullets, ctx)
+            elif code == FIRE_REF:
+                p = tuple(self._eval(e, params) for e in op[2])
+                self._fire(r, self.doc["fires"][op[1]], p, x, y, bullets, ctx)
+            elif code == ACTION:
+                stack.append([op[1], 0, params, 0])
+            elif code == ACTION_REF:
+                p = tuple(self._eval(e, params) for e in op[2])
+                stack.append([self.doc["actions"][op[1]], 0, p, 0])
+            elif code == REPEAT:
+                times = int(self._eval(op[1], params))
+                if times > 0:
+                    # 本体1命令だけの列を times 回まわす（actionRef の引数は毎回評価し直す）
+                    stack.append([(op[2],), 0, params, times - 1])
+            elif code == CHANGE_DIR:
+                self._change_dir(r, op[1], int(self._eval(op[2], params)), params, x, y, ctx)
+            elif code == CHANGE_SPEED:
+                self._change_speed(r, op[1], int(self._eval(op[2], params)), params)
+            elif code == VANISH:
+                if r.ref is not None:
+                    bullets.vanish(r.ref)
+                r.done = True
+                stack.clear()
+                return
+
+    def _change_dir(self, r, spec, term, params, x, y, ctx):
+        typ, e = spec
+        v = self._eval(e, params)
+        if typ == "sequence":
+            r.cd_step, r.cd_left, r.cd_to = v, max(term, 0), None
+            return
+        if typ == "aim":
+            target = self._aim(x, y, ctx) + v
+        elif typ == "absolute":
+            target = v
+        else:
+            target = r.dir + v
+        delta = _norm(target - r.dir)
+        # term が 0 以下でも1フレームで向きを変える
+        term = max(term, 1)
+        r.cd_step, r.cd_left, r.cd_to = delta / term, term, r.dir + delta
+
+    def _change_speed(self, r, spec, term, params):
+        typ, e = spec
+        v = self._eval(e, params)
+        if typ == "sequence":
+            r.cs_step, r.cs_left, r.cs_to = v, max(term, 0), None
+            return
+        target = v if typ == "absolute" else r.spd + v
+        term = max(term, 1)
+        r.cs_step, r.cs_left, r.cs_to = (target - r.spd) / term, term, target
+
+    def _fire(self, r, fire, params, x, y, bullets, ctx):
+        dspec, sspec, b = fire
+        if b[0] == "ref":
+            bparams = tuple(self._eval(e, params) for e in b[2])
+            bdef = self.doc["bullets"][b[1]]
+        else:
+            bparams, bdef = params, b[1]
+        bdir, bspd, actions = bdef
+        # fire の direction/speed が bullet のものより優先（式はそれぞれの params で評価）
+        if dspec is None and bdir is not None:
+            dspec, dparams = bdir, bparams
+        else:
+            dparams = params
+        if sspec is None and bspd is not None:
+            sspec, sparams = bspd, bparams
+        else:
+            sparams = params
+
+        if dspec is None:
+            d = self._aim(x, y, ctx)
+        else:
+            typ, e = dspec
+            v = self._eval(e, dparams)
+            if typ == "aim":
+                d = self._aim(x, y, ctx) + v
+            elif typ == "absolute":
+                d = v
+            elif typ == "relative":
+                d = r.dir + v
+            else:
+                d = r.prev_dir + v
+        if sspec is None:
+            s = 1.0
+        else:
+            typ, e = sspec
+            v = self._eval(e, sparams)
+            s = v if typ == "absolute" else (r.spd if typ == "relative" else r.prev_spd) + v
+        r.prev_dir, r.prev_spd = d, s
+
+        vx, vy = self._velocity(d, s)
+        if not actions:
+            bullets.spawn(x, y, vx, vy, r=1, c=self.color)
+            return
+        h = bullets.spawn(x, y, vx, vy, r=1, c=self.color_shell)
+        if h is not None:
+            self.runners.append(_Runner(bullets.ref(h), actions, bparams, d, s))
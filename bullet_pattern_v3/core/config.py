@@ -0,0 +1,355 @@
+# config.py
+# パターン定義（data/patterns_demo.json の "patterns"）とステージ（data/stage01.json）の検証。
+# 読み込み時に全部を1回だけ調べ、パターンは型をそろえて既定値を埋めた読み取り専用の PatternConfig にする。
+# 間違いは1つ目で止めずに全部集め、PatternConfigError / StageConfigError でまとめて出す。
+#
+# フィールドは (名前, 種類, 既定値[, 下限[, 上限]]) で書く。既定値が REQUIRED なら必須、None なら省略（null）可。
+# 種類は INT / FLOAT / BOOL / STR、選択肢のタプル、入れ子の STEPS / CHILD / CODE。
+# 定義にないキーも（綴り間違いを拾うため）エラーにする。
+# 割る数・回数・フレーム数には下限を付け、実行中に落ちる（0 で割る・撃つ数が 0 以下など）値はここで弾く。
+
+import os
+from types import MappingProxyType
+from .paths import resolve
+
+INT, FLOAT, BOOL, STR = "int", "float", "bool", "str"
+STEPS, CHILD, CODE = "steps", "child", "code"
+
+class _Required:
+    def __repr__(self):
+        return "REQUIRED"
+
+REQUIRED = _Required()
+
+ANGLE_MODES = ("aim", "fixed")
+COLOR = (0, 15)   # pyxel の色番号
+
+SCHEMA = {
+    "circular": (
+        ("bullet_speed", FLOAT, REQUIRED), ("count", INT, REQUIRED, 1),
+        ("spread_deg", FLOAT, 360.0), ("cooldown", INT, 30, 0),
+    ),
+    "aimed": (
+        ("bullet_speed", FLOAT, REQUIRED), ("count", INT, REQUIRED, 0), ("interval", INT, 5, 1),
+    ),
+    "spinner": (
+        ("bullet_speed", FLOAT, REQUIRED), ("count", INT, REQUIRED, 1),
+        ("angular_speed_deg", FLOAT, 3.0), ("cooldown", INT, 3, 0),
+    ),
+    "rolling_fire": (
+        ("speed_final", FLOAT, 3.0), ("pre_wait", INT, 40, 0), ("turn_rel_deg", FLOAT, -90.0),
+        ("turn_term", INT, 4, 0), ("accel_term", INT, 4, 0), ("micro_wait", INT, 4, 0), ("seq_deg", FLOAT, 15.0),
+        ("post_wait", INT, 80, 0), ("fire_interval", INT, 1, 0), ("life", INT, 360, 0),
+        ("rand_wait_amplitude", INT, 20, 0), ("seed", INT, 0),
+    ),
+    "homing_laser": (
+        ("base_spread_deg", FLOAT, 120.0), ("repeats", INT, 8, 1), ("cluster", INT, 9, 1),
+        ("interval_in_cluster", INT, 1, 1), ("wait_between", INT, 10, 0),
+        ("slow_speed", FLOAT, 2.0), ("slow_term", INT, 30, 0), ("coast_wait", INT, 100, 0),
+        ("fast_speed", FLOAT, 5.0), ("fast_term", INT, 100, 0),
+        ("aim_term", INT, 60, 1), ("aim_step_max_deg", FLOAT, 6.0), ("seed", INT, 0),
+    ),
+    "circle_fire": (
+        ("ring_count", INT, 18, 1), ("step_deg", FLOAT, 20.0), ("shell_speed", FLOAT, 6.0),
+        ("shell_delay", INT, 3, 0), ("child_abs_deg", FLOAT, None), ("child_speed", FLOAT, 1.5),
+        ("color_shell", INT, 10, *COLOR), ("color_child", INT, 8, *COLOR), ("seed", INT, 0),
+    ),
+    "nway_aimed": (
+        ("bullet_speed", FLOAT, 0.5), ("ways", INT, 5, 2), ("spread_deg", FLOAT, 40.0),
+        ("cooldown", INT, 20, 0), ("color", INT, 10, *COLOR),
+    ),
+    "two_split": (
+        ("initial_speed", FLOAT, 1.0), ("initial_offset_deg", FLOAT, 8.0), ("travel_frames", INT, 12, 1),
+        ("child_speed", FLOAT, 1.2), ("child_fan_deg", FLOAT, 30.0), ("cooldown", INT, 45, 0),
+        ("color_parent", INT, 11, *COLOR), ("color_child", INT, 14, *COLOR),
+        ("aimed", BOOL, True), ("seed", INT, 0),
+    ),
+    "gravity": (
+        ("rate", INT, 10, 1), ("speed0", FLOAT, 1.2), ("angle_mode", ANGLE_MODES, "aim"),
+        ("fixed_deg", FLOAT, 90.0), ("g", FLOAT, 0.03), ("grav_mode", ("attract", "repel"), "attract"),
+        ("max_speed", FLOAT, 2.5), ("color", INT, 12, *COLOR), ("life", INT, -1),
+    ),
+    "speed_change": (
+        ("rate", INT, 12, 1), ("speed0", FLOAT, 1.5), ("angle_mode", ANGLE_MODES, "aim"),
+        ("fixed_deg", FLOAT, 90.0), ("steps", STEPS, None), ("color", INT, 9, *COLOR), ("life", INT, -1),
+    ),
+    "proximity_burst": (
+        ("rate", INT, 20, 1), ("approach_speed", FLOAT, 1.0), ("angle_mode", ANGLE_MODES, "aim"),
+        ("fixed_deg", FLOAT, 90.0), ("radius", FLOAT, 18.0, 0), ("child", CHILD, None),
+        ("once", BOOL, True), ("color_parent", INT, 11, *COLOR), ("life", INT, -1),
+    ),
+    "bulletml": (
+        ("file", STR, REQUIRED), ("rank", FLOAT, 0.5, 0, 1), ("seed", INT, 0),
+        ("speed_scale", FLOAT, 1.0), ("color", INT, 8, *COLOR), ("color_shell", INT, None, *COLOR),
+        ("loop", BOOL, False),
+    ),
+    "program": (
+        ("code", CODE, REQUIRED),
+    ),
+}
+
+# proximity_burst の child に書けるキー
+CHILD_FIELDS = (("count", INT, 12, 1), ("speed", FLOAT, 1.2), ("color", INT, 10, *COLOR))
+# ステージの敵と台本のコマンド
+ENEMY_FIELDS = (("x", FLOAT, REQUIRED), ("y", FLOAT, REQUIRED), ("hp", INT, 1), ("spawn_frame", INT, 0, 0))
+STAGE_CMDS = ("use", "stop")
+
+class ConfigError(ValueError):
+    """データの間違い。errors は "場所: 内容" の文字列のリスト"""
+    title = "invalid data"
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__(f"{self.title}:\n  " + "\n  ".join(self.errors))
+
+class PatternConfigError(ConfigError):
+    title = "invalid pattern(s)"
+
+class StageConfigError(ConfigError):
+    title = "invalid stage"
+
+class PatternConfig:
+    """
+    検証済みのパターン定義（読み取り専用）。種類ごとのサブクラス（CONFIG_TYPES）がフィールドを属性で持つ。
+    値は型をそろえて既定値を埋めたもので、入れ子の list / dict もタプルと読み取り専用の dict にしてある
+    """
+    __slots__ = ("name",)
+    type = None
+    fields = ()
+    nested = frozenset()   # 読み取り専用の dict を含むフィールドの番号
+
+    def __init__(self, name, values):
+        object.__setattr__(self, "name", name)
+        for key, v in values.items():
+            object.__setattr__(self, key, v)
+
+    def __setattr__(self, key, v):
+        raise AttributeError(f"{self.type} config {self.name!r} is read-only")
+
+    __delattr__ = __setattr__
+
+    def params(self):
+        """フィールドの {名前: 値}（パターンのクラスへのキーワード引数）"""
+        return {f[0]: getattr(self, f[0]) for f in self.fields}
+
+    def as_dict(self):
+        """元の JSON と同じ形の dict（"type" 付き、既定値込み）"""
+        return {"type": self.type, **self.params()}
+
+    def __repr__(self):
+        args = ", ".join(f"{k}={v!r}" for k, v in self.params().items())
+        return f"{type(self).__name__}({self.name!r}, {args})"
+
+    def __reduce__(self):
+        # 種類ごとのクラスは動的に作るので、pickle には種類名とフィールド順の値で渡す（datacache 用）。
+        # 読み取り専用の dict（steps / child）は pickle できないので素の dict にしておき、戻すときに包み直す
+        values = tuple(getattr(self, f[0]) for f in self.fields)
+        if self.nested:
+            values = tuple(_thaw(v) if k in self.nested else v for k, v in enumerate(values))
+        return _restore, (self.type, self.name, values)
+
+def _thaw(v):
+    if isinstance(v, MappingProxyType):
+        return dict(v)
+    if isinstance(v, tuple):
+        return tuple(_thaw(x) for x in v)
+    return v
+
+def _freeze(v):
+    if isinstance(v, dict):
+        return MappingProxyType(v)
+    if isinstance(v, tuple):
+        return tuple(_freeze(x) for x in v)
+    return v
+
+def _restore(typ, name, values):
+    cls = CONFIG_TYPES[typ]
+    c = object.__new__(cls)
+    set_ = object.__setattr__
+    set_(c, "name", name)
+    for k, (key, v) in enumerate(zip(cls.__slots__, values)):
+        set_(c, key, _freeze(v) if k in cls.nested else v)
+    return c
+
+def _config_class(typ, fields):
+    name = "".join(w.title() for w in typ.split("_")) + "Config"
+    nested = frozenset(k for k, f in enumerate(fields) if f[1] in (STEPS, CHILD))
+    return type(name, (PatternConfig,), {"__slots__": tuple(f[0] for f in fields), "type": typ,
+                                         "fields": fields, "nested": nested})
+
+CONFIG_TYPES = {typ: _config_class(typ, fields) for typ, fields in SCHEMA.items()}
+
+def _number(v, kind, lo=None, hi=None):
+    """v を kind（INT / FLOAT）にそろえる。合わなければ ValueError"""
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        raise ValueError(f"expected {kind}, got {v!r}")
+    if kind == INT:
+        if isinstance(v, float) and not v.is_integer():
+            raise ValueError(f"expected int, got {v!r}")
+        v = int(v)
+    else:
+        v = float(v)
+    if lo is not None and v < lo:
+        raise ValueError(f"must be >= {lo}, got {v!r}")
+    if hi is not None and v > hi:
+        raise ValueError(f"must be <= {hi}, got {v!r}")
+    return v
+
+def _record(v, fields, where, errors, required=False):
+    """入れ子の dict を fields で調べて読み取り専用の dict にする（書いてないキーは足さない）"""
+    if not isinstance(v, dict):
+        errors.append(f"{where}: expected an object, got {v!r}")
+        return None
+    known = {f[0] for f in fields}
+    for key in v:
+        if key not in known:
+            errors.append(f"{where}.{key}: unknown field")
+    out = {}
+    for key, kind, _, *lim in fields:
+        if key not in v:
+            if required:
+                errors.append(f"{where}.{key}: missing")
+            continue
+        try:
+            out[key] = _number(v[key], kind, *lim)
+        except ValueError as e:
+            errors.append(f"{where}.{key}: {e}")
+    return MappingProxyType(out)
+
+def _value(v, kind, lim, where, errors):
+    if kind in (INT, FLOAT):
+        return _number(v, kind, *lim)
+    if kind == BOOL:
+        if not isinstance(v, bool):
+            raise ValueError(f"expected true/false, got {v!r}")
+        return v
+    if kind == STR:
+        if not isinstance(v, str):
+            raise ValueError(f"expected a string, got {v!r}")
+        return v
+    if isinstance(kind, tuple):
+        if v not in kind:
+            raise ValueError(f"expected one of {', '.join(kind)}, got {v!r}")
+        return v
+    if kind == STEPS:
+        if not isinstance(v, list):
+            raise ValueError(f"expected a list of {{at, speed}}, got {v!r}")
+        return tuple(_record(s, (("at", INT, 0, 0), ("speed", FLOAT, 0.0, 0)), f"{where}[{k}]", errors, True)
+                     for k, s in enumerate(v))
+    if kind == CHILD:
+        return _record(v, CHILD_FIELDS, where, errors)
+    if kind == CODE:
+        # 命令の中身は vm.assemble が調べる。ここでは [名前, 引数...] の形だけ
+        if not isinstance(v, list) or not v:
+            raise ValueError(f"expected a non-empty list of instructions, got {v!r}")
+        for k, ins in enumerate(v):
+            if not isinstance(ins, list) or not ins or not isinstance(ins[0], str):
+                raise ValueError(f"[{k}]: expected [op, args...], got {ins!r}")
+        return tuple(tuple(ins) for ins in v)
+    raise AssertionError(kind)
+
+def validate_pattern(name, cfg, errors):
+    """1つの定義を PatternConfig にする。間違いは errors に足して None"""
+    if not isinstance(cfg, dict):
+        errors.append(f"{name}: expected an object, got {cfg!r}")
+        return None
+    typ = cfg.get("type")
+    cls = CONFIG_TYPES.get(typ)
+    if cls is None:
+        errors.append(f"{name}.type: unknown pattern type {typ!r} (one of {', '.join(SCHEMA)})")
+        return None
+    n_err = len(errors)
+    known = {f[0] for f in cls.fields}
+    for key in cfg:
+        if key != "type" and key not in known:
+            errors.append(f"{name}.{key}: unknown field for {typ}")
+    values = {}
+    for key, kind, default, *lim in cls.fields:
+        where = f"{name}.{key}"
+        v = cfg.get(key)
+        if v is None:
+            if default is REQUIRED:
+                errors.append(f"{where}: missing")
+            values[key] = default
+            continue
+        try:
+            values[key] = _value(v, kind, lim, where, errors)
+        except ValueError as e:
+            errors.append(f"{where}: {e}")
+    if typ == "bulletml" and isinstance(values["file"], str) and not os.path.isfile(resolve(values["file"])):
+        errors.append(f"{name}.file: no such file {values['file']!r}")
+    if len(errors) > n_err:
+        return None
+    return cls(name, values)
+
+def validate_patterns(patterns):
+    """{名前: 定義} を全部調べて {名前: PatternConfig}。間違いがあれば全部まとめて PatternConfigError"""
+    errors = []
+    out = {name: validate_pattern(name, cfg, errors) for name, cfg in patterns.items()}
+    if errors:
+        raise PatternConfigError(errors)
+    return out
+
+def _fields(v, fields, where, errors):
+    """dict v の数値のフィールドを fields で調べる（未知のキー・欠け・型の間違いを errors へ）"""
+    known = {f[0] for f in fields}
+    for key in v:
+        if key not in known:
+            errors.append(f"{where}.{key}: unknown field")
+    for key, kind, default, *lim in fields:
+        if key not in v:
+            if default is REQUIRED:
+                errors.append(f"{where}.{key}: missing")
+            continue
+        try:
+            _number(v[key], kind, *lim)
+        except ValueError as e:
+            errors.append(f"{where}.{key}: {e}")
+
+def validate_stage(stage):
+    """
+    ステージの形を調べ、台本が使うパターン名を（最初に出てきた順の）タプルで返す。
+    ステージの dict はそのまま使うので書き換えない。間違いは全部まとめて StageConfigError
+    """
+    errors = []
+    uses = {}
+    enemies = stage.get("enemies") if isinstance(stage, dict) else None
+    if not isinstance(enemies, list):
+        raise StageConfigError([f"enemies: expected a list, got {enemies!r}"])
+    for k, e in enumerate(enemies):
+        where = f"enemies[{k}]"
+        if not isinstance(e, dict):
+            errors.append(f"{where}: expected an object, got {e!r}")
+            continue
+        script = e.get("script")
+        _fields({key: v for key, v in e.items() if key != "script"}, ENEMY_FIELDS, where, errors)
+        if not isinstance(script, list):
+            errors.append(f"{where}.script: expected a list, got {script!r}")
+            continue
+        for j, c in enumerate(script):
+            cw = f"{where}.script[{j}]"
+            if not isinstance(c, dict):
+                errors.append(f"{cw}: expected an object, got {c!r}")
+                continue
+            cmd = c.get("cmd")
+            if cmd not in STAGE_CMDS:
+                errors.append(f"{cw}.cmd: expected one of {', '.join(STAGE_CMDS)}, got {cmd!r}")
+                continue
+            _fields({key: v for key, v in c.items() if key not in ("cmd", "pattern")},
+                    (("at", INT, REQUIRED, 0),), cw, errors)
+            if cmd == "use":
+                name = c.get("pattern")
+                if not isinstance(name, str):
+                    errors.append(f"{cw}.pattern: expected a pattern name, got {name!r}")
+                else:
+                    uses.setdefault(name)
+            elif "pattern" in c:
+                errors.append(f"{cw}.pattern: unknown field for stop")
+    if errors:
+        raise StageConfigError(errors)
+    return tuple(uses)
+
+def check_uses(uses, patterns):
+    """台本が使うパターン名 uses がすべて patterns にあるか（無ければ StageConfigError）"""
+    missing = [name for name in uses if name not in patterns]
+    if missing:
+        raise StageConfigError([f"script uses unknown pattern {name!r}" for name in missing])
@@ -0,0 +1,111 @@
+# datacache.py
+# パターン定義・ステージの JSON を、検証済みの形で pickle にしておく（World を作るたびに JSON を読んで調べ直さない）。
+# キャッシュは CACHE_DIR/<ファイル名>-<パスの sha1 の先頭>.pkl に、元ファイルの (mtime_ns, size)・中身の sha1 と一緒に置く。
+#   - (mtime_ns, size) が記録と同じなら、JSON を開かずにキャッシュを使う
+#   - 違えば中身を読んで sha1 を比べ、同じなら（触っただけ）記録を更新してキャッシュを使う
+#   - 中身が変わっていれば読み直して検証し、キャッシュを書き直す
+# 同じプロセスの中では結果をメモリにも持つので、2回目からは stat 1回で済む（R / SPACE で World を作り直すとき）。
+# 検証の規則（config.py）やキャッシュの形を変えたら、KEY が変わって古いキャッシュは使われない。
+
+import hashlib
+import json
+import os
+import pickle
+from . import config
+from .config import check_uses, validate_stage
+from .paths import PATTERNS_PATH, STAGE_PATH, data_path
+from .patterns import PatternFactory
+
+CACHE_DIR = data_path("cache", "compiled")
+VERSION = 1   # キャッシュの形を変えたら上げる
+# 検証の規則が変わったら別のキャッシュになるように、スキーマの中身もキーに入れる
+KEY = f"v{VERSION}-" + hashlib.sha1(repr((config.SCHEMA, config.CHILD_FIELDS, config.ENEMY_FIELDS,
+                                          config.STAGE_CMDS)).encode("utf-8")).hexdigest()[:12]
+
+_memo = {}   # 元ファイルのパス -> ((mtime_ns, size), 結果)
+
+def _sig(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def _cache_path(path, cache_dir):
+    name = os.path.splitext(os.path.basename(path))[0]
+    tag = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{name}-{tag}.pkl")
+
+def read_cache(cpath, key=KEY):
+    """cpath の pickle（{"key": ..., ...} の dict）を返す。無い・壊れている・key が違うなら None"""
+    try:
+        with open(cpath, "rb") as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # 壊れた・読めないキャッシュは無いものとして作り直す
+        print(f"datacache: ignoring {cpath}: {type(e).__name__}: {e}")
+        return None
+    if not isinstance(entry, dict) or entry.get("key") != key:
+        return None
+    return entry
+
+def write_cache(cpath, entry):
+    """entry を cpath へ pickle で書く（一時ファイルから置き換えるので、読む側が途中の中身を見ない）"""
+    try:
+        os.makedirs(os.path.dirname(cpath), exist_ok=True)
+        tmp = f"{cpath}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cpath)
+    except OSError as e:
+        # 書けなくても（読み取り専用の置き場所など）毎回読み直すだけ
+        print(f"datacache: cannot write {cpath}: {e}")
+
+def load_compiled(path, compile, cache_dir=CACHE_DIR):
+    """
+    JSON ファイル path を読んで compile(doc) した結果を返す（上の手順でキャッシュを使う）。
+    compile は検証も兼ね、間違いは例外で知らせる（そのときはキャッシュを書かない）。
+    結果は呼び出し元の間で共有するので書き換えないこと。cache_dir が None ならメモリにだけ持つ
+    """
+    sig = _sig(path)
+    hit = _memo.get(path)
+    if hit is not None and hit[0] == sig:
+        return hit[1]
+    cpath = _cache_path(path, cache_dir) if cache_dir else None
+    entry = read_cache(cpath) if cpath else None
+    if entry is not None and entry["sig"] == sig:
+        out = entry["out"]
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha1(data).hexdigest()
+        if entry is not None and entry["sha1"] == digest:
+            out = entry["out"]
+        else:
+            out = compile(json.loads(data.decode("utf-8")))
+        if cpath:
+            write_cache(cpath, {"key": KEY, "sig": sig, "sha1": digest, "out": out})
+    _memo[path] = (sig, out)
+    return out
+
+def _compile_patterns(doc):
+    patterns = doc["patterns"]
+    # プロトタイプまで作れたものだけ置く（命令列の間違いもここで出る）
+    return {"patterns": patterns, "configs": PatternFactory(patterns).configs}
+
+def _compile_stage(doc):
+    return {"stage": doc, "uses": validate_stage(doc)}
+
+def load_patterns(path=PATTERNS_PATH, cache_dir=CACHE_DIR):
+    """
+    パターン定義ファイルの ("patterns" の中身, 検証済みの {名前: PatternConfig}) を返す。
+    中身の dict は World が書き換えるので、呼ぶたびに新しい dict（値の定義は共有）
+    """
+    out = load_compiled(path, _compile_patterns, cache_dir)
+    return dict(out["patterns"]), out["configs"]
+
+def load_stage(path=STAGE_PATH, patterns=None, cache_dir=CACHE_DIR):
+    """ステージファイルの dict を返す（共有なので書き換えないこと）。patterns を渡せば台本のパターン名も確かめる"""
+    out = load_compiled(path, _compile_stage, cache_dir)
+    if patterns is not None:
+        check_uses(out["uses"], patterns)
+    return out["stage"]
@@ -1,17 +1,58 @@
 import math
-from .patterns import PatternFactory
+from .patterns import PatternFactory, VMPattern
 
 # emitter.py（一例）
 class Emitter:
-    def __init__(self, x, y, bullets, patterns_data, factory=None):
+    def __init__(self, x, y, bullets, patterns_data, factory=None, vm=None):
         self.x, self.y = x, y
         self.bullets = bullets
         self.patterns_data = patterns_data
         self.factory = factory or PatternFactory(patterns_data)
         self.active = None
         self.active_name = None  # 追加：現在のパターン名を覚える
+        # vm: 共有の PatternVM。命令列のパターンはそこに載せ、全 Emitter 分まとめて進めてもらう
+        self.vm = vm
+        self.vm_slot = None
+
+    def _detach(self):
+        if self.vm_slot is not None:
+            self.vm.detach(self.vm_slot)
+            self.vm_slot = None
+
+    def _attach(self):
+        if self.vm is not None and isinstance(self.active, VMPattern):
+            self.vm_slot = self.vm.attach(self, self.active.program)
+
+    def stop(self):
+        """弾を消さずに止める"""
+        self._detach()
+        self.active = None
+        self.active_name = None
+
+    def reload_pattern(self):
+        """
+        今のパターンを factory の定義から作り直して最初から撃ち直す（弾は消さない）。
+        定義を書き換えたときの差し替え用。定義が消えていれば止める
+        """
+        name = self.active_name
+        if name is None:
+            return
+        if name not in self.factory.data:
+            self.stop()
+            return
+        self._detach()
+        self.active = self.factory.make(name)
+        self._attach()
 
     def set_pattern(self, name: str):
+        self._detach()
+        # None は停止（タイムラインの "stop"）
+        if name is None:
+            self.active = None
+            self.active_name = None
+            self.bullets.clear_all()
+            return
+
         # すでに同じパターンなら「トグルOFF（停止）」にする
         if self.active_name == name and self.active is not None:
             self.active = None
@@ -25,10 +66,11 @@ class Emitter:
         self.bullets.clear_all()
         self.active = self.factory.make(name)  # Circular / AimedBurst / Spinner を生成
         self.active_name = name
+        self._attach()
 
     def update(self, ctx):
-        # パターン未設定 or 停止中
-        if self.active is None:
+        # パターン未設定 or 停止中（PatternVM に載っているパターンは World がまとめて進める）
+        if self.active is None or self.vm_slot is not None:
             return
         # 現在パターンの1フレーム分を実行（必要なら弾をspawn）
         self.active.update_and_fire(self, ctx)
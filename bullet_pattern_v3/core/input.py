@@ -0,0 +1,52 @@
+# input.py
+# 入力の取得元。Player / PatternMenu / World はここ経由でキーとマウスを読むので、
+# ウィンドウのない環境（ヘッドレス実行・計測）では NullInput に差し替えられる。
+# World は毎フレーム頭で begin_frame(t) を呼び、メニューで決まったパターン名を select() に通す
+# （記録・再生用の入力は core/record.py）。
+
+import pyxel
+
+class PyxelInput:
+    """Pyxel の入力をそのまま返す（通常プレイ用）"""
+    def begin_frame(self, t):
+        pass
+
+    def select(self, decided):
+        return decided
+
+    def btn(self, key):
+        return pyxel.btn(key)
+
+    def btnp(self, key):
+        return pyxel.btnp(key)
+
+    def btnr(self, key):
+        return pyxel.btnr(key)
+
+    @property
+    def mouse_x(self):
+        return pyxel.mouse_x
+
+    @property
+    def mouse_y(self):
+        return pyxel.mouse_y
+
+class NullInput:
+    """何も押されていない入力（マウスは画面外）"""
+    mouse_x = -1
+    mouse_y = -1
+
+    def begin_frame(self, t):
+        pass
+
+    def select(self, decided):
+        return decided
+
+    def btn(self, key):
+        return False
+
+    def btnp(self, key):
+        return False
+
+    def btnr(self, key):
+        return False
@@ -0,0 +1,100 @@
+# loop.py
+# 固定ステップのゲームループ補助と、負荷が高いときの段階的な手抜き（デグレード）。
+# FixedStep は前回からの経過時間ぶんだけ World.update を回す（1 tick あたり max_steps まで）。
+# Degrader は update の処理時間が予算を超え続けたら 描画の間引き → 新しい弾の間引き の順に段を上げ、
+# 余裕が続けば段を戻す。
+
+import time
+
+class FixedStep:
+    """
+    fps       : シミュレーションの歩幅（1ステップ = 1/fps 秒）
+    max_steps : 1 tick で回す最大ステップ数。これを超える遅れは捨てる（その分だけスローになる）
+    slack     : 歩幅よりこの割合だけ短い経過でも1ステップ回す（tick の揺れで 0 回/2 回と振れないように）
+    """
+    def __init__(self, fps=60, max_steps=4, slack=0.25, clock=time.perf_counter):
+        self.step = 1.0 / fps
+        self.max_steps = max_steps
+        self.slack = self.step * slack
+        self.clock = clock
+        self.acc = 0.0
+        self.last = None
+        self.dropped = 0.0   # 追いつけずに捨てた時間（秒）
+
+    def reset(self):
+        self.acc = 0.0
+        self.last = None
+
+    def advance(self, update):
+        """前回の advance からの経過時間ぶん update を回し、各ステップの処理時間（秒）の列を返す"""
+        clock = self.clock
+        now = clock()
+        if self.last is None:
+            self.last = now - self.step   # 初回は1ステップ
+        self.acc += now - self.last
+        self.last = now
+        costs = []
+        while self.acc >= self.step - self.slack and len(costs) < self.max_steps:
+            t0 = clock()
+            update()
+            costs.append(clock() - t0)
+            self.acc -= self.step
+        if self.acc >= self.step:
+            # 追いつけない遅れは捨てて、端数だけ持ち越す
+            extra = self.acc - self.acc % self.step
+            self.dropped += extra
+            self.acc -= extra
+        return costs
+
+class Degrader:
+    """
+    budget_ms      : 1ステップの update に使ってよい時間
+    engage_after   : 予算超えがこのステップ数続いたら1段上げる
+    recover_after  : 予算の recover_ratio 倍未満がこのステップ数続いたら1段戻す
+    thin           : 段 2 で新しい弾を何発に1発にするか
+    段 0: 通常 / 1: 描画を1フレームおき / 2: 描画1フレームおき + 新しい弾の間引き
+    """
+    LEVELS = ("normal", "skip draw", "thin spawns")
+
+    def __init__(self, budget_ms=8.0, engage_after=30, recover_after=180, recover_ratio=0.6, thin=2):
+        self.budget_ms = budget_ms
+        self.engage_after = engage_after
+        self.recover_after = recover_after
+        self.recover_ratio = recover_ratio
+        self.thin_n = thin
+        self.level = 0
+        self.over = 0     # 予算超えが続いているステップ数
+        self.under = 0    # 余裕が続いているステップ数
+        self._draws = 0
+
+    def feed(self, cost_ms):
+        """1ステップ分の update の処理時間を渡す。段が変わったら True"""
+        if cost_ms > self.budget_ms:
+            self.over += 1
+            self.under = 0
+            if self.over >= self.engage_after and self.level < len(self.LEVELS) - 1:
+                self.level += 1
+                self.over = 0
+                return True
+        elif cost_ms < self.budget_ms * self.recover_ratio:
+            self.under += 1
+            self.over = 0
+            if self.under >= self.recover_after and self.level > 0:
+                self.level -= 1
+                self.under = 0
+                return True
+        else:
+            self.over = self.under = 0
+        return False
+
+    def should_draw(self):
+        """この tick で描画するか（段 1 以上では1回おき）"""
+        if self.level < 1:
+            return True
+        self._draws += 1
+        return self._draws % 2 == 1
+
+    @property
+    def thin(self):
+        """BulletSystem.thin に入れる値"""
+        return self.thin_n if self.level >= 2 else 1
@@ -0,0 +1,17 @@
+# paths.py
+# データファイルの場所。カレントディレクトリではなく、このパッケージ（bullet_pattern_v3/）からの相対で解決する。
+# パターン定義の "file" など、データの中に書く相対パスも ROOT からとみなす。
+
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def resolve(path):
+    """相対パスを ROOT からのパスにする（絶対パスはそのまま）"""
+    return os.path.join(ROOT, path)
+
+def data_path(*parts):
+    return os.path.join(ROOT, "data", *parts)
+
+PATTERNS_PATH = data_path("patterns_demo.json")
+STAGE_PATH = data_path("stage01.json")
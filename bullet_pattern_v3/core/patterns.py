@@ -1,11 +1,63 @@
 import math
+import random
+from functools import lru_cache
+import numpy as np
+from .behavior import AFTER, NEAR, Action, Gravity, SpeedSchedule
+from .config import PatternConfigError, validate_pattern
+from .vm import PatternVM, compile_pattern
 
 def deg2rad(d): return d * math.pi / 180.0
 
+def ring_velocities(angles_deg, speed):
+    """角度（度）の配列から速度ベクトル (vx, vy) の配列を作る"""
+    a = np.asarray(angles_deg, dtype=np.float64) * (math.pi / 180.0)
+    return np.cos(a) * speed, np.sin(a) * speed
+
+@lru_cache(maxsize=128)
+def unit_ring(count, spread_deg=360.0, start_deg=0.0):
+    """
+    start_deg から spread_deg/count 刻みで count 方向の単位ベクトル表 (ux, uy)。
+    パターン間で共有するので読み取り専用（書き換えずに掛け算して使う）
+    """
+    ux, uy = ring_velocities(start_deg + np.arange(count) * (spread_deg / count), 1.0)
+    ux.flags.writeable = False
+    uy.flags.writeable = False
+    return ux, uy
+
+def rotated(ux, uy, deg):
+    """単位ベクトル表を deg 度回転した (ux, uy)（三角関数は1回分だけ）"""
+    a = deg2rad(deg)
+    cb, sb = math.cos(a), math.sin(a)
+    return ux*cb - uy*sb, ux*sb + uy*cb
+
+def rng_from_state(state):
+    """getstate() の状態から random.Random を作る（copy.copy は一度 OS から種を取るので遅い）"""
+    r = random.Random.__new__(random.Random)
+    r.setstate(state)
+    return r
+
 class BasePattern:
+    _rng_state = None
+
     def update_and_fire(self, emitter, ctx):
         raise NotImplementedError
 
+    def clone(self):
+        """
+        作ったばかりの（まだ撃っていない）このパターンと同じ状態の別インスタンス。
+        撃つ間に書き換わるのは数値の属性と乱数だけなので、属性は浅くコピーして乱数だけ状態ごと複製する
+        （方向表・Action・ふるまいなどは共有）
+        """
+        c = object.__new__(type(self))
+        c.__dict__.update(self.__dict__)
+        if "rng" in c.__dict__:
+            # 複製元（プロトタイプ）の乱数は進まないので、遅い getstate は1回だけにする
+            if self._rng_state is None:
+                self._rng_state = self.rng.getstate()
+            c.rng = rng_from_state(self._rng_state)
+            c._rng_state = None
+        return c
+
 class Circular(BasePattern):
     def __init__(self, speed, count, spread_deg=360, cooldown=30):
         self.speed = speed; self.count = count
@@ -15,11 +67,9 @@ class Circular(BasePattern):
     def update_and_fire(self, em, ctx):
         if self.timer > 0:
             self.timer -= 1; return
-        start = 0.0
-        step = self.spread / self.count
-        for i in range(self.count):
-            a = deg2rad(start + i*step)
-            em.bullets.spawn(em.x, em.y, math.cos(a)*self.speed, math.sin(a)*self.speed, r=1, c=10)
+        # 角度は毎回同じなので方向表をそのまま使う
+        ux, uy = unit_ring(self.count, self.spread, 0.0)
+        em.bullets.spawn_many(em.x, em.y, ux*self.speed, uy*self.speed, r=1, c=10)
         self.timer = self.cd
 
 class AimedBurst(BasePattern):
@@ -47,10 +97,9 @@ class Spinner(BasePattern):
     def update_and_fire(self, em, ctx):
         if self.timer > 0:
             self.timer -= 1; self.base += self.w; return
-        step = 360 / self.count
-        for i in range(self.count):
-            a = deg2rad(self.base + i*step)
-            em.bullets.spawn(em.x, em.y, math.cos(a)*self.speed, math.sin(a)*self.speed, r=1, c=9)
+        # 基準角 0 の方向表を base だけ回す
+        ux, uy = rotated(*unit_ring(self.count, 360, 0.0), self.base)
+        em.bullets.spawn_many(em.x, em.y, ux*self.speed, uy*self.speed, r=1, c=9)
         self.base += self.w
         self.timer = self.cd
 
@@ -269,9 +318,9 @@ class CircleFireApprox(BasePattern):
         - “外殻” bullet: speed=6 で飛び、3f後に
           その位置から “子弾” を absolute=$2, speed=1.5+$rank で発射、親は消える
       - top で子弾の絶対角 $2 を 180-45+90*$rand に決定
-    近似方針:
-      - 親弾の移動は弾クラスを使わず、パターン内部で「3f後の位置 = 発射点 + 速度*3」で子弾を直接spawn
-      - これで “リングから子弾が生まれる”見た目を再現
+    実装:
+      - 外殻に AFTER アクション（shell_delay フレーム後に子弾1発を撃って消える）を付けて撃つだけ
+      - 子弾は外殻のその時点の実際の位置から出る
     参照: [Guwange]_round_2_boss_circle_fire.xml
     """
     def __init__(self,
@@ -295,13 +344,12 @@ class CircleFireApprox(BasePattern):
 
         self.color_shell = color_shell
         self.color_child = color_child
+        self.action = Action(AFTER, frames=shell_delay, count=1, speed=child_speed, color=color_child,
+                             angle_deg=self.child_abs, vanish=True)
 
         # 角度シーケンスの基準（開始角は0でOK）
         self.base = 0.0
 
-        # “3f後に子弾を撃つべき位置”を積むキュー: (fire_frame, x, y)
-        self.queue = []
-
         # 一周したら終了
         self.done = False
 
@@ -311,31 +359,15 @@ class CircleFireApprox(BasePattern):
             em.active_name = None
             return
 
-        # 1周ぶんの外殻を瞬間生成し、子弾予定をキューに積む
+        # 1周ぶんの外殻を瞬間生成（子弾は外殻のアクションが撃つ。absolute=self.child_abs）
         if self.t == 0:
-            for i in range(self.ring_count):
-                ang = self.base + i * self.step_deg
-                a = deg2rad(ang)
-                # 外殻の見栄え（任意）：点を置いて視覚的にリングを出す
-                em.bullets.spawn(em.x, em.y, math.cos(a)*self.shell_speed, math.sin(a)*self.shell_speed, r=1, c=self.color_shell)
-                # shell_delay フレーム後の位置を計算して、そこで子弾を撃つ
-                x2 = em.x + math.cos(a) * self.shell_speed * self.shell_delay
-                y2 = em.y + math.sin(a) * self.shell_speed * self.shell_delay
-                self.queue.append((self.t + self.shell_delay, x2, y2))
-
-        # 子弾の射出：予定時刻に到達したものを発射
-        # （absolute=self.child_abs）
-        while self.queue and self.queue[0][0] <= self.t:
-            _, sx, sy = self.queue.pop(0)
-            ca = deg2rad(self.child_abs)
-            vx, vy = math.cos(ca)*self.child_speed, math.sin(ca)*self.child_speed
-            em.bullets.spawn(sx, sy, vx, vy, r=1, c=self.color_child)
-
-        # 一巡処理が済んだら数フレで終わり
-        if not self.queue:
-            # 余韻を少しだけ与えて終了
-            if self.t > self.shell_delay + 2:
-                self.done = True
+            ux, uy = unit_ring(self.ring_count, self.step_deg * self.ring_count, self.base)
+            vx, vy = ux * self.shell_speed, uy * self.shell_speed
+            em.bullets.spawn_many(em.x, em.y, vx, vy, r=1, c=self.color_shell, action=self.action)
+
+        # 子弾が出たあと、余韻を少しだけ与えて終了
+        if self.t > self.shell_delay + 2:
+            self.done = True
 
         self.t += 1
 
@@ -370,19 +402,14 @@ class AimedNWay(BasePattern):
             start = base - self.spread * 0.5
             angles = [start + i * step for i in range(self.ways)]
 
-        for deg in angles:
-            a = deg2rad(deg)
-            em.bullets.spawn(
-                em.x, em.y,
-                math.cos(a) * self.v, math.sin(a) * self.v,
-                r=1, c=self.color
-            )
+        vx, vy = ring_velocities(angles, self.v)
+        em.bullets.spawn_many(em.x, em.y, vx, vy, r=1, c=self.color)
         self.timer = self.cd
 
 class TwoSplitFanApprox(BasePattern):
     """
-    最初に“親弾2発”を撃ち、一定距離(=travel_frames)直進した位置から
-    親の向き±child_fan_degで“子弾”を左右に分岐させる近似。
+    最初に“親弾2発”を撃ち、travel_frames 後の親の位置から
+    親の向き±child_fan_degで“子弾”を左右に分岐させる（親弾の AFTER アクション）。
     親弾はそのまま飛び続ける（消去はしない）。
     """
     def __init__(self,
@@ -411,9 +438,9 @@ class TwoSplitFanApprox(BasePattern):
         self.cP = color_parent
         self.cC = color_child
         self.aimed = aimed
-
-        # “travel後に子弾を撃つべき座標”を積むキュー: (spawn_frame, x, y, base_angle_deg)
-        self.queue = []
+        # 扇（spread_deg）だと 2*fan が 360 以上で全周等分になるので、±fan を直接渡す
+        self.action = Action(AFTER, frames=self.n_delay, speed=self.vc, color=self.cC,
+                             offsets_deg=(-self.fan, self.fan), direction="relative")
 
     def _base_angle(self, em, ctx):
         if self.aimed:
@@ -424,13 +451,6 @@ class TwoSplitFanApprox(BasePattern):
             return 90.0  # 画面下向き
 
     def update_and_fire(self, em, ctx):
-        # travel後の子弾スポーン処理
-        while self.queue and self.queue[0][0] <= self.t:
-            _, sx, sy, base_deg = self.queue.pop(0)
-            for d in (-self.fan, +self.fan):
-                a = deg2rad(base_deg + d)
-                em.bullets.spawn(sx, sy, math.cos(a)*self.vc, math.sin(a)*self.vc, r=1, c=self.cC)
-
         # クールダウン中なら待つ
         if self.timer > 0:
             self.timer -= 1
@@ -439,15 +459,10 @@ class TwoSplitFanApprox(BasePattern):
 
         # 新しい“2分岐セット”を撃つ
         base = self._base_angle(em, ctx)
-        for sign in (-1, +1):
-            ang = base + sign * self.off
-            a = deg2rad(ang)
-            # 親弾を発射（見た目の“直進”）
-            em.bullets.spawn(em.x, em.y, math.cos(a)*self.v0, math.sin(a)*self.v0, r=1, c=self.cP)
-            # travel_frames 後の位置を計算して、そこから子弾を左右に分岐
-            sx = em.x + math.cos(a) * self.v0 * self.n_delay
-            sy = em.y + math.sin(a) * self.v0 * self.n_delay
-            self.queue.append((self.t + self.n_delay, sx, sy, ang))
+        angs = [base - self.off, base + self.off]
+        vx, vy = ring_velocities(angs, self.v0)
+        # 親弾を発射（travel_frames 後に親1発につき ±fan の2発を分岐させる）
+        em.bullets.spawn_many(em.x, em.y, vx, vy, r=1, c=self.cP, action=self.action)
 
         # 次のセットまで待つ
         self.timer = self.cooldown
@@ -472,6 +487,8 @@ class GravityBullet(BasePattern):
         self.g = float(g)
         self.grav_mode = grav_mode
         self.max_speed = float(max_speed)
+        # ふるまいは生成時に一度だけ組み立て、撃つ弾すべてで共有する
+        self.behavior = Gravity(self.g, self.grav_mode, self.max_speed)
         self.t = 0
 
     def _angle(self, em, ctx):
@@ -484,8 +501,7 @@ class GravityBullet(BasePattern):
         if self.t % self.rate == 0:
             a = deg2rad(self._angle(em, ctx))
             vx, vy = math.cos(a)*self.speed0, math.sin(a)*self.speed0
-            behavior = {"type":"grav","g":self.g,"mode":self.grav_mode,"max_speed":self.max_speed}
-            em.bullets.spawn(em.x, em.y, vx, vy, r=1, c=self.bc, life=self.life, behavior=behavior)
+            em.bullets.spawn(em.x, em.y, vx, vy, r=1, c=self.bc, life=self.life, behavior=self.behavior)
         self.t += 1
 
 
@@ -503,6 +519,7 @@ class SpeedChangePattern(BasePattern):
         self.steps = steps or [{"at":30,"speed":0.6},{"at":60,"speed":0.0},{"at":90,"speed":2.0}]
         self.bc = int(color)
         self.life = int(life)
+        self.behavior = SpeedSchedule(self.steps, aim_player=True)
         self.t = 0
 
     def _angle(self, em, ctx):
@@ -515,14 +532,13 @@ class SpeedChangePattern(BasePattern):
         if self.t % self.rate == 0:
             a = deg2rad(self._angle(em, ctx))
             vx, vy = math.cos(a)*self.speed0, math.sin(a)*self.speed0
-            behavior = {"type":"speed_schedule","steps": self.steps, "aim_player": True}
-            em.bullets.spawn(em.x, em.y, vx, vy, r=1, c=self.bc, life=self.life, behavior=behavior)
+            em.bullets.spawn(em.x, em.y, vx, vy, r=1, c=self.bc, life=self.life, behavior=self.behavior)
         self.t += 1
 
 
 class ProximityBurstPattern(BasePattern):
     """
-    一定距離に入ると“親弾が爆ぜて小弾を散布”。
+    一定距離に入ると“親弾が爆ぜて小弾を散布”（親弾の NEAR アクション）。
     - approach_speed: 親弾の初速
     - radius: 爆発距離
     - child: {"count":16,"speed":1.0,"color":10}
@@ -539,6 +555,9 @@ class ProximityBurstPattern(BasePattern):
         self.once = bool(once)
         self.cP = int(color_parent)
         self.life = int(life)
+        ch = self.child
+        self.action = Action(NEAR, radius=self.radius, count=ch.get("count", 12), speed=ch.get("speed", 1.2),
+                             color=ch.get("color", 10), vanish=self.once)
         self.t = 0
 
     def _angle(self, em, ctx):
@@ -551,132 +570,131 @@ class ProximityBurstPattern(BasePattern):
         if self.t % self.rate == 0:
             a = deg2rad(self._angle(em, ctx))
             vx, vy = math.cos(a)*self.v0, math.sin(a)*self.v0
-            behavior = {
-                "type":"proximity_burst",
-                "radius": self.radius,
-                "child": self.child,
-                "once": self.once
-            }
-            em.bullets.spawn(em.x, em.y, vx, vy, r=1, c=self.cP, life=self.life, behavior=behavior)
+            em.bullets.spawn(em.x, em.y, vx, vy, r=1, c=self.cP, life=self.life, action=self.action)
         self.t += 1
 
+class BakedPattern(BasePattern):
+    """
+    bake.py で焼いた spawn 表の再生。そのフレームの行を発射元の位置にずらして spawn_many するだけ。
+    loop の表は最後まで来たら先頭へ戻り、stop の表は最後の行で発射元を止める
+    """
+    def __init__(self, table):
+        self.table = table
+        self.t = 0
+
+    def update_and_fire(self, em, ctx):
+        tb = self.table
+        f = self.t
+        if tb.loop:
+            f %= tb.frames
+        elif f >= tb.frames:
+            return
+        a, b = int(tb.offsets[f]), int(tb.offsets[f + 1])
+        if b > a:
+            em.bullets.spawn_many(em.x + tb.x[a:b], em.y + tb.y[a:b], tb.vx[a:b], tb.vy[a:b],
+                                  r=1, c=tb.c[a:b])
+        self.t += 1
+        if tb.stop and f == tb.frames - 1:
+            em.active = None
+            em.active_name = None
+
+class VMPattern(BasePattern):
+    """
+    命令列（vm.Program）で動くパターン。Emitter が PatternVM を持っていればそこに載り、
+    全 Emitter 分まとめて PatternVM.step で進む（Emitter.update からは呼ばれない）。
+    単独で update_and_fire を呼ばれたとき（bake など）は自分用の PatternVM で1つだけ回す
+    """
+    def __init__(self, program):
+        self.program = program
+        self._vm = None
+
+    def update_and_fire(self, em, ctx):
+        if self._vm is None:
+            self._vm = PatternVM(em.bullets, capacity=1)
+            self._vm.attach(em, self.program)
+        self._vm.step(ctx)
+
+# 種類ごとに、検証済みの定義からパターンを作る関数（BulletML と命令列は PatternFactory._build で扱う）
+BUILDERS = {
+    "circular":        lambda c: Circular(c.bullet_speed, c.count, c.spread_deg, c.cooldown),
+    "aimed":           lambda c: AimedBurst(c.bullet_speed, c.count, c.interval),
+    "spinner":         lambda c: Spinner(c.bullet_speed, c.count, c.angular_speed_deg, c.cooldown),
+    "rolling_fire":    lambda c: RollingFire(**c.params()),
+    "homing_laser":    lambda c: HomingLaserApprox(**c.params()),
+    "circle_fire":     lambda c: CircleFireApprox(**c.params()),
+    "nway_aimed":      lambda c: AimedNWay(**c.params()),
+    "two_split":       lambda c: TwoSplitFanApprox(**c.params()),
+    "gravity":         lambda c: GravityBullet(**c.params()),
+    "speed_change":    lambda c: SpeedChangePattern(**c.params()),
+    "proximity_burst": lambda c: ProximityBurstPattern(**c.params()),
+}
+
 class PatternFactory:
-    def __init__(self, patterns_data: dict):
+    """
+    パターン定義からパターンを作る。定義は読み込み時に全部検証して PatternConfig にし（間違いは
+    まとめて PatternConfigError）、名前ごとに1つ作っておいたプロトタイプを make で clone して渡す。
+    BulletML のプロトタイプだけは最初の make で作る（lxml は使うときだけ読み込む）
+    """
+    def __init__(self, patterns_data: dict, baked=None, use_vm=True, configs=None):
+        # baked: {名前: SpawnTable}。焼いてあるパターンは表の再生に置き換える
+        # use_vm: 命令列で書ける種類は VMPattern にする（False なら従来のクラス。比較用）
+        # configs: patterns_data を検証済みの {名前: PatternConfig}（datacache から）。
+        #          渡せば検証を省き、プロトタイプもすべて最初の make で作る
         self.data = patterns_data
+        self.baked = baked or {}
+        self.use_vm = use_vm
+        self.configs = {}   # 名前 -> PatternConfig
+        self._protos = {}   # 名前 -> プロトタイプ
+        if configs is None:
+            self._load(list(patterns_data))
+        else:
+            self.configs.update(configs)
+
+    def _load(self, names):
+        errors = []
+        for name in names:
+            cfg = validate_pattern(name, self.data[name], errors)
+            if cfg is None:
+                continue
+            self.configs[name] = cfg
+            if cfg.type == "bulletml" and name not in self.baked:
+                continue
+            try:
+                self._protos[name] = self._build(cfg)
+            except ValueError as e:
+                errors.append(f"{name}: {e}")
+        if errors:
+            raise PatternConfigError(errors)
+
+    def _build(self, cfg):
+        if cfg.name in self.baked:
+            return BakedPattern(self.baked[cfg.name])
+        if self.use_vm or cfg.type == "program":
+            prog = compile_pattern(cfg.as_dict())
+            if prog is not None:
+                return VMPattern(prog)
+        if cfg.type == "bulletml":
+            # lxml は BulletML を使うときだけ読み込む
+            from .bulletml import BulletMLPattern, load_bulletml
+            kw = cfg.params()
+            return BulletMLPattern(load_bulletml(kw.pop("file")), **kw)
+        return BUILDERS[cfg.type](cfg)
+
+    def forget(self, names, baked=None):
+        """
+        names の定義が変わった・消えたので、作り置き（プロトタイプ・焼いた表）を捨てる。baked は差し替える表。
+        data に残っている名前は検証し直す（間違いは PatternConfigError）
+        """
+        for name in names:
+            self.configs.pop(name, None)
+            self._protos.pop(name, None)
+            self.baked.pop(name, None)
+        self.baked.update(baked or {})
+        self._load([n for n in names if n in self.data])
 
     def make(self, name: str):
-        cfg = self.data[name]; typ = cfg["type"]
-        if typ == "circular":
-            return Circular(cfg["bullet_speed"], cfg["count"], cfg.get("spread_deg",360), cfg.get("cooldown",30))
-        if typ == "aimed":
-            return AimedBurst(cfg["bullet_speed"], cfg["count"], cfg.get("interval",5))
-        if typ == "spinner":
-            return Spinner(cfg["bullet_speed"], cfg["count"], cfg.get("angular_speed_deg",3), cfg.get("cooldown",3))
-
-        if typ == "rolling_fire":
-            return RollingFire(
-                speed_final   = cfg.get("speed_final", 3.0),
-                pre_wait      = cfg.get("pre_wait", 40),
-                turn_rel_deg  = cfg.get("turn_rel_deg", -90),
-                turn_term     = cfg.get("turn_term", 4),
-                accel_term    = cfg.get("accel_term", 4),
-                micro_wait    = cfg.get("micro_wait", 4),
-                seq_deg       = cfg.get("seq_deg", 15),
-                post_wait     = cfg.get("post_wait", 80),
-                fire_interval = cfg.get("fire_interval", 1),
-                life          = cfg.get("life", 360),
-                rand_wait_amplitude = cfg.get("rand_wait_amplitude", 20),
-                seed          = cfg.get("seed", 0),
-            )
-
-        # --- ここから追記 ---
-        if typ == "homing_laser":
-            return HomingLaserApprox(
-                base_spread_deg      = cfg.get("base_spread_deg", 120),
-                repeats              = cfg.get("repeats", 8),
-                cluster              = cfg.get("cluster", 9),
-                interval_in_cluster  = cfg.get("interval_in_cluster", 1),
-                wait_between         = cfg.get("wait_between", 10),
-                slow_speed           = cfg.get("slow_speed", 2.0),
-                slow_term            = cfg.get("slow_term", 30),
-                coast_wait           = cfg.get("coast_wait", 100),
-                fast_speed           = cfg.get("fast_speed", 5.0),
-                fast_term            = cfg.get("fast_term", 100),
-                aim_term             = cfg.get("aim_term", 60),
-                aim_step_max_deg     = cfg.get("aim_step_max_deg", 6),
-                seed                 = cfg.get("seed", 0),
-            )
-        if typ == "circle_fire":
-            return CircleFireApprox(
-                ring_count   = cfg.get("ring_count", 18),
-                step_deg     = cfg.get("step_deg", 20),
-                shell_speed  = cfg.get("shell_speed", 6.0),
-                shell_delay  = cfg.get("shell_delay", 3),
-                child_abs_deg= cfg.get("child_abs_deg", None),
-                child_speed  = cfg.get("child_speed", 1.5),
-                color_shell  = cfg.get("color_shell", 10),
-                color_child  = cfg.get("color_child", 8),
-                seed         = cfg.get("seed", 0),
-            )
-
-        if typ == "nway_aimed":
-            return AimedNWay(
-                bullet_speed = cfg.get("bullet_speed", 0.5),
-                ways         = cfg.get("ways", 5),
-                spread_deg   = cfg.get("spread_deg", 40),
-                cooldown     = cfg.get("cooldown", 20),
-                color        = cfg.get("color", 10),
-            )
-        
-        if typ == "two_split":
-            return TwoSplitFanApprox(
-                initial_speed = cfg.get("initial_speed", 1.0),
-                initial_offset_deg = cfg.get("initial_offset_deg", 8),
-                travel_frames = cfg.get("travel_frames", 12),
-                child_speed   = cfg.get("child_speed", 1.2),
-                child_fan_deg = cfg.get("child_fan_deg", 30),
-                cooldown      = cfg.get("cooldown", 45),
-                color_parent  = cfg.get("color_parent", 11),
-                color_child   = cfg.get("color_child", 14),
-                aimed         = cfg.get("aimed", True),
-                seed          = cfg.get("seed", 0),
-            )
-
-        if typ == "gravity":
-            return GravityBullet(
-                rate              = cfg.get("rate", 10),
-                speed0            = cfg.get("speed0", 1.2),
-                angle_mode        = cfg.get("angle_mode", "aim"),
-                fixed_deg         = cfg.get("fixed_deg", 90.0),
-                g                 = cfg.get("g", 0.03),
-                grav_mode         = cfg.get("grav_mode", "attract"),  # or "repel"
-                max_speed         = cfg.get("max_speed", 2.5),
-                color             = cfg.get("color", 12),
-                life              = cfg.get("life", -1),
-            )
-
-        if typ == "speed_change":
-            return SpeedChangePattern(
-                rate              = cfg.get("rate", 12),
-                speed0            = cfg.get("speed0", 1.5),
-                angle_mode        = cfg.get("angle_mode", "aim"),
-                fixed_deg         = cfg.get("fixed_deg", 90.0),
-                steps             = cfg.get("steps", None),
-                color             = cfg.get("color", 9),
-                life              = cfg.get("life", -1),
-            )
-
-        if typ == "proximity_burst":
-            return ProximityBurstPattern(
-                rate              = cfg.get("rate", 20),
-                approach_speed    = cfg.get("approach_speed", 1.0),
-                angle_mode        = cfg.get("angle_mode", "aim"),
-                fixed_deg         = cfg.get("fixed_deg", 90.0),
-                radius            = cfg.get("radius", 18),
-                child             = cfg.get("child", None),
-                once              = cfg.get("once", True),
-                color_parent      = cfg.get("color_parent", 11),
-                life              = cfg.get("life", -1),
-            )
-
-        raise ValueError(f"unknown pattern: {typ}")
+        """name のパターンを最初の状態で作る（無い名前は KeyError）"""
+        proto = self._protos.get(name)
+        if proto is None:
+            proto = self._protos[name] = self._build(self.configs[name])
+        return proto.clone()
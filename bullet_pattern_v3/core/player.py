@@ -1,11 +1,13 @@
 # player.py
 import pyxel
+from .input import PyxelInput
 
 class Player:
-    def __init__(self, x: int, y: int, left_area_w: int, h: int, radius: int = 1, color: int = 3):
+    def __init__(self, x: int, y: int, left_area_w: int, h: int, radius: int = 1, color: int = 3, inp=None):
         """
         left_area_w: 右パネルを除いた左のプレイエリア幅
         h          : 画面高さ
+        inp        : 入力の取得元（省略時は PyxelInput）
         """
         self.x = x
         self.y = y
@@ -15,16 +17,29 @@ class Player:
         self.color = color  # Pyxelの緑系。3=green
 
         self.speed = 1
+        self.inp = inp or PyxelInput()
+
+        # 被弾の記録（残機はないので回数を数えて点滅させるだけ）
+        self.hits = 0
+        self.flash = 0
+        self.hit_color = 8
+
+    def on_hit(self, n: int):
+        self.hits += n
+        self.flash = 8
 
     def update(self):
+        if self.flash > 0:
+            self.flash -= 1
+        inp = self.inp
         dx = dy = 0
-        if pyxel.btn(pyxel.KEY_LEFT):
+        if inp.btn(pyxel.KEY_LEFT):
             dx -= self.speed
-        if pyxel.btn(pyxel.KEY_RIGHT):
+        if inp.btn(pyxel.KEY_RIGHT):
             dx += self.speed
-        if pyxel.btn(pyxel.KEY_UP):
+        if inp.btn(pyxel.KEY_UP):
             dy -= self.speed
-        if pyxel.btn(pyxel.KEY_DOWN):
+        if inp.btn(pyxel.KEY_DOWN):
             dy += self.speed
 
         self.x += dx
@@ -40,5 +55,5 @@ class Player:
         if self.y > self.h - 1 - self.r:
             self.y = self.h - 1 - self.r
 
-    def draw(self):
-        pyxel.circ(self.x, self.y, self.r, self.color)
+    def draw(self, gfx=pyxel):
+        gfx.circ(self.x, self.y, self.r, self.hit_color if self.flash > 0 else self.color)
@@ -0,0 +1,96 @@
+# profiler.py
+# World.update / World.draw の処理段（フェーズ）ごとの所要時間を測る軽量プロファイラ。
+# 1フレーム1行で固定長のリングバッファ（size フレーム分）に ms で記録し、
+# オーバーレイ表示（フェーズ別 ms とフレーム時間のスパークライン）と CSV 書き出しを行う。
+
+import time
+import numpy as np
+
+BUDGET_MS = 1000.0 / 60   # 60fps の1フレーム予算
+
+class FrameProfiler:
+    """
+    phases : フェーズ名の列（記録する列の順）
+    size   : 保持するフレーム数
+    使い方 : フレーム頭で begin(frame)、各フェーズの直後に lap(name)。
+             draw の頭では resume() で計測起点だけを取り直す（update との間の待ちは数えない）
+    """
+    def __init__(self, phases, size=600):
+        self.phases = tuple(phases)
+        self.col = {p: k for k, p in enumerate(self.phases)}
+        self.size = size
+        self.ms = np.zeros((size, len(self.phases)), dtype=np.float32)
+        self.frame = np.full(size, -1, dtype=np.int64)   # 行ごとのフレーム番号（-1 は未記録）
+        self.n = 0           # これまでに begin したフレーム数
+        self.row = 0
+        self.show = False    # オーバーレイ表示中か
+        self._t = 0.0
+
+    def begin(self, frame):
+        """新しいフレームの行を用意して計測を始める（古い行から上書き）"""
+        self.row = self.n % self.size
+        self.n += 1
+        self.ms[self.row] = 0.0
+        self.frame[self.row] = frame
+        self._t = time.perf_counter()
+
+    def resume(self):
+        self._t = time.perf_counter()
+
+    def lap(self, phase):
+        """前回の lap / begin / resume から今までを phase の時間として加算する"""
+        t = time.perf_counter()
+        self.ms[self.row, self.col[phase]] += (t - self._t) * 1e3
+        self._t = t
+
+    def recent(self, k=None):
+        """直近 k フレーム（省略時は記録済み全部）を古い順に (frames, ms[k, phases]) で返す"""
+        filled = min(self.n, self.size)
+        k = filled if k is None else min(k, filled)
+        rows = (np.arange(self.n - k, self.n) % self.size)
+        return self.frame[rows], self.ms[rows]
+
+    def dump_csv(self, path=None):
+        """リングバッファの中身を CSV に書き出して、書いたパスを返す"""
+        if path is None:
+            path = time.strftime("profile_%Y%m%d_%H%M%S.csv")
+        frames, ms = self.recent()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("frame," + ",".join(self.phases) + ",total\n")
+            for fr, row in zip(frames.tolist(), ms.tolist()):
+                f.write(f"{fr}," + ",".join(f"{v:.4f}" for v in row) + f",{sum(row):.4f}\n")
+        return path
+
+    def draw_overlay(self, gfx, x=2, y=2, window=60, spark_w=120, spark_h=20, budget_ms=BUDGET_MS):
+        """
+        直近 window フレームのフェーズ別 平均/最大 ms と、フレーム時間のスパークラインを描く。
+        スパークラインは高さの半分が予算（budget_ms）で、予算超えの列は赤
+        """
+        frames, ms = self.recent(window)
+        if not len(frames):
+            return
+        avg = ms.mean(axis=0)
+        peak = ms.max(axis=0)
+        name_w = max(len(p) for p in self.phases) * 4
+        w = max(spark_w, name_w + 4 * 12) + 4
+        h = 10 + 7 * (len(self.phases) + 1) + spark_h + 4
+        gfx.rect(x, y, w, h, 0)
+        gfx.rectb(x, y, w, h, 5)
+        gfx.text(x + 2, y + 2, f"{'phase':<{name_w // 4}}  avg   max", 6)
+        for k, p in enumerate(self.phases):
+            ty = y + 9 + 7 * k
+            col = 8 if peak[k] > budget_ms else 7
+            gfx.text(x + 2, ty, f"{p:<{name_w // 4}}{avg[k]:6.2f}{peak[k]:6.2f}", col)
+        total = ms.sum(axis=1)
+        ty = y + 9 + 7 * len(self.phases)
+        col = 8 if total.max() > budget_ms else 10
+        gfx.text(x + 2, ty, f"{'frame':<{name_w // 4}}{total.mean():6.2f}{total.max():6.2f}", col)
+
+        # フレーム時間（全フェーズの合計）のスパークライン
+        sx, sy = x + 2, y + h - spark_h - 2
+        total = self.recent(spark_w - 4)[1].sum(axis=1)
+        scale = (spark_h / 2) / budget_ms
+        for k, v in enumerate(total.tolist()):
+            bh = min(spark_h, max(1, int(v * scale)))
+            gfx.rect(sx + k, sy + spark_h - bh, 1, bh, 8 if v > budget_ms else 11)
+        gfx.rect(sx, sy + spark_h - spark_h // 2, spark_w - 4, 1, 10)   # 予算の線
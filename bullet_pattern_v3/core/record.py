@@ -0,0 +1,183 @@
+# record.py
+# 入力の記録と再生。毎フレームの方向キーを 1 バイトのビットマスクで、
+# メニューで決まったパターン選択を (frame, 名前) で記録し、小さなバイナリファイルに保存する。
+# 再生は ReplayInput を入れたヘッドレスの World を待ちなしで回す（tools/replay.py）。
+#
+# ファイル形式: b"BPRC" + version(u8) + ヘッダ長(u32, big endian) + ヘッダ JSON(utf-8)
+#               + zlib 圧縮したマスク列（1フレーム1バイト）
+
+import hashlib
+import json
+import struct
+import zlib
+import pyxel
+from .input import PyxelInput
+from .paths import resolve
+from .world import World
+
+MAGIC = b"BPRC"
+VERSION = 1
+# 記録するキー（ビット番号の順）。Player が読むのはこれだけ
+REC_KEYS = (pyxel.KEY_LEFT, pyxel.KEY_RIGHT, pyxel.KEY_UP, pyxel.KEY_DOWN)
+# パッケージからの相対パス（記録に書くので環境によらない形のまま持つ）
+DATA_FILES = ("data/patterns_demo.json", "data/stage01.json")
+
+def data_digest(paths=DATA_FILES):
+    """データファイルの sha1（記録時と再生時でパターン定義が同じか確かめる）"""
+    out = {}
+    for p in paths:
+        with open(resolve(p), "rb") as f:
+            out[p] = hashlib.sha1(f.read()).hexdigest()
+    return out
+
+class Recording:
+    """
+    keys  : 記録したキー（masks のビット番号の順）
+    masks : フレームごとのキーのビットマスク（bytearray）
+    picks : パターン選択の (frame, 名前) の列
+    world : World の作り方（W, H, panel_w, bullet_backend, timeline_enabled）
+    data  : 記録時のデータファイルの sha1
+    """
+    def __init__(self, keys=REC_KEYS, masks=b"", picks=(), world=None, data=None):
+        self.keys = tuple(keys)
+        self.masks = bytearray(masks)
+        self.picks = [(int(f), str(n)) for f, n in picks]
+        self.world = dict(world or {})
+        self.data = dict(data or {})
+
+    def __len__(self):
+        return len(self.masks)
+
+    def save(self, path):
+        header = json.dumps({
+            "keys": list(self.keys),
+            "frames": len(self.masks),
+            "picks": self.picks,
+            "world": self.world,
+            "data": self.data,
+        }, separators=(",", ":")).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(MAGIC + struct.pack(">BI", VERSION, len(header)))
+            f.write(header)
+            f.write(zlib.compress(bytes(self.masks), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            blob = f.read()
+        if blob[:4] != MAGIC:
+            raise ValueError(f"{path}: not an input recording")
+        version, n = struct.unpack(">BI", blob[4:9])
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported recording version {version}")
+        header = json.loads(blob[9:9 + n].decode("utf-8"))
+        masks = zlib.decompress(blob[9 + n:])
+        if len(masks) != header["frames"]:
+            raise ValueError(f"{path}: truncated recording")
+        return cls(header["keys"], masks, header["picks"], header["world"], header["data"])
+
+class RecordingInput:
+    """
+    inner の入力をそのまま使いながら、REC_KEYS の状態とパターン選択を記録する。
+    方向キーはフレーム頭に読んだ値を返すので、記録した値とプレイ中の値が必ず一致する
+    """
+    def __init__(self, inner=None, keys=REC_KEYS):
+        self.inner = inner or PyxelInput()
+        self.rec = Recording(keys)
+        self.bit = {k: 1 << b for b, k in enumerate(self.rec.keys)}
+        self.world = None   # attach した World（保存時に作り方を書き出す）
+        self.t = 0
+        self.mask = 0
+
+    def attach(self, world):
+        self.world = world
+        self.rec.data = data_digest()
+
+    def begin_frame(self, t):
+        self.inner.begin_frame(t)
+        self.t = t
+        mask = 0
+        for k, b in self.bit.items():
+            if self.inner.btn(k):
+                mask |= b
+        masks = self.rec.masks
+        if len(masks) < t:
+            masks.extend(bytes(t - len(masks)))
+        del masks[t:]
+        masks.append(mask)
+        self.mask = mask
+
+    def select(self, decided):
+        decided = self.inner.select(decided)
+        if decided:
+            self.rec.picks.append((self.t, decided))
+        return decided
+
+    def btn(self, key):
+        b = self.bit.get(key)
+        return self.inner.btn(key) if b is None else bool(self.mask & b)
+
+    def btnp(self, key):
+        return self.inner.btnp(key)
+
+    def btnr(self, key):
+        return self.inner.btnr(key)
+
+    @property
+    def mouse_x(self):
+        return self.inner.mouse_x
+
+    @property
+    def mouse_y(self):
+        return self.inner.mouse_y
+
+    def save(self, path):
+        w = self.world
+        if w is not None:
+            self.rec.world = {
+                "W": w.W, "H": w.H, "panel_w": w.panel_w,
+                "bullet_backend": w.bullet_backend,
+                "timeline_enabled": w.timeline_enabled,
+            }
+        self.rec.save(path)
+        return self.rec
+
+class ReplayInput:
+    """Recording を毎フレーム読み返す入力（マウスは画面外、選択は記録どおり）"""
+    mouse_x = -1
+    mouse_y = -1
+
+    def __init__(self, rec):
+        self.rec = rec
+        self.bit = {k: 1 << b for b, k in enumerate(rec.keys)}
+        self.picks = dict(rec.picks)
+        self.t = 0
+        self.mask = 0
+
+    def begin_frame(self, t):
+        self.t = t
+        self.mask = self.rec.masks[t] if t < len(self.rec) else 0
+
+    def select(self, decided):
+        return self.picks.get(self.t)
+
+    def btn(self, key):
+        b = self.bit.get(key)
+        return b is not None and bool(self.mask & b)
+
+    def btnp(self, key):
+        return False
+
+    def btnr(self, key):
+        return False
+
+def replay_world(rec, bullet_backend=None, gfx=None):
+    """記録と同じ作りのヘッドレス World を ReplayInput つきで作る（backend は差し替え可）"""
+    w = rec.world
+    world = World(
+        w.get("W", 200), w.get("H", 150), panel_w=w.get("panel_w", 70),
+        bullet_backend=bullet_backend or w.get("bullet_backend", "numpy"),
+        inp=ReplayInput(rec), gfx=gfx, headless=True,
+    )
+    world.timeline_enabled = w.get("timeline_enabled", False)
+    return world
@@ -0,0 +1,78 @@
+# reload.py
+# データファイル（パターン定義・ステージの JSON）の書き換えを見張り、読み直した内容を返す。
+# inotify などは使わず、interval 秒おきに stat して更新時刻かサイズが変わったファイルだけ読む。
+# 反映は World.reload（変わったパターン・敵だけを差し替える）。
+#
+#   watcher = DataWatcher([PATTERNS_PATH, STAGE_PATH])
+#   docs = watcher.poll()                 # 毎 tick 呼んでよい（interval 未満なら何もしない）
+#   if docs: apply_reload(world, docs)
+
+import json
+import os
+import time
+from .paths import PATTERNS_PATH, STAGE_PATH
+
+class DataWatcher:
+    """
+    paths    : 見張るファイル
+    interval : stat する間隔（秒）
+    poll() は読み直せたファイルの {パス: JSON} を返す（変わっていなければ空）。
+    保存途中などで JSON が壊れていたら知らせるだけで、次に書き換わるまで前の内容のまま
+    """
+    def __init__(self, paths, interval=0.25, clock=time.monotonic):
+        self.paths = tuple(paths)
+        self.interval = interval
+        self.clock = clock
+        self.sig = {p: self._sig(p) for p in self.paths}
+        self.next = clock() + interval
+
+    @staticmethod
+    def _sig(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def poll(self):
+        now = self.clock()
+        if now < self.next:
+            return {}
+        self.next = now + self.interval
+        out = {}
+        for p in self.paths:
+            sig = self._sig(p)
+            if sig == self.sig[p]:
+                continue
+            self.sig[p] = sig
+            if sig is None:
+                continue
+            try:
+                with open(p, "r", encoding="utf-8") as f:
+                    out[p] = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"reload: {p}: {e}")
+        return out
+
+def apply_reload(world, docs, patterns_path=PATTERNS_PATH, stage_path=STAGE_PATH):
+    """
+    DataWatcher.poll の結果を world に反映し、何が変わったかを1行で表示する。
+    定義が壊れていれば表示だけして world はそのまま（戻り値 None）
+    """
+    t0 = time.perf_counter()
+    pat = docs.get(patterns_path)
+    try:
+        res = world.reload(patterns=None if pat is None else pat["patterns"], stage=docs.get(stage_path))
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"reload failed, keeping the current data: {type(e).__name__}: {e}")
+        return None
+    ms = (time.perf_counter() - t0) * 1e3
+    parts = []
+    if res["changed"]:
+        parts.append(f"patterns ~{','.join(res['changed'])}")
+    if res["removed"]:
+        parts.append(f"patterns -{','.join(res['removed'])}")
+    if res["enemies"]:
+        parts.append(f"enemies ~{','.join(map(str, res['enemies']))}")
+    print(f"reloaded {' '.join(parts) or 'nothing changed'} in {ms:.2f} ms")
+    return res
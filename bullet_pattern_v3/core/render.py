@@ -0,0 +1,26 @@
+# render.py
+# 描画先。World.draw 以下は gfx（pyxel モジュール / pyxel.Image / NullRenderer）へ描く。
+# pyxel.Image を渡せばウィンドウなしで画面外に描け、NullRenderer なら描画そのものを省く。
+
+import pyxel
+
+class NullRenderer:
+    """何も描かない描画先（ヘッドレス実行用）"""
+    def cls(self, col):
+        pass
+
+    def circ(self, x, y, r, col):
+        pass
+
+    def rect(self, x, y, w, h, col):
+        pass
+
+    def rectb(self, x, y, w, h, col):
+        pass
+
+    def text(self, x, y, s, col):
+        pass
+
+def offscreen(w, h):
+    """ウィンドウなしで描ける画面外バッファ（pyxel.init 不要）"""
+    return pyxel.Image(w, h)
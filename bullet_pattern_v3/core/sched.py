@@ -0,0 +1,81 @@
+# sched.py
+# フレーム番号をキーにしたタイミングホイール。
+# 直近 size フレーム分はリングバッファのバケツ、それより先の予定はヒープに置き、
+# ホイールが回るにつれてバケツへ移す。1フレームの処理量は「そのフレームに来た予定の数」で決まる。
+
+import heapq
+
+class TimingWheel:
+    def __init__(self, size=256):
+        self.size = size
+        self.buckets = [[] for _ in range(size)]
+        self.now = 0          # 次に取り出すフレーム
+        self.far = []         # (frame, seq, item) のヒープ（now + size 以降の予定）
+        self._seq = 0
+        self.count = 0        # 保留中の予定数
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        for b in self.buckets:
+            b.clear()
+        self.far.clear()
+        self.count = 0
+
+    def schedule(self, frame, item):
+        """frame で取り出す予定を積む（過去のフレームなら次の pop_due で出る）"""
+        if frame < self.now:
+            frame = self.now
+        if frame - self.now < self.size:
+            self.buckets[frame % self.size].append(item)
+        else:
+            heapq.heappush(self.far, (frame, self._seq, item))
+            self._seq += 1
+        self.count += 1
+
+    def schedule_many(self, frame, items):
+        """items を全部 frame の予定として積む（schedule を items の順に呼ぶのと同じ）"""
+        if frame < self.now:
+            frame = self.now
+        if frame - self.now < self.size:
+            self.buckets[frame % self.size].extend(items)
+        else:
+            for item in items:
+                heapq.heappush(self.far, (frame, self._seq, item))
+                self._seq += 1
+        self.count += len(items)
+
+    def pop_due(self, frame):
+        """frame までに来た予定を積んだ順に返し、ホイールを frame + 1 へ進める"""
+        due = []
+        while self.now <= frame:
+            bucket = self.buckets[self.now % self.size]
+            if bucket:
+                due.extend(bucket)
+                bucket.clear()
+            self.now += 1
+            # 窓に入ってきた遠い予定をバケツへ移す
+            far = self.far
+            limit = self.now + self.size
+            while far and far[0][0] < limit:
+                f, _, item = heapq.heappop(far)
+                self.buckets[f % self.size].append(item)
+        self.count -= len(due)
+        return due
+
+    def map_items(self, fn):
+        """保留中の予定を fn(item) で置き換える（None を返したものは捨てる）"""
+        n = 0
+        for bucket in self.buckets:
+            kept = [m for m in map(fn, bucket) if m is not None]
+            bucket[:] = kept
+            n += len(kept)
+        far = []
+        for f, seq, item in self.far:
+            item = fn(item)
+            if item is not None:
+                far.append((f, seq, item))
+        heapq.heapify(far)
+        self.far = far
+        self.count = n + len(far)
@@ -1,8 +1,9 @@
 class Timeline:
-    def __init__(self, script):
+    def __init__(self, script, start=0):
         # 例: [{"at":60,"cmd":"use","pattern":"circular_16"}, {"at":240,"cmd":"use","pattern":"aimed_burst"}]
+        # start: このフレームより前のコマンドは実行済みとして飛ばす（途中で台本を差し替えるとき）
         self.script = sorted(script, key=lambda c: c["at"])
-        self.idx = 0
+        self.idx = sum(1 for c in self.script if c["at"] < start)
 
     def tick(self, t, emitter, ctx):
         # 時間tに達したコマンドを順に実行
@@ -1,9 +1,11 @@
 # ui.py
 import pyxel
 from typing import Optional, List, Tuple
+from .input import PyxelInput
 
 class PatternMenu:
-    def __init__(self, x: int, y: int, w: int, h: int, items: List[str]):
+    def __init__(self, x: int, y: int, w: int, h: int, items: List[str], inp=None):
+        self.inp = inp or PyxelInput()
         self.x, self.y, self.w, self.h = x, y, w, h
         self.items = list(items)
         self.sel = 0
@@ -18,6 +20,14 @@ class PatternMenu:
         self._drag_offset = 0     # バー内で掴んだYオフセット
         self._bar_rect: Tuple[int, int, int, int] = (0, 0, 0, 0)  # (x,y,w,h) キャッシュ
 
+    def set_items(self, items: List[str]):
+        """項目を差し替える（選択中の項目は名前で引き継ぎ、スクロールは範囲内に収める）"""
+        cur = self.items[self.sel] if 0 <= self.sel < len(self.items) else None
+        self.items = list(items)
+        self.sel = self.items.index(cur) if cur in self.items else 0
+        self.hover_idx = None
+        self.scroll = max(0, min(self.scroll, len(self.items) - self._visible_rows()))
+
     # ====== 内部ユーティリティ ======
     def _content_top(self) -> int:
         return self.y + self.margin + self.title_h
@@ -73,10 +83,11 @@ class PatternMenu:
 
     # ====== 入力 ======
     def handle_input(self) -> Optional[str]:
-        mx, my = pyxel.mouse_x, pyxel.mouse_y
-        left_now = pyxel.btn(pyxel.MOUSE_BUTTON_LEFT)
-        left_down = pyxel.btnp(pyxel.MOUSE_BUTTON_LEFT)   # 押した瞬間
-        left_up   = (not left_now) and pyxel.btnr(pyxel.MOUSE_BUTTON_LEFT) if hasattr(pyxel, "btnr") else (not left_now)
+        inp = self.inp
+        mx, my = inp.mouse_x, inp.mouse_y
+        left_now = inp.btn(pyxel.MOUSE_BUTTON_LEFT)
+        left_down = inp.btnp(pyxel.MOUSE_BUTTON_LEFT)   # 押した瞬間
+        left_up   = (not left_now) and inp.btnr(pyxel.MOUSE_BUTTON_LEFT)
 
         vis = self._visible_rows()
 
@@ -126,11 +137,11 @@ class PatternMenu:
         return decided
 
     # ====== 描画 ======
-    def draw(self, title: str = "PATTERNS"):
+    def draw(self, title: str = "PATTERNS", gfx=pyxel):
         # パネル背景・枠
-        pyxel.rect(self.x, self.y, self.w, self.h, 1)
-        pyxel.rectb(self.x, self.y, self.w, self.h, 5)
-        pyxel.text(self.x + self.margin, self.y + 2, title, 10)
+        gfx.rect(self.x, self.y, self.w, self.h, 1)
+        gfx.rectb(self.x, self.y, self.w, self.h, 5)
+        gfx.text(self.x + self.margin, self.y + 2, title, 10)
 
         start_y = self._content_top()
         vis = self._visible_rows()
@@ -164,9 +175,9 @@ class PatternMenu:
 
             border = 5 if not pressed else 0
 
-            pyxel.rect(btn_x, btn_y, btn_w, btn_h, bg)
-            pyxel.rectb(btn_x, btn_y, btn_w, btn_h, border)
-            pyxel.text(btn_x + 4 + (1 if pressed else 0), y + 1 + (1 if pressed else 0),
+            gfx.rect(btn_x, btn_y, btn_w, btn_h, bg)
+            gfx.rectb(btn_x, btn_y, btn_w, btn_h, border)
+            gfx.text(btn_x + 4 + (1 if pressed else 0), y + 1 + (1 if pressed else 0),
                        name, 0 if (hovered or selected) else 7)
 
         # スクロールトラック＆バー
@@ -175,8 +186,8 @@ class PatternMenu:
         track_y = self.y + self.title_h + 5
         track_h = self.h - self.title_h - 10
         if track_h > 0:
-            pyxel.rect(track_x, track_y, 3, track_h, 0)
+            gfx.rect(track_x, track_y, 3, track_h, 0)
             # バー
             bar_x, bar_y, bar_w, bar_h = self._bar_rect
             if bar_w > 0:
-                pyxel.rect(bar_x, bar_y, bar_w, bar_h, 12 if not self._dragging_bar else 7)
+                gfx.rect(bar_x, bar_y, bar_w, bar_h, 12 if not self._dragging_bar else 7)
@@ -0,0 +1,374 @@
+# vm.py
+# パターンを命令列（バイトコード）にして、全 Emitter 分をひとつのインタプリタでまとめて回す。
+# 命令は wait / ring / aimed / rotate / speed / loop / end の7つで、Emitter ごとの状態
+# （pc・向き・速さ・loop の回数）は PatternVM の配列に並べて持つ。
+# 1フレームの処理は「命令の種類ごとの配列演算 × 1フレームに進む命令数」で、Emitter の数にほぼよらない。
+# wait 中の Emitter は再開するフレームをタイミングホイールに積んでおき、そのフレームまで触らない。
+# そのフレームに撃つ弾は全 Emitter 分を1回の spawn_many にまとめる。
+#
+# 命令列は [名前, 引数...] の列で書く（data/patterns_demo.json の "type": "program" の "code" も同じ形）:
+#   ["wait", n]                         n フレーム後に続きを実行（0 は待たない）
+#   ["ring", count, spread_deg, color]  今の向きから spread_deg/count 刻みで count 発
+#   ["aimed", count, spread_deg, color] 自機方向を中心に spread_deg の扇で count 発（1発なら自機へ）
+#   ["rotate", deg]                     向きを deg 度回す
+#   ["speed", v]                        以後の弾の速さ
+#   ["loop", target, times]             target 番目の命令へ戻る（times 回目で抜ける。0 は無限）
+#   ["end"]                             止まる（パターンはそのまま残る）
+# 回数付きの loop は Emitter ごとに回数を1本しか持たないので、入れ子にはできない。
+# どの loop の中にも 0 でない wait か end が要る（1フレームの実行が止まらないので assemble で弾く）。
+# 最後の命令の先へ進む命令列には end を足す。
+
+import math
+import numpy as np
+from .sched import TimingWheel
+
+WAIT, RING, AIMED, ROTATE, SPEED, LOOP, END = range(7)
+OPS = {"wait": WAIT, "ring": RING, "aimed": AIMED, "rotate": ROTATE, "speed": SPEED, "loop": LOOP, "end": END}
+
+# 1フレームに1つの Emitter が進める命令数の上限（wait のない loop で止まらないように）
+MAX_OPS = 64
+
+class Program:
+    """
+    assemble 済みの命令列。op / n / m / a / c は命令ごとの配列
+    n : wait のフレーム数・ring/aimed の弾数・loop の飛び先
+    m : loop の回数
+    a : ring/aimed の広がり（度）・rotate の角度・speed の速さ
+    c : ring/aimed の色
+    """
+    __slots__ = ("code", "op", "n", "m", "a", "c")
+    def __init__(self, code):
+        self.code = code   # 正規化した命令のタプル（同じ命令列の判定に使う）
+        self.op = np.array([k[0] for k in code], dtype=np.uint8)
+        self.n = np.array([k[1] for k in code], dtype=np.int64)
+        self.m = np.array([k[2] for k in code], dtype=np.int64)
+        self.a = np.array([k[3] for k in code], dtype=np.float64)
+        self.c = np.array([k[4] for k in code], dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.code)
+
+def assemble(code):
+    """[名前, 引数...] の列を Program にする（不正な命令は ValueError）"""
+    out = []
+    for k, ins in enumerate(code):
+        name, *args = ins
+        op = OPS.get(name)
+        if op is None:
+            raise ValueError(f"program[{k}]: unknown op {name!r}")
+        try:
+            if op == WAIT:
+                (frames,) = args
+                row = (op, int(frames), 0, 0.0, 0)
+            elif op in (RING, AIMED):
+                # 広がり・色は省略可（ring は一周、aimed は自機へまっすぐ）
+                defaults = [None, 360.0 if op == RING else 0.0, 10]
+                count, spread, color = list(args) + defaults[len(args):]
+                if int(count) < 1:
+                    raise ValueError("count must be >= 1")
+                row = (op, int(count), 0, float(spread), int(color))
+            elif op in (ROTATE, SPEED):
+                (v,) = args
+                row = (op, 0, 0, float(v), 0)
+            elif op == LOOP:
+                target, times = (list(args) + [0])[:2]
+                if not 0 <= int(target) <= k:
+                    raise ValueError("loop target must point back")
+                row = (op, int(target), int(times), 0.0, 0)
+            else:
+                if args:
+                    raise ValueError("end takes no arguments")
+                row = (op, 0, 0, 0.0, 0)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"program[{k}]: bad {name} {args}: {e}") from None
+        if row[1] < 0 or row[2] < 0:
+            raise ValueError(f"program[{k}]: negative argument in {name}")
+        out.append(row)
+    if not out:
+        raise ValueError("program is empty")
+    # 回数付きの loop の範囲が重ならないか（回数は1本しか持たない）
+    spans = [(row[1], k) for k, row in enumerate(out) if row[0] == LOOP and row[2] > 0]
+    for (s0, e0), (s1, e1) in zip(spans, spans[1:]):
+        if s1 <= e0:
+            raise ValueError(f"program[{e1}]: counted loops cannot be nested")
+    # 最後の命令から先へ進めるなら、そこで止まる（end を足す）
+    last = out[-1]
+    if not (last[0] == END or (last[0] == LOOP and last[2] == 0)):
+        out.append((END, 0, 0, 0.0, 0))
+    _check_flow(out)
+    return Program(tuple(out))
+
+def _check_flow(out):
+    """
+    1フレームの実行が必ず止まり、MAX_OPS 命令以内に収まるか（だめなら ValueError）。
+    止まる命令（end と 0 でない wait）を含まない loop は永久に回るので弾く。どの loop の中にも
+    止まる命令があれば、止まる命令を行き止まりにした飛び先のグラフには輪がないので、
+    1フレームに実行する命令数の最大はそのグラフの最長路で求まる（回数付き loop は戻る・抜けるの両方を見る）
+    """
+    halt = [op == END or (op == WAIT and n > 0) for op, n, *_ in out]
+    for k, (op, n, *_) in enumerate(out):
+        if op == LOOP and not any(halt[n:k + 1]):
+            raise ValueError(f"program[{k}]: loop back to {n} has no wait or end, so it would never yield")
+    succ = []
+    for k, (op, n, m, *_) in enumerate(out):
+        if halt[k]:
+            succ.append(())
+        elif op == LOOP:
+            succ.append((n, k + 1) if m > 0 else (n,))
+        else:
+            succ.append((k + 1,))
+    # cost[k]: k から実行してそのフレームが止まるまでの命令数の最大
+    cost = [0] * len(out)
+    done = [False] * len(out)
+    for root in range(len(out)):
+        stack = [root]
+        while stack:
+            k = stack[-1]
+            if done[k]:
+                stack.pop()
+                continue
+            todo = [j for j in succ[k] if not done[j]]
+            if todo:
+                stack.extend(todo)
+                continue
+            cost[k] = 1 + max((cost[j] for j in succ[k]), default=0)
+            done[k] = True
+            stack.pop()
+    # 実行が始まるのは先頭と、0 でない wait の次
+    starts = [0] + [k + 1 for k, (op, *_) in enumerate(out) if op == WAIT and halt[k]]
+    worst = max(cost[k] for k in starts)
+    if worst > MAX_OPS:
+        raise ValueError(f"program can run {worst} instructions in one frame without a wait (max {MAX_OPS})")
+
+def compile_pattern(cfg):
+    """
+    パターン定義を命令列にする。命令列で書ける種類（circular / aimed / spinner / nway_aimed / program）
+    でなければ None。弾の出方は patterns.py の同名のクラスと同じ
+    """
+    typ = cfg["type"]
+    if typ == "circular":
+        # 撃ったフレームから cooldown フレーム休んで、その次のフレームにまた撃つ
+        code = [["speed", cfg["bullet_speed"]],
+                ["ring", cfg["count"], cfg.get("spread_deg", 360), 10],
+                ["wait", cfg.get("cooldown", 30) + 1],
+                ["loop", 1, 0]]
+    elif typ == "aimed":
+        if cfg["count"] < 1:
+            return assemble([["end"]])
+        code = [["speed", cfg["bullet_speed"]],
+                ["aimed", 1, 0, 8],
+                ["wait", max(1, cfg.get("interval", 5))],
+                ["loop", 1, cfg["count"]],
+                ["end"]]
+    elif typ == "spinner":
+        # 休んでいる間も毎フレーム回るので、1周期ぶんまとめて回す
+        cd = cfg.get("cooldown", 3)
+        code = [["speed", cfg["bullet_speed"]],
+                ["ring", cfg["count"], 360, 9],
+                ["rotate", cfg.get("angular_speed_deg", 3) * (cd + 1)],
+                ["wait", cd + 1],
+                ["loop", 1, 0]]
+    elif typ == "nway_aimed":
+        code = [["speed", cfg.get("bullet_speed", 0.5)],
+                ["aimed", max(2, cfg.get("ways", 5)), cfg.get("spread_deg", 40), cfg.get("color", 10)],
+                ["wait", max(0, cfg.get("cooldown", 20)) + 1],
+                ["loop", 1, 0]]
+    elif typ == "program":
+        code = cfg["code"]
+    else:
+        return None
+    return assemble(code)
+
+class PatternVM:
+    """
+    Emitter ごとの命令列の実行状態を配列で持ち、step で全部を1フレーム進める。
+    attach(em, program) で載せてスロット番号を受け取り、パターンを外すときは detach(slot)
+    """
+    def __init__(self, bullets, capacity=16):
+        self.bullets = bullets
+        self.emitters = [None] * capacity
+        self.pc = np.zeros(capacity, dtype=np.int64)       # 命令の通し番号（全命令列を並べた code の中）
+        self.angle = np.zeros(capacity, dtype=np.float64)  # 度
+        self.speed = np.zeros(capacity, dtype=np.float64)
+        self.count = np.zeros(capacity, dtype=np.int64)    # loop の回数
+        self.gen = np.zeros(capacity, dtype=np.int64)      # attach ごとに増える世代（外した後の予定を捨てる）
+        self.free = list(range(capacity - 1, -1, -1))
+        # step の通し番号と、再開の予定表（frame -> (スロットの配列, 世代の配列)）
+        self.frame = 0
+        self.wake = TimingWheel()
+        self._unlink_all()
+
+    def _unlink_all(self):
+        # 載せた命令列を1本につないだもの（同じ命令列は1回だけ）
+        self.base = {}    # 命令列 -> 先頭の通し番号
+        self.progs = {}   # 先頭の通し番号 -> Program
+        self.op = np.zeros(0, dtype=np.uint8)
+        self.n = np.zeros(0, dtype=np.int64)
+        self.m = np.zeros(0, dtype=np.int64)
+        self.a = np.zeros(0, dtype=np.float64)
+        self.c = np.zeros(0, dtype=np.uint8)
+        self.halt = np.zeros(0, dtype=np.bool_)   # そのフレームの実行がそこで止まる命令（end と 0 でない wait）
+
+    @property
+    def live_count(self):
+        return len(self.emitters) - len(self.free)
+
+    def _link(self, prog):
+        """命令列を code の末尾につなぎ、先頭の通し番号を返す（loop の飛び先もずらす）"""
+        at = self.base.get(prog.code)
+        if at is None:
+            at = self.base[prog.code] = self.op.size
+            self.progs[at] = prog
+            n = np.where(prog.op == LOOP, prog.n + at, prog.n)
+            self.op = np.concatenate([self.op, prog.op])
+            self.n = np.concatenate([self.n, n])
+            self.m = np.concatenate([self.m, prog.m])
+            self.a = np.concatenate([self.a, prog.a])
+            self.c = np.concatenate([self.c, prog.c])
+            halt = (prog.op == END) | ((prog.op == WAIT) & (prog.n > 0))
+            self.halt = np.concatenate([self.halt, halt])
+        return at
+
+    def compact(self):
+        """
+        今載っていない命令列を code から外して詰める（パターン定義を読み直した後に呼ぶ）。
+        載っているスロットは、つなぎ直した位置の同じ命令から続ける
+        """
+        live = [s for s, em in enumerate(self.emitters) if em is not None]
+        if not self.progs:
+            return
+        starts = np.array(sorted(self.progs), dtype=np.int64)
+        pc = self.pc[live]
+        at = starts[np.searchsorted(starts, pc, side="right") - 1]
+        progs = self.progs
+        self._unlink_all()
+        new = np.array([self._link(progs[k]) for k in at.tolist()], dtype=np.int64)
+        self.pc[live] = pc - at + new
+
+    def _grow(self):
+        old = len(self.emitters)
+        new = old * 2
+        for name in ("pc", "angle", "speed", "count", "gen"):
+            a = getattr(self, name)
+            b = np.zeros(new, dtype=a.dtype)
+            b[:old] = a
+            setattr(self, name, b)
+        self.emitters.extend([None] * (new - old))
+        self.free[:0] = range(new - 1, old - 1, -1)
+
+    def attach(self, em, prog):
+        """em に命令列 prog を先頭から実行させる。戻り値はスロット番号"""
+        if not self.free:
+            self._grow()
+        s = self.free.pop()
+        self.emitters[s] = em
+        self.pc[s] = self._link(prog)
+        self.angle[s] = 0.0
+        self.speed[s] = 0.0
+        self.count[s] = 0
+        self.gen[s] += 1
+        # 次の step（update の前に載せればこのフレーム）から実行する
+        self.wake.schedule(self.frame, (np.array([s]), self.gen[s:s + 1].copy()))
+        return s
+
+    def detach(self, s):
+        self.emitters[s] = None
+        self.gen[s] += 1
+        self.free.append(s)
+
+    def clear(self):
+        self.emitters = [None] * len(self.emitters)
+        self.gen += 1
+        self.free = list(range(len(self.emitters) - 1, -1, -1))
+        self.wake.clear()
+        self._unlink_all()
+
+    def step(self, ctx):
+        """載っている全 Emitter の命令列を1フレーム進め、撃つ弾をまとめて spawn する"""
+        f = self.frame
+        self.frame += 1
+        due = self.wake.pop_due(f)
+        if not due:
+            return
+        idx = np.concatenate([s for s, _ in due])
+        gens = np.concatenate([g for _, g in due])
+        idx = np.sort(idx[self.gen[idx] == gens])
+        op_all, n_all, halt = self.op, self.n, self.halt
+        fired = []   # (スロット, 命令の通し番号, 向き, 速さ) を実行した順に
+        for _ in range(MAX_OPS):
+            if not idx.size:
+                break
+            pc = self.pc[idx]
+            op = op_all[pc]
+            nxt = pc + 1
+            # このラウンドにある命令の種類だけ処理する
+            kinds = np.bincount(op, minlength=7).tolist()
+
+            if kinds[SPEED]:
+                m = op == SPEED
+                self.speed[idx[m]] = self.a[pc[m]]
+            if kinds[ROTATE]:
+                m = op == ROTATE
+                self.angle[idx[m]] += self.a[pc[m]]
+            if kinds[RING] or kinds[AIMED]:
+                m = (op == RING) | (op == AIMED)
+                s = idx[m]
+                fired.append((s, pc[m], self.angle[s], self.speed[s]))
+            if kinds[LOOP]:
+                m = op == LOOP
+                s, p = idx[m], pc[m]
+                cnt = self.count[s] + 1
+                times = self.m[p]
+                back = (times == 0) | (cnt < times)
+                self.count[s] = np.where(back, cnt, 0)
+                nxt[m] = np.where(back, n_all[p], p + 1)
+            if kinds[WAIT]:
+                # 待つフレーム数ごとに1件で予定表に積む（0 フレームはそのまま続ける）
+                m = (op == WAIT) & halt[pc]
+                s, n = idx[m], n_all[pc[m]]
+                for k in sorted(set(n.tolist())):
+                    sk = s[n == k]
+                    self.wake.schedule(f + k, (sk, self.gen[sk]))
+            if kinds[END]:
+                # 予定表に積まないので、外されるまで止まったまま
+                m = op == END
+                nxt[m] = pc[m]
+
+            self.pc[idx] = nxt
+            # wait（0 フレームでないもの）と end に来たものはこのフレームはここまで
+            if kinds[WAIT] or kinds[END]:
+                idx = idx[~halt[pc]]
+        else:
+            # assemble が wait のない loop・長すぎる1フレームを弾いているので、ここには来ない
+            assert not idx.size, "pattern program ran MAX_OPS instructions without a wait"
+        if fired:
+            self._fire(fired, ctx)
+
+    def _fire(self, fired, ctx):
+        s = np.concatenate([f[0] for f in fired])
+        pc = np.concatenate([f[1] for f in fired])
+        ang = np.concatenate([f[2] for f in fired])
+        spd = np.concatenate([f[3] for f in fired])
+        ems = self.emitters
+        ex = np.array([ems[k].x for k in s.tolist()], dtype=np.float64)
+        ey = np.array([ems[k].y for k in s.tolist()], dtype=np.float64)
+        count = self.n[pc]
+        spread = self.a[pc]
+
+        # aimed は自機方向を中心にした扇（count-1 等分）、ring は今の向きから count 等分
+        aimed = self.op[pc] == AIMED
+        step = spread / count
+        if aimed.any():
+            px, py = ctx["player_pos"]
+            base = np.degrees(np.arctan2(py - ey[aimed], px - ex[aimed]))
+            k = count[aimed]
+            fan = k > 1
+            ang[aimed] = base - np.where(fan, spread[aimed] * 0.5, 0.0)
+            step[aimed] = np.where(fan, spread[aimed] / np.maximum(k - 1, 1), 0.0)
+
+        # 命令ごとの弾数だけ並べる（i は命令の中での弾の番号）
+        rep = np.repeat(np.arange(s.size), count)
+        i = np.arange(rep.size) - np.repeat(np.cumsum(count) - count, count)
+        a = (ang[rep] + i * step[rep]) * (math.pi / 180.0)
+        v = spd[rep]
+        self.bullets.spawn_many(ex[rep], ey[rep], np.cos(a) * v, np.sin(a) * v, r=1, c=self.c[pc][rep])
@@ -1,11 +1,20 @@
 # core/world.py
-import json
 import pyxel
 from .bullet import BulletSystem
+from .bullet_np import NumpyBulletSystem
 from .emitter import Emitter
+from .config import PatternConfigError, check_uses, validate_stage
+from .datacache import load_patterns, load_stage
+from .patterns import PatternFactory
+from .bake import load_baked
 from .timeline import Timeline
+from .vm import PatternVM
+from .paths import PATTERNS_PATH, STAGE_PATH
 from .ui import PatternMenu
 from .player import Player
+from .input import PyxelInput, NullInput
+from .profiler import FrameProfiler
+from .render import NullRenderer
 
 class Enemy:
     def __init__(self, x, y, hp, timeline, emitter):
@@ -20,32 +29,61 @@ class Enemy:
             self.timeline.tick(t, self.emitter, ctx)
         self.emitter.update(ctx)
 
-    def draw(self):
-        pyxel.circ(self.x, self.y, 3, 8)
+    def draw(self, gfx=pyxel):
+        gfx.circ(self.x, self.y, 3, 8)
+
+# 弾の管理バックエンド（"python" は1発1オブジェクトの従来版）
+BULLET_BACKENDS = {
+    "python": BulletSystem,
+    "numpy": NumpyBulletSystem,
+}
 
 class World:
-    def __init__(self, W, H, panel_w=70):
+    """
+    inp : 入力の取得元（省略時は Pyxel の入力）
+    gfx : 描画先。pyxel モジュール（既定）/ pyxel.Image / NullRenderer
+    F1 でフェーズ別の処理時間オーバーレイ、F2 でその記録を CSV に書き出す
+    headless=True なら入力なし・描画なしで、pyxel.init せずに動かせる
+    patterns / stage : パターン定義（"patterns" の中身）とステージの dict。省略時は PATTERNS_PATH / STAGE_PATH を
+                       datacache から読む（検証済みのキャッシュがあれば JSON は読まない）
+    use_baked : data/baked/ に今の定義から焼いた spawn 表があれば、そのパターンは表の再生にする
+    定義を書き換えたときは reload で、作り直さずに変わったところだけ差し替えられる
+    """
+    def __init__(self, W, H, panel_w=70, bullet_backend="numpy", inp=None, gfx=None, headless=False,
+                 patterns=None, stage=None, use_baked=True):
+        if headless:
+            inp = inp or NullInput()
+            gfx = gfx or NullRenderer()
+        inp = inp or PyxelInput()
+        self.inp = inp
+        self.gfx = pyxel if gfx is None else gfx
         self.W, self.H = W, H
         self.panel_w = panel_w
         self.t = 0
         self.timeline_enabled = False
-        self.bullets = BulletSystem(W + panel_w, H)  # 弾は全画面で生かす
+        self.bullet_backend = bullet_backend
+        self.bullets = BULLET_BACKENDS[bullet_backend](W + panel_w, H)  # 弾は全画面で生かす
 
-        with open("data/patterns_demo.json","r",encoding="utf-8") as f:
-            self.patterns_data = json.load(f)["patterns"]
-        with open("data/stage01.json","r",encoding="utf-8") as f:
-            stage = json.load(f)
+        configs = None
+        if patterns is None:
+            patterns, configs = load_patterns(PATTERNS_PATH)
+        if stage is None:
+            stage = load_stage(STAGE_PATH, patterns)
+        else:
+            check_uses(validate_stage(stage), patterns)
+        self.patterns_data = patterns
+        self.use_baked = use_baked
+        self.factory = PatternFactory(patterns, baked=load_baked(patterns) if use_baked else None, configs=configs)
+        # 命令列のパターンは全敵分をここでまとめて回す
+        self.vm = PatternVM(self.bullets)
 
-        self.enemies = []
-        for e in stage["enemies"]:
-            tl = Timeline(e["script"])
-            em = Emitter(e["x"], e["y"], self.bullets, self.patterns_data)
-            self.enemies.append(Enemy(e["x"], e["y"], e.get("hp", 1), tl, em))
+        self.stage = stage
+        self.enemies = [self._make_enemy(e) for e in stage["enemies"]]
 
         # 右パネル：データにあるパターンキーを一覧表示
         items = list(self.patterns_data.keys())
         panel_x = self.W  # ゲーム領域の右隣から開始
-        self.menu = PatternMenu(panel_x, 0, self.panel_w, self.H, items)
+        self.menu = PatternMenu(panel_x, 0, self.panel_w, self.H, items, inp=inp)
         left_area_w = self.W  # 右パネルを除いた左エリアの幅
         self.player = Player(
             x=left_area_w // 2,
@@ -54,32 +92,160 @@ class World:
             h=self.H,
             radius=1,
             color=3,  # 緑の点
-        )        
+            inp=inp,
+        )
+
+        self._make_profiler()
+
+    def _make_profiler(self):
+        # フェーズ別の処理時間（敵は1体ずつ別の列）
+        self.enemy_phases = [f"enemy{k}.update" for k in range(len(self.enemies))]
+        self.prof = FrameProfiler(
+            ["player.update", "menu.handle_input", *self.enemy_phases, "patterns.vm", "bullets.update", "hits",
+             "world.draw", "bullets.draw", "player.draw", "menu.draw"]
+        )
+
+    def _make_enemy(self, e, start=0):
+        tl = Timeline(e["script"], start)
+        em = Emitter(e["x"], e["y"], self.bullets, self.patterns_data, factory=self.factory, vm=self.vm)
+        return Enemy(e["x"], e["y"], e.get("hp", 1), tl, em)
+
+    def reload(self, patterns=None, stage=None):
+        """
+        書き換えたパターン定義（"patterns" の中身）・ステージを、World を作り直さずに反映する。
+        パターンは定義が変わった・増えた・消えたものだけ作り置きを捨て、それを撃っている Emitter は
+        弾を残したまま新しい定義で撃ち直す。ステージは敵ごとに比べ、台本が変わった敵だけ Timeline を
+        作り直す（今のフレームより前のコマンドは実行済みとして飛ばす）。増えた敵は足し、減った敵は外す。
+        変わったパターンが作れなければ PatternConfigError、ステージが間違っていれば（無いパターンを使う台本も）
+        StageConfigError で（どちらも ValueError）、何も変えない。
+        戻り値は {"changed": [...], "removed": [...], "enemies": [変わった敵の番号]}
+        """
+        out = {"changed": [], "removed": [], "enemies": []}
+        if stage is not None:
+            # 台本のパターン名は、書き換え後のパターン定義で確かめる
+            check_uses(validate_stage(stage), self.patterns_data if patterns is None else patterns)
+        if patterns is not None:
+            old = self.patterns_data
+            changed = [n for n, cfg in patterns.items() if old.get(n) != cfg]
+            removed = [n for n in old if n not in patterns]
+            # 先に全部検証して作ってみて、壊れた定義があれば今の状態のまま止める
+            # （型・値の間違いは PatternFactory がまとめて PatternConfigError にする。
+            #   命令列は実行しなくても、wait のない loop などは assemble が弾く）
+            trial = PatternFactory({n: patterns[n] for n in changed}, use_vm=self.factory.use_vm)
+            errors = []
+            for name in changed:
+                try:
+                    trial.make(name)
+                except Exception as e:
+                    errors.append(f"{name}: {type(e).__name__}: {e}")
+            if errors:
+                raise PatternConfigError(errors)
+            if changed or removed or list(old) != list(patterns):
+                # dict は Emitter・PatternFactory と共有しているので、中身を入れ替える
+                old.clear()
+                old.update(patterns)
+                baked = load_baked({n: old[n] for n in changed}) if self.use_baked else None
+                self.factory.forget(changed + removed, baked)
+                gone = set(changed) | set(removed)
+                for enemy in self.enemies:
+                    if enemy.emitter.active_name in gone:
+                        enemy.emitter.reload_pattern()
+                # 古い定義の命令列は PatternVM に残るので、今載っているものだけに詰める
+                self.vm.compact()
+                self.menu.set_items(list(old))
+            out["changed"], out["removed"] = changed, removed
+
+        if stage is not None:
+            olds, news = self.stage["enemies"], stage["enemies"]
+            for k, e in enumerate(news):
+                if k >= len(self.enemies):
+                    self.enemies.append(self._make_enemy(e, start=self.t))
+                elif olds[k] != e:
+                    enemy = self.enemies[k]
+                    if olds[k]["script"] != e["script"]:
+                        enemy.timeline = Timeline(e["script"], start=self.t)
+                    enemy.x, enemy.y = e["x"], e["y"]
+                    enemy.hp = e.get("hp", 1)
+                else:
+                    continue
+                out["enemies"].append(k)
+            for k in range(len(news), len(self.enemies)):
+                self.enemies[k].emitter.stop()
+                out["enemies"].append(k)
+            del self.enemies[len(news):]
+            if len(self.enemy_phases) != len(self.enemies):
+                show = self.prof.show
+                self._make_profiler()
+                self.prof.show = show
+            self.stage = stage
+        return out
+
+    def hotkeys(self):
+        """F1: 処理時間オーバーレイの表示切替 / F2: その記録を CSV に書き出す（1 tick に1回呼ぶ）"""
+        if self.inp.btnp(pyxel.KEY_F1):
+            self.prof.show = not self.prof.show
+        if self.inp.btnp(pyxel.KEY_F2):
+            print(f"profile -> {self.prof.dump_csv()}")
 
     def update(self):
+        prof = self.prof
+        self.inp.begin_frame(self.t)
+        prof.begin(self.t)
+
         ctx = {"player_pos": (self.player.x, self.player.y)}
         self.player.update()
-        decided = self.menu.handle_input()
+        prof.lap("player.update")
+        decided = self.inp.select(self.menu.handle_input())
         if decided:
             # ひとまず先頭の敵の発射器に適用（必要なら選択中の敵に拡張）
             if self.enemies:
                 self.enemies[0].emitter.set_pattern(decided)
             # self.timeline_enabled = True
+        prof.lap("menu.handle_input")
 
-        for enemy in self.enemies:
+        for enemy, phase in zip(self.enemies, self.enemy_phases):
             enemy.update(self.t, ctx, use_timeline=self.timeline_enabled)
+            prof.lap(phase)
+        self.vm.step(ctx)
+        prof.lap("patterns.vm")
 
         self.bullets.update(ctx)
+        prof.lap("bullets.update")
+
+        # 自機と弾の当たり判定（グリッドで自機周辺の弾だけを調べる）
+        hit = self.bullets.hits(self.player.x, self.player.y, self.player.r)
+        if hit.size:
+            self.player.on_hit(hit.size)
+        prof.lap("hits")
 
         self.t += 1
 
+    def step(self, n_frames=1):
+        """描画・待ちなしで update を n_frames 回進める（ヘッドレス実行・計測用）"""
+        update = self.update
+        for _ in range(n_frames):
+            update()
+        return self.t
+
     def draw(self):
+        gfx = self.gfx
+        if isinstance(gfx, NullRenderer):
+            return
+        prof = self.prof
+        prof.resume()
         # 左：ゲーム領域のガイド（任意）
-        pyxel.rectb(0, 0, self.W, self.H, 13)
+        gfx.rectb(0, 0, self.W, self.H, 13)
         for enemy in self.enemies:
-            enemy.draw()
-        self.bullets.draw()
-        self.player.draw()
-        
+            enemy.draw(gfx)
+        prof.lap("world.draw")
+        self.bullets.draw(None if gfx is pyxel else gfx)
+        prof.lap("bullets.draw")
+        self.player.draw(gfx)
+        prof.lap("player.draw")
+
         # 右：メニュー
-        self.menu.draw("PATTERNS")
+        self.menu.draw("PATTERNS", gfx)
+        prof.lap("menu.draw")
+
+        if prof.show:
+            prof.draw_overlay(gfx)
@@ -1,5 +1,11 @@
+import argparse
+import time
 import pyxel
+from core.paths import PATTERNS_PATH, STAGE_PATH
 from core.world import World
+from core.record import RecordingInput
+from core.reload import DataWatcher, apply_reload
+from core.loop import FixedStep, Degrader
 
 # 左がゲーム領域、右がメニュー
 GAME_W, GAME_H = 200, 150
@@ -12,45 +18,81 @@ STATE_TITLE = 0
 STATE_PLAY  = 1
 
 class App:
-    def __init__(self):
-        pyxel.init(W, H, title="Barrage MVP", fps=60)
+    def __init__(self, record=None):
+        # record: 入力を記録するファイル。ESC で終了するときに最後の World の入力を書き出す
+        self.record = record
+        self.rec_inp = None
+        pyxel.init(W, H, title="Barrage MVP", fps=60,
+                   quit_key=pyxel.KEY_NONE if record else pyxel.KEY_ESCAPE)
         pyxel.mouse(True)
         self.state = STATE_TITLE
-        self.world = World(GAME_W, GAME_H, panel_w=PANEL_W)  # ゲーム本体は開始時に生成
+        # 処理落ちしても 60 ステップ/秒で進め（1 tick 最大4ステップ）、重い状態が続けば手を抜く
+        self.loop = FixedStep(fps=60, max_steps=4)
+        self.degrade = Degrader(budget_ms=8.0, engage_after=30)
+        self.world = self.new_world()  # ゲーム本体は開始時に生成
+        # パターン定義・ステージを書き換えたら、World を作り直さずに変わったところだけ差し替える
+        # （記録中は再生と一致しなくなるので見張らない）
+        self.watcher = None if record else DataWatcher([PATTERNS_PATH, STAGE_PATH])
         pyxel.run(self.update, self.draw)
 
+    def new_world(self):
+        self.loop.reset()
+        if not self.record:
+            world = World(GAME_W, GAME_H, panel_w=PANEL_W)
+        else:
+            self.rec_inp = RecordingInput()
+            world = World(GAME_W, GAME_H, panel_w=PANEL_W, inp=self.rec_inp)
+            self.rec_inp.attach(world)
+        world.bullets.thin = self.degrade.thin
+        return world
+
     # --- 入力とロジック ---
     def update(self):
+        if self.record and pyxel.btnp(pyxel.KEY_ESCAPE):
+            rec = self.rec_inp.save(self.record)
+            print(f"recorded {len(rec)} frames -> {self.record}")
+            pyxel.quit()
         if pyxel.btnp(pyxel.KEY_R):
             self.reset_game()
+        if self.watcher is not None:
+            docs = self.watcher.poll()
+            if docs:
+                apply_reload(self.world, docs)
         # ESCはPyxel標準で終了（別途処理不要）
         if self.state == STATE_TITLE:
             # SPACEを「押した瞬間」で判定（btnp: ボタン・プレス）
             if pyxel.btnp(pyxel.KEY_SPACE):
                 self.start_game()
         elif self.state == STATE_PLAY:
-            # ゲーム中の更新
-            self.world.update()
+            # ゲーム中の更新（経過時間ぶんだけ固定ステップで進める）
+            self.world.hotkeys()
+            for cost in self.loop.advance(self.world.update):
+                if self.degrade.feed(cost * 1e3):
+                    self.world.bullets.thin = self.degrade.thin
             # ここでポーズ等を入れたければ追加可能
             # if pyxel.btnp(pyxel.KEY_P): ...
 
     def reset_game(self):
         self.state = STATE_PLAY
-        self.world = World(GAME_W, GAME_H, panel_w=PANEL_W)   # Worldを初期化
+        self.world = self.new_world()   # Worldを初期化
         # もしスコアや残機があるならここでリセット
 
     # --- 描画 ---
     def draw(self):
+        if self.state == STATE_PLAY and not self.degrade.should_draw():
+            return   # 前のフレームの画面をそのまま出す
         pyxel.cls(1)
         if self.state == STATE_TITLE:
             self.draw_title()
         elif self.state == STATE_PLAY:
             self.world.draw()
+            if self.degrade.level:
+                pyxel.text(2, GAME_H - 8, f"LOAD: {Degrader.LEVELS[self.degrade.level].upper()}", 8)
 
     # --- ヘルパ ---
     def start_game(self):
         # 新しいWorldを生成してゲーム開始
-        self.world = World(GAME_W, GAME_H, panel_w=PANEL_W)
+        self.world = self.new_world()
         self.state = STATE_PLAY
 
     def draw_title(self):
@@ -65,5 +107,23 @@ class App:
         pyxel.text(x_msg1,  H//2,      msg1, 7)
         pyxel.text(x_msg2,  H//2 + 12, msg2, 6)
 
+def run_headless(frames, backend):
+    """ウィンドウを開かずに frames フレーム進め、所要時間と弾数を表示する"""
+    world = World(GAME_W, GAME_H, panel_w=PANEL_W, bullet_backend=backend, headless=True)
+    world.timeline_enabled = True
+    t0 = time.perf_counter()
+    world.step(frames)
+    dt = time.perf_counter() - t0
+    print(f"{frames} frames in {dt:.3f}s ({frames / dt:.0f} fps), "
+          f"live={world.bullets.live_count} peak={world.bullets.stats.high_water}")
+
 if __name__ == "__main__":
-    App()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--headless", type=int, metavar="FRAMES", help="ウィンドウなしで指定フレーム数だけ回す")
+    ap.add_argument("--backend", default="numpy", choices=["python", "numpy"])
+    ap.add_argument("--record", metavar="PATH", help="プレイ中の入力を記録（再生は python -m tools.replay PATH）")
+    args = ap.parse_args()
+    if args.headless:
+        run_headless(args.headless, args.backend)
+    else:
+        App(record=args.record)
@@ -0,0 +1,52 @@
+# スカラー版（BulletSystem）と NumPy 版（NumpyBulletSystem）が同じ入力で同じ弾を出すか。
+# NumPy 版は float32 で位置を積み足すので、比べるのは許容差つき（tools/replay.py の check と同じ規則）
+
+import numpy as np
+from core.bullet import BulletSystem, exit_step, exit_steps
+from core.record import replay_world
+from tools.replay import check
+
+def test_replay_backends_match(recording):
+    assert check(recording, ["python", "numpy"], atol=1e-3, every=5, rtol=1e-5) == 0
+
+def test_replay_live_counts_match(recording):
+    worlds = [replay_world(recording, b) for b in ("python", "numpy")]
+    for _ in range(len(recording)):
+        for w in worlds:
+            w.update()
+    py, np_ = (w.bullets for w in worlds)
+    assert py.stats.spawned == np_.stats.spawned > 0
+    assert worlds[0].player.hits == worlds[1].player.hits
+
+def test_spawn_many_matches_spawn():
+    # まとめて置いても1発ずつ置いても、同じスロット・同じ予定になる（間引き・拡張・取りこぼし込み）
+    def run(batched):
+        bs = BulletSystem(200, 150, capacity=8, max_capacity=64)
+        bs.thin = 3
+        out = []
+        for t in range(120):
+            n = 7 + t % 5
+            ang = np.linspace(0, 2 * np.pi, n, endpoint=False) + t
+            vx, vy = np.cos(ang) * 1.3, np.sin(ang) * 1.3
+            life = [-1, 0, 5, 40, 100, 3, -1, 8, 9, 10, 11][:n]
+            beh = [None, {"type": "speed_schedule", "steps": [{"at": 3, "speed": 0.2}, {"at": 9, "speed": 2}]},
+                   {"type": "grav", "g": 0.05, "max_speed": 2}] * 4
+            act = {"on": "after", "frames": 4, "count": 2, "speed": 1} if t % 3 == 0 else None
+            if batched:
+                bs.spawn_many(100.0, 70.0, vx, vy, r=1, c=7, life=life, behavior=beh[:n], action=act)
+            else:
+                for i in range(n):
+                    bs.spawn(100.0, 70.0, float(vx[i]), float(vy[i]), r=1, c=7, life=life[i],
+                             behavior=beh[i], action=act)
+            bs.update({"player_pos": (100.0, 140.0)})
+            out.append((bs.snapshot().tobytes(), [b.slot for b in bs.pool if b.alive]))
+        return out, bs.stats.as_dict()
+    assert run(True) == run(False)
+
+def test_exit_steps_matches_exit_step():
+    rng = np.random.default_rng(7)
+    p = np.concatenate([rng.uniform(-20, 300, 5000), [-4.0, 274.0, 0.0, -5.0, 280.0]])
+    v = np.concatenate([rng.normal(0, 2, 5000), [0.0, 0.0, 1e-12, 0.0, -1e-15]])
+    got = exit_steps(p, v, -4, 274).tolist()
+    want = [exit_step(a, b, -4, 274) for a, b in zip(p.tolist(), v.tolist())]
+    assert [None if n < 0 else n for n in got] == want
@@ -0,0 +1,65 @@
+# 検証済みデータ（datacache）と BulletML のコンパイル結果のキャッシュが、壊れていても書けなくても動くか
+
+import glob
+import os
+import pytest
+from core import bulletml, datacache
+from core.paths import PATTERNS_PATH
+
+BML = "data/bulletml/spiral_brake.xml"
+
+@pytest.fixture(autouse=True)
+def no_memo(monkeypatch):
+    # プロセス内のメモを空にして、毎回キャッシュファイルを通す
+    monkeypatch.setattr(datacache, "_memo", {})
+    monkeypatch.setattr(bulletml, "_loaded", {})
+
+def test_patterns_cache_round_trip(tmp_path):
+    patterns, configs = datacache.load_patterns(PATTERNS_PATH, cache_dir=str(tmp_path))
+    assert len(glob.glob(str(tmp_path / "*.pkl"))) == 1
+    datacache._memo.clear()
+    again, cached = datacache.load_patterns(PATTERNS_PATH, cache_dir=str(tmp_path))
+    assert again == patterns
+    assert {n: c.as_dict() for n, c in cached.items()} == {n: c.as_dict() for n, c in configs.items()}
+
+def test_corrupt_patterns_cache_is_rebuilt(tmp_path, capsys):
+    want, _ = datacache.load_patterns(PATTERNS_PATH, cache_dir=None)
+    (cpath,) = [datacache._cache_path(PATTERNS_PATH, str(tmp_path))]
+    with open(cpath, "wb") as f:
+        f.write(b"not a pickle")
+    datacache._memo.clear()
+    got, _ = datacache.load_patterns(PATTERNS_PATH, cache_dir=str(tmp_path))
+    assert got == want
+    assert "ignoring" in capsys.readouterr().out
+    # 作り直したキャッシュは読める
+    assert datacache.read_cache(cpath) is not None
+
+def test_unwritable_cache_dir(tmp_path, capsys):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    got, _ = datacache.load_patterns(PATTERNS_PATH, cache_dir=str(blocker / "sub"))
+    assert got
+    assert "cannot write" in capsys.readouterr().out
+
+def test_corrupt_bulletml_cache_is_recompiled(tmp_path, capsys):
+    want = bulletml.load_bulletml(BML, cache_dir=None)
+    bulletml._loaded.clear()
+    bulletml.load_bulletml(BML, cache_dir=str(tmp_path))
+    (cpath,) = glob.glob(str(tmp_path / "*.pkl"))
+    with open(cpath, "wb") as f:
+        f.write(b"\x80\x05garbage")
+    bulletml._loaded.clear()
+    assert bulletml.load_bulletml(BML, cache_dir=str(tmp_path)) == want
+    assert "ignoring" in capsys.readouterr().out
+    assert os.path.getsize(cpath) > 16
+
+def test_unwritable_bulletml_cache_dir(tmp_path, capsys):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    assert bulletml.load_bulletml(BML, cache_dir=str(blocker / "sub"))
+    assert "cannot write" in capsys.readouterr().out
+
+def test_bulletml_change_needs_term():
+    xml = b'<bulletml><action label="top"><changeDirection><direction>3</direction></changeDirection></action></bulletml>'
+    with pytest.raises(ValueError, match="needs <term>"):
+        bulletml.compile_bulletml(xml)
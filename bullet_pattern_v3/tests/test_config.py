@@ -0,0 +1,51 @@
+# パターン定義・ステージの検証（config.py）。実行中に落ちる値・範囲外の値は読み込みで弾く
+
+import pytest
+from core.config import PatternConfigError, StageConfigError, validate_patterns, validate_stage
+from core.patterns import PatternFactory
+
+def test_demo_patterns_are_valid(patterns):
+    configs = validate_patterns(patterns)
+    assert set(configs) == set(patterns)
+
+@pytest.mark.parametrize("cfg, field", [
+    ({"type": "aimed", "bullet_speed": 1, "count": 3, "interval": 0}, "interval"),
+    ({"type": "circular", "bullet_speed": 1, "count": 0}, "count"),
+    ({"type": "spinner", "bullet_speed": 1, "count": 8, "cooldown": -1}, "cooldown"),
+    ({"type": "nway_aimed", "ways": 1}, "ways"),
+    ({"type": "nway_aimed", "cooldown": -5}, "cooldown"),
+    ({"type": "two_split", "travel_frames": 0}, "travel_frames"),
+    ({"type": "gravity", "rate": 0}, "rate"),
+    ({"type": "speed_change", "rate": -1}, "rate"),
+    ({"type": "proximity_burst", "rate": 0}, "rate"),
+    ({"type": "homing_laser", "aim_term": 0}, "aim_term"),
+    ({"type": "homing_laser", "interval_in_cluster": 0}, "interval_in_cluster"),
+    ({"type": "rolling_fire", "accel_term": -1}, "accel_term"),
+    ({"type": "circle_fire", "ring_count": 0}, "ring_count"),
+    ({"type": "nway_aimed", "color": 16}, "color"),
+    ({"type": "bulletml", "file": "x.xml", "rank": 1.5}, "rank"),
+    ({"type": "aimed", "bullet_speed": 1, "count": 2.5}, "count"),
+    ({"type": "aimed", "bullet_speed": "fast", "count": 2}, "bullet_speed"),
+    ({"type": "aimed", "count": 2}, "bullet_speed"),
+    ({"type": "circular", "bullet_speed": 1, "count": 4, "speed": 2}, "speed"),
+])
+def test_out_of_range_field_is_rejected(cfg, field):
+    with pytest.raises(PatternConfigError) as e:
+        validate_patterns({"p": cfg})
+    assert any(err.startswith(f"p.{field}:") for err in e.value.errors), e.value.errors
+
+def test_all_errors_reported_together():
+    with pytest.raises(PatternConfigError) as e:
+        PatternFactory({"a": {"type": "aimed", "bullet_speed": 1, "count": 3, "interval": 0},
+                        "b": {"type": "gravity", "rate": 0},
+                        "c": {"type": "nope"}})
+    assert len(e.value.errors) == 3
+
+def test_stage_uses_and_errors():
+    ok = {"enemies": [{"x": 10, "y": 20, "script": [{"at": 0, "cmd": "use", "pattern": "spinner"}]}]}
+    assert validate_stage(ok) == ("spinner",)
+    bad = {"enemies": [{"x": 10, "y": "top", "spawn_frame": -1,
+                        "script": [{"at": 0, "cmd": "fly", "pattern": "spinner"}]}]}
+    with pytest.raises(StageConfigError) as e:
+        validate_stage(bad)
+    assert len(e.value.errors) == 3, e.value.errors
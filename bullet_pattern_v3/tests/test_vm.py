@@ -0,0 +1,54 @@
+# 命令列（PatternVM）にしたパターンが、元のクラスと同じ数の弾を同じ所へ撃つか。
+# 命令列の間違い（wait のない loop など）は読み込み時に弾かれるか
+
+import numpy as np
+import pytest
+from core.config import PatternConfigError
+from core.emitter import Emitter
+from core.patterns import PatternFactory
+from core.vm import PatternVM, assemble, compile_pattern
+from core.world import BULLET_BACKENDS
+
+def run(patterns, name, use_vm, frames=400):
+    factory = PatternFactory(patterns, use_vm=use_vm)
+    b = BULLET_BACKENDS["python"](270, 150)
+    vm = PatternVM(b)
+    em = Emitter(100.0, 30.0, b, patterns, factory=factory, vm=vm)
+    em.set_pattern(name)
+    ctx = {"player_pos": (120.0, 130.0)}
+    live = []
+    for t in range(frames):
+        em.update(ctx)
+        vm.step(ctx)
+        b.update(ctx)
+        live.append(b.live_count)
+    return b.stats.spawned, live, b.snapshot()
+
+def test_vm_matches_classes(patterns):
+    names = [n for n, cfg in patterns.items() if cfg["type"] != "program" and compile_pattern(cfg) is not None]
+    assert names
+    for name in names:
+        cls_spawned, cls_live, cls_snap = run(patterns, name, use_vm=False)
+        vm_spawned, vm_live, vm_snap = run(patterns, name, use_vm=True)
+        assert vm_spawned == cls_spawned > 0, name
+        assert vm_live == cls_live, name
+        # 回転の足し方の違いで丸めが1桁ずれるだけ
+        assert np.allclose(np.sort(vm_snap, axis=0), np.sort(cls_snap, axis=0), atol=1e-9), name
+
+@pytest.mark.parametrize("code", [
+    [["ring", 4], ["loop", 0]],                              # wait のない無限ループ
+    [["ring", 4], ["wait", 0], ["loop", 0]],                 # wait 0 は止まらない
+    [["ring", 4], ["rotate", 3], ["loop", 0, 5], ["end"]],   # 回数つきでも中で止まらない
+    [["rotate", 1]] * 70 + [["end"]],                        # 1フレームで MAX_OPS を超える
+])
+def test_assemble_rejects_programs_that_never_yield(code):
+    with pytest.raises(ValueError):
+        assemble(code)
+
+def test_program_falls_off_end_gets_end():
+    prog = assemble([["ring", 4], ["wait", 3]])
+    assert len(prog.code) == 3
+
+def test_bad_program_is_a_pattern_error():
+    with pytest.raises(PatternConfigError, match="never yield"):
+        PatternFactory({"x": {"type": "program", "code": [["ring", 4], ["loop", 0]]}})
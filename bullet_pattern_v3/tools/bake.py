@@ -0,0 +1,48 @@
+# bake.py
+# data/patterns_demo.json のうち焼けるパターン（プレイヤーに依存しないもの）を
+# data/baked/<名前>.bake の spawn 表に焼く。World は定義が一致する表を自動で使う。
+#
+#   python -m tools.bake
+#   python -m tools.bake --patterns spinner rolling_fire_1943
+#   python -m tools.bake --clean          # 焼いた表を消す（すべて通常のパターンに戻る）
+
+import argparse
+import json
+import os
+from core.bake import BAKE_DIR, bake, bakeable
+from core.paths import PATTERNS_PATH
+
+def main():
+    ap = argparse.ArgumentParser(description="bake player-independent patterns into spawn tables")
+    ap.add_argument("--patterns", nargs="*", help="対象パターン（省略時は焼けるもの全部）")
+    ap.add_argument("--out", default=BAKE_DIR)
+    ap.add_argument("--max-frames", type=int, default=36000, help="終わるパターンを回す上限フレーム数")
+    ap.add_argument("--clean", action="store_true", help="out の .bake を消す")
+    args = ap.parse_args()
+
+    if args.clean:
+        if os.path.isdir(args.out):
+            for fn in os.listdir(args.out):
+                if fn.endswith(".bake"):
+                    os.remove(os.path.join(args.out, fn))
+                    print(f"removed {fn}")
+        return
+
+    with open(PATTERNS_PATH, "r", encoding="utf-8") as f:
+        patterns = json.load(f)["patterns"]
+    names = args.patterns or [n for n, cfg in patterns.items() if bakeable(cfg)]
+    os.makedirs(args.out, exist_ok=True)
+    print(f"{'pattern':>24} | {'frames':>6} {'bullets':>8} {'mode':>5} {'bytes':>8}")
+    for name in names:
+        try:
+            table = bake(name, patterns[name], args.max_frames)
+        except (KeyError, ValueError) as e:
+            print(f"{name:>24} | skipped: {e}")
+            continue
+        path = os.path.join(args.out, f"{name}.bake")
+        table.save(path)
+        mode = "loop" if table.loop else "stop"
+        print(f"{name:>24} | {table.frames:6d} {table.x.size:8d} {mode:>5} {os.path.getsize(path):8d}")
+
+if __name__ == "__main__":
+    main()
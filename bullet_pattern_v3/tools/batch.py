@@ -0,0 +1,174 @@
+# batch.py
+# ステージ・パターンのパラメータ違いをまとめてヘッドレスで回し、結果を1つの表にする。
+# ジョブは (ステージ, パターン定義の上書き, seed) の組で、ProcessPoolExecutor で全コアに配る。
+# 1ジョブごとに 最大同時弾数・spawn 数・update の処理時間・画面の被覆率・被弾数 を集める。
+#
+#   python -m tools.batch jobs.json --workers 8 --csv result.csv
+#   python -m tools.batch --sweep spinner bullet_speed 1.0 1.5 2.0 --sweep spinner count 8 16 24 --seeds 0 1 2
+#   python -m tools.batch --pattern spinner --sweep spinner angular_speed_deg 2 3 5 --frames 900
+#
+# jobs.json はジョブの配列（または {"jobs": [...]}）。1ジョブの例:
+#   {"name": "fast_spin", "stage": "data/stage01.json",
+#    "overrides": {"spinner": {"bullet_speed": 2.4}}, "seed": 1, "frames": 1800}
+#   stage    : ステージ JSON のパスか dict（省略時 data/stage01.json）
+#   overrides: パターン名 -> 上書きするパラメータ
+#   seed     : seed を持つ全パターンの seed を上書き（省略時は定義のまま）
+#   pattern  : 指定するとタイムラインを使わず、先頭の敵にこのパターンだけを載せる
+
+import argparse
+import copy
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from core.config import SCHEMA
+from core.paths import PATTERNS_PATH, STAGE_PATH
+from core.world import World
+
+GAME_W, GAME_H, PANEL_W = 200, 150, 70
+CELL = 4   # 被覆率を数えるマス（px）
+
+COLUMNS = ("name", "seed", "frames", "peak", "spawned", "upd_mean", "upd_p95", "upd_max",
+           "cov_mean", "cov_max", "hits", "sec", "error")
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def coverage(bullets):
+    """ゲーム領域を CELL 角のマスに分け、弾が1発でも入っているマスの割合"""
+    s = bullets.snapshot()
+    nx, ny = GAME_W // CELL, GAME_H // CELL
+    cx = (s[:, 0] // CELL).astype(np.int64)
+    cy = (s[:, 1] // CELL).astype(np.int64)
+    m = (cx >= 0) & (cx < nx) & (cy >= 0) & (cy < ny)
+    return np.unique(cy[m] * nx + cx[m]).size / (nx * ny)
+
+def run_job(job):
+    """1ジョブを回して結果の dict を返す（例外はエラー文字列として返す）"""
+    res = {"name": job.get("name", ""), "seed": job.get("seed", ""), "frames": job.get("frames", 1800)}
+    t0 = time.perf_counter()
+    try:
+        patterns = copy.deepcopy(load_json(job.get("patterns", PATTERNS_PATH))["patterns"])
+        stage = job.get("stage", STAGE_PATH)
+        if isinstance(stage, str):
+            stage = load_json(stage)
+        for name, over in job.get("overrides", {}).items():
+            if name not in patterns:
+                raise KeyError(f"unknown pattern in overrides: {name}")
+            patterns[name].update(over)
+        if "seed" in job:
+            # seed を持たない種類（circular など）に足すと未知のフィールドになる
+            for cfg in patterns.values():
+                if any(f[0] == "seed" for f in SCHEMA.get(cfg.get("type"), ())):
+                    cfg["seed"] = job["seed"]
+
+        world = World(GAME_W, GAME_H, panel_w=PANEL_W, bullet_backend=job.get("backend", "numpy"),
+                      headless=True, patterns=patterns, stage=stage)
+        if job.get("pattern"):
+            world.enemies[0].emitter.set_pattern(job["pattern"])
+        else:
+            world.timeline_enabled = True
+
+        frames = res["frames"]
+        sample = max(1, int(job.get("sample", 10)))
+        upd = np.empty(frames)
+        cov = []
+        clock = time.perf_counter
+        for k in range(frames):
+            t1 = clock()
+            world.update()
+            upd[k] = clock() - t1
+            if k % sample == 0:
+                cov.append(coverage(world.bullets))
+        upd *= 1e3
+        stats = world.bullets.stats
+        res.update(
+            peak=stats.high_water, spawned=stats.spawned,
+            upd_mean=float(upd.mean()), upd_p95=float(np.percentile(upd, 95)), upd_max=float(upd.max()),
+            cov_mean=float(np.mean(cov)), cov_max=float(np.max(cov)), hits=world.player.hits,
+        )
+    except Exception as e:
+        res["error"] = f"{type(e).__name__}: {e}"
+    res["sec"] = time.perf_counter() - t0
+    return res
+
+def parse_value(s):
+    try:
+        return json.loads(s)
+    except ValueError:
+        return s
+
+def sweep_jobs(sweeps, seeds, frames, pattern, backend):
+    """--sweep の各軸の直積 × seeds のジョブを作る"""
+    axes = []
+    for pat, key, *values in sweeps:
+        axes.append([(pat, key, parse_value(v)) for v in values])
+    jobs = []
+    for combo in itertools.product(*axes) if axes else [()]:
+        overrides = {}
+        for pat, key, v in combo:
+            overrides.setdefault(pat, {})[key] = v
+        base = ",".join(f"{pat}.{key}={v}" for pat, key, v in combo) or "base"
+        for seed in seeds if seeds else [None]:
+            job = {"name": base, "overrides": overrides, "frames": frames, "backend": backend}
+            if seed is not None:
+                job["seed"] = seed
+            if pattern:
+                job["pattern"] = pattern
+            jobs.append(job)
+    return jobs
+
+def main():
+    ap = argparse.ArgumentParser(description="headless batch runs over stage/pattern variants")
+    ap.add_argument("jobs", nargs="?", help="ジョブの JSON（省略時は --sweep から作る）")
+    ap.add_argument("--sweep", nargs="+", action="append", default=[], metavar="PATTERN KEY VALUE",
+                    help="パターン PATTERN のパラメータ KEY を VALUE... で振る（複数指定で直積）")
+    ap.add_argument("--seeds", nargs="*", type=int, default=[])
+    ap.add_argument("--pattern", help="タイムラインを使わずこのパターンだけを回す")
+    ap.add_argument("--frames", type=int, default=1800)
+    ap.add_argument("--backend", default="numpy", choices=["python", "numpy"])
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="プロセス数（既定は CPU 数）")
+    ap.add_argument("--csv", metavar="PATH", help="結果を CSV に書き出す")
+    args = ap.parse_args()
+
+    for sw in args.sweep:
+        if len(sw) < 3:
+            ap.error("--sweep needs PATTERN KEY VALUE...")
+    if args.jobs:
+        jobs = load_json(args.jobs)
+        jobs = jobs["jobs"] if isinstance(jobs, dict) else jobs
+    else:
+        jobs = sweep_jobs(args.sweep, args.seeds, args.frames, args.pattern, args.backend)
+    for k, job in enumerate(jobs):
+        job.setdefault("name", f"job{k}")
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as ex:
+        results = list(ex.map(run_job, jobs, chunksize=1))
+    dt = time.perf_counter() - t0
+
+    w = max(12, *(len(str(r["name"])) for r in results))
+    print(f"{'name':>{w}} {'seed':>4} | {'peak':>6} {'spawned':>8} | {'upd ms':>7} {'p95':>7} {'max':>7} | {'cov':>6} {'max':>6} | {'hits':>5}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['name']:>{w}} {r['seed']!s:>4} | ERROR {r['error']}")
+            continue
+        print(f"{r['name']:>{w}} {r['seed']!s:>4} | {r['peak']:6d} {r['spawned']:8d} | "
+              f"{r['upd_mean']:7.3f} {r['upd_p95']:7.3f} {r['upd_max']:7.3f} | "
+              f"{r['cov_mean']:6.1%} {r['cov_max']:6.1%} | {r['hits']:5d}")
+    print(f"{len(results)} runs in {dt:.1f}s with {args.workers} workers")
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            wr = csv.DictWriter(f, fieldnames=COLUMNS)
+            wr.writeheader()
+            for r in results:
+                wr.writerow({k: r.get(k, "") for k in COLUMNS})
+        print(f"saved -> {args.csv}")
+
+if __name__ == "__main__":
+    main()
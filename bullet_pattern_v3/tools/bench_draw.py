@@ -0,0 +1,51 @@
+# bench_draw.py
+# 弾の描画コストを「1発ずつ circ を呼ぶ従来の描き方」と
+# NumpyBulletSystem.draw（画素配列へ一括書き込み）で比べ、描かれた画素が一致するかも確かめる。
+# 画面の代わりに同じ大きさの pyxel.Image に描くのでウィンドウは不要。
+#
+#   python -m tools.bench_draw
+#   python -m tools.bench_draw --counts 1000 5000 20000 --frames 100
+
+import argparse
+import time
+import numpy as np
+import pyxel
+from core.bullet_np import NumpyBulletSystem, framebuffer
+
+W, H = 270, 150
+
+def draw_per_call(bs, img):
+    """従来の BulletSystem.draw と同じ1発1呼び出しの描画"""
+    idx = np.flatnonzero(bs.alive)
+    for x, y, c in zip(bs.x[idx].tolist(), bs.y[idx].tolist(), bs.c[idx].tolist()):
+        img.circ(x, y, 0, c)
+
+def bench(n, frames, seed=0):
+    rng = np.random.default_rng(seed)
+    bs = NumpyBulletSystem(W, H, capacity=n, max_capacity=n)
+    bs.spawn_many(rng.uniform(-4, W + 4, n), rng.uniform(-4, H + 4, n),
+                  np.zeros(n), 0.0, c=rng.integers(1, 16, n))
+    img = pyxel.Image(W, H)
+    res = {}
+    for name, fn in (("per-call", lambda: draw_per_call(bs, img)), ("bulk", lambda: bs.draw(img))):
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            img.cls(0)
+            fn()
+        res[name] = ((time.perf_counter() - t0) / frames * 1e3, framebuffer(img).copy())
+    same = np.array_equal(res["per-call"][1], res["bulk"][1])
+    return res["per-call"][0], res["bulk"][0], same
+
+def main():
+    ap = argparse.ArgumentParser(description="bullet draw cost: per-call circ vs framebuffer write")
+    ap.add_argument("--counts", type=int, nargs="+", default=[1000, 5000, 20000])
+    ap.add_argument("--frames", type=int, default=60)
+    args = ap.parse_args()
+
+    print(f"{'bullets':>8} {'per-call ms':>12} {'bulk ms':>8} {'speedup':>8} {'same pixels':>12}")
+    for n in args.counts:
+        loop_ms, bulk_ms, same = bench(n, args.frames)
+        print(f"{n:>8} {loop_ms:>12.3f} {bulk_ms:>8.3f} {loop_ms/bulk_ms:>7.1f}x {str(same):>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# bench_gravity.py
+# 重力弾の更新を BulletSystem（1発ずつ）と NumpyBulletSystem（gravity_kernel 一括）で比べる。
+# 同じ初期条件から数フレーム進め、速度・位置の差が許容誤差に収まることも確かめる。
+#
+#   python -m tools.bench_gravity
+#   python -m tools.bench_gravity --counts 1000 10000 --frames 120
+
+import argparse
+import random
+import time
+import numpy as np
+from core.bullet import BulletSystem
+from core.bullet_np import NumpyBulletSystem
+from core.behavior import Gravity
+
+# 画面外で消えないよう十分広い領域で回す（当たり判定グリッドのセル数が膨らまない程度に）
+FIELD = 4000
+
+def _setup(cls, n, seed):
+    rng = random.Random(seed)
+    bs = cls(FIELD, FIELD, capacity=n, max_capacity=n)
+    behs = (Gravity(0.03, "attract", 2.2), Gravity(0.02, "repel", 2.5))
+    for k in range(n):
+        bs.spawn(rng.uniform(0, 200), rng.uniform(0, 150),
+                 rng.uniform(-1.5, 1.5), rng.uniform(-1.5, 1.5), behavior=behs[k % 2])
+    return bs
+
+def _state(bs):
+    if isinstance(bs, BulletSystem):
+        return np.array([(b.x, b.y, b.vx, b.vy) for b in bs.pool], dtype=np.float64)
+    return np.stack([bs.x, bs.y, bs.vx, bs.vy], axis=1).astype(np.float64)
+
+def bench(n, frames, seed=0):
+    ctx = {"player_pos": (100.0, 120.0)}
+    res = {}
+    for name, cls in (("python", BulletSystem), ("numpy", NumpyBulletSystem)):
+        bs = _setup(cls, n, seed)
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            bs.update(ctx)
+        res[name] = ((time.perf_counter() - t0) / frames * 1e3, _state(bs))
+    diff = np.abs(res["python"][1] - res["numpy"][1])
+    return res["python"][0], res["numpy"][0], diff[:, :2].max(), diff[:, 2:].max()
+
+def main():
+    ap = argparse.ArgumentParser(description="gravity kernel vs scalar update")
+    ap.add_argument("--counts", type=int, nargs="+", default=[500, 2000, 10000])
+    ap.add_argument("--frames", type=int, default=60)
+    ap.add_argument("--tol", type=float, default=1e-2, help="許容する位置・速度の最大差")
+    args = ap.parse_args()
+
+    print(f"{'bullets':>8} {'python ms':>10} {'numpy ms':>9} {'max|dpos|':>10} {'max|dvel|':>10}")
+    ok = True
+    for n in args.counts:
+        py_ms, np_ms, dpos, dvel = bench(n, args.frames)
+        print(f"{n:>8} {py_ms:>10.3f} {np_ms:>9.3f} {dpos:>10.2e} {dvel:>10.2e}")
+        ok &= dpos <= args.tol and dvel <= args.tol
+    if not ok:
+        raise SystemExit(f"gravity kernel diverged from scalar update (tol={args.tol})")
+
+if __name__ == "__main__":
+    main()
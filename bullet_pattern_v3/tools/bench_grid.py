@@ -0,0 +1,77 @@
+# bench_grid.py
+# UniformGrid の作り直しと半径問い合わせのコストを弾数別に測り、総当たりと比べる。
+# 弾の密度（8x8 px あたりの弾数）を一定に保つよう領域を弾数に合わせて広げるので、1回の問い合わせで拾う弾の数は
+# 弾数に依らずほぼ同じ。それでも問い合わせ1回には numpy 呼び出しの固定費（この環境で 20〜30 us）がかかり、
+# 弾数が増えると数割伸びる（キャッシュに乗らなくなる分）。総当たりは弾数に比例するので、
+# 数千発までは総当たりのほうが速く、グリッドが勝つのはおよそ 1〜2 万発から（最後に実測の分岐点を出す）。
+# セルを問い合わせ半径に近づけると、行ごとの区間が減って固定費が少し下がる（--cell で試す）。
+#
+#   python -m tools.bench_grid
+#   python -m tools.bench_grid --counts 1000 100000 --density 0.5 --radius 18
+#   python -m tools.bench_grid --cell 16
+
+import argparse
+import math
+import time
+import numpy as np
+from core.spatial import UniformGrid
+
+def best_us(fn, items, repeat):
+    """items の各要素で fn を呼ぶのを repeat 回測り、1回あたりの最小の µs"""
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        for it in items:
+            fn(*it)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(items) * 1e6
+
+def bench(n, density, radius, cell, queries=2000, repeat=3, seed=0):
+    rng = np.random.default_rng(seed)
+    # 8x8 px あたり density 発になる正方形の領域（セルの大きさとは独立）
+    side = math.sqrt(n / density) * 8
+    x = rng.uniform(0, side, n).astype(np.float32)
+    y = rng.uniform(0, side, n).astype(np.float32)
+    r = np.ones(n, dtype=np.float32)
+    idx = np.arange(n)
+    grid = UniformGrid(side, side, cell=cell)
+
+    t0 = time.perf_counter()
+    grid.rebuild(idx, x, y, r)
+    build_ms = (time.perf_counter() - t0) * 1e3
+
+    qs = rng.uniform(0, side, (queries, 2)).tolist()
+    found = sum(grid.query(qx, qy, radius).size for qx, qy in qs)
+    grid_us = best_us(lambda qx, qy: grid.query(qx, qy, radius), qs, repeat)
+
+    # 総当たり（全弾との距離を毎回計算）は問い合わせ数を絞って測る
+    r2 = radius * radius
+    brute_us = best_us(lambda qx, qy: np.flatnonzero((x - qx)**2 + (y - qy)**2 <= r2), qs[:200], repeat)
+    return build_ms, grid_us, brute_us, found / queries
+
+def main():
+    ap = argparse.ArgumentParser(description="uniform grid query cost per bullet count")
+    ap.add_argument("--counts", type=int, nargs="+", default=[1000, 5000, 20000, 100000])
+    ap.add_argument("--density", type=float, default=0.5, help="8x8 px あたりの弾数")
+    ap.add_argument("--radius", type=float, default=18.0)
+    ap.add_argument("--cell", type=int, default=8, help="セルの一辺（UniformGrid の既定は 8）")
+    ap.add_argument("--repeat", type=int, default=3, help="この回数測って最小を採る")
+    args = ap.parse_args()
+
+    print(f"cell={args.cell} radius={args.radius} density={args.density}")
+    print(f"{'bullets':>8} {'rebuild ms':>11} {'grid us/q':>10} {'brute us/q':>11} {'grid/brute':>11} {'hits/q':>7}")
+    rows = []
+    for n in args.counts:
+        build_ms, grid_us, brute_us, hits = bench(n, args.density, args.radius, args.cell, repeat=args.repeat)
+        rows.append((n, grid_us, brute_us))
+        print(f"{n:>8} {build_ms:>11.3f} {grid_us:>10.2f} {brute_us:>11.2f} {grid_us / brute_us:>10.2f}x {hits:>7.1f}")
+    (n0, g0, _), (n1, g1, _) = rows[0], rows[-1]
+    print(f"grid query cost {g0:.1f} -> {g1:.1f} us ({(g1 / g0 - 1) * 100:+.0f}%) from {n0} to {n1} bullets")
+    wins = [n for n, g, b in rows if g < b]
+    if wins:
+        print(f"grid beats brute force from {wins[0]} bullets (per query, not counting the rebuild)")
+    else:
+        print("brute force was faster at every count measured")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# bench_make.py
+# PatternFactory.make の1回あたりの時間を、パターンごとに
+# 「検証済みの定義から毎回作る（プロトタイプを作るのと同じ処理）」と「プロトタイプの clone（今の make）」で比べる。
+# 最初に定義全部の検証とプロトタイプ作り（PatternFactory の生成）にかかる時間も出す。
+#
+#   python -m tools.bench_make
+#   python -m tools.bench_make --number 20000 --repeat 5
+#   python -m tools.bench_make --patterns spinner rolling_fire_1943 --classes
+
+import argparse
+import json
+import time
+from core.paths import PATTERNS_PATH
+from core.patterns import PatternFactory
+
+def per_call_us(fn, number, repeat):
+    """fn を number 回呼ぶのを repeat 回測り、1回あたりの最小の µs"""
+    best = float("inf")
+    clock = time.perf_counter
+    for _ in range(max(1, repeat)):
+        t0 = clock()
+        for _ in range(number):
+            fn()
+        best = min(best, clock() - t0)
+    return best / number * 1e6
+
+def main():
+    ap = argparse.ArgumentParser(description="PatternFactory.make throughput (build from config vs clone of prototype)")
+    ap.add_argument("--number", type=int, default=5000, help="1回の計測で make する回数")
+    ap.add_argument("--repeat", type=int, default=3, help="この回数測って最小を採る")
+    ap.add_argument("--patterns", nargs="+", help="測るパターン（省略時は全部）")
+    ap.add_argument("--classes", action="store_true", help="命令列にせず従来のクラスで作る（use_vm=False）")
+    args = ap.parse_args()
+
+    with open(PATTERNS_PATH, "r", encoding="utf-8") as f:
+        patterns = json.load(f)["patterns"]
+    names = args.patterns or list(patterns)
+    unknown = [p for p in names if p not in patterns]
+    if unknown:
+        ap.error(f"unknown pattern(s): {', '.join(unknown)}")
+
+    use_vm = not args.classes
+    t0 = time.perf_counter()
+    factory = PatternFactory(patterns, use_vm=use_vm)
+    load_ms = (time.perf_counter() - t0) * 1e3
+    print(f"{len(patterns)} patterns validated and prototyped in {load_ms:.2f} ms (use_vm={use_vm})")
+    print(f"{'pattern':<26} {'type':<16} | {'build us':>9} | {'make us':>8} | {'speedup':>7} | {'makes/s':>9}")
+    total_b = total_m = 0.0
+    for name in names:
+        cfg = factory.configs[name]
+        factory.make(name)   # BulletML はここで読み込む
+        build = per_call_us(lambda: factory._build(cfg), args.number, args.repeat)
+        make = per_call_us(lambda: factory.make(name), args.number, args.repeat)
+        total_b += build
+        total_m += make
+        print(f"{name:<26} {cfg.type:<16} | {build:9.2f} | {make:8.2f} | {build / make:6.1f}x | {1e6 / make:9.0f}")
+    n = len(names)
+    print(f"{'mean':<26} {'':<16} | {total_b / n:9.2f} | {total_m / n:8.2f} | {total_b / total_m:6.1f}x | {1e6 * n / total_m:9.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# bench_patterns.py
+# data/patterns_demo.json の各パターンを1つずつ Emitter に載せてヘッドレスで回し、
+# update / draw の1フレーム時間（p50/p95/p99）・最大同時弾数・毎秒の spawn 数をパターンごとに出す。
+# --save で結果を JSON のベースラインに保存し、--compare で前回のベースラインと比べて遅くなったものを示す。
+# 描画は画面と同じ大きさの pyxel.Image へ行うのでウィンドウは不要。
+#
+#   python -m tools.bench_patterns
+#   python -m tools.bench_patterns --frames 1200 --repeat 5 --save bench_base.json
+#   python -m tools.bench_patterns --compare bench_base.json --tolerance 0.25
+#   python -m tools.bench_patterns --patterns spinner gravity_repel_ring --backend python
+
+import argparse
+import json
+import platform
+import sys
+import time
+import numpy as np
+from core.world import World
+from core.paths import PATTERNS_PATH
+from core.input import NullInput
+from core.render import offscreen
+
+GAME_W, GAME_H, PANEL_W = 200, 150, 70
+FPS = 60
+
+# 比較する時間指標（ms）。どれかが許容幅を超えて遅くなったら回帰とみなす
+TIME_KEYS = ("update_p50", "update_p95", "update_p99", "draw_p50", "draw_p95", "draw_p99")
+
+def run_pattern(name, frames, backend):
+    """パターン name を先頭の敵に載せて frames フレーム回し、計測結果の dict を返す"""
+    img = offscreen(GAME_W + PANEL_W, GAME_H)
+    world = World(GAME_W, GAME_H, panel_w=PANEL_W, bullet_backend=backend, inp=NullInput(), gfx=img)
+    world.enemies[0].emitter.set_pattern(name)
+    upd = np.empty(frames)
+    drw = np.empty(frames)
+    clock = time.perf_counter
+    for k in range(frames):
+        t0 = clock()
+        world.update()
+        t1 = clock()
+        img.cls(1)
+        t2 = clock()
+        world.draw()
+        t3 = clock()
+        upd[k] = t1 - t0
+        drw[k] = t3 - t2
+    stats = world.bullets.stats
+    res = {"peak_bullets": stats.high_water, "spawns_per_sec": stats.spawned * FPS / frames}
+    for key, arr in (("update", upd), ("draw", drw)):
+        p50, p95, p99 = np.percentile(arr * 1e3, (50, 95, 99))
+        res[f"{key}_p50"], res[f"{key}_p95"], res[f"{key}_p99"] = float(p50), float(p95), float(p99)
+    return res
+
+def best_of(name, frames, backend, repeat):
+    """repeat 回測って、時間指標は回ごとの最小を採る（弾数は決定的なので1回目の値）"""
+    best = run_pattern(name, frames, backend)
+    for _ in range(repeat - 1):
+        r = run_pattern(name, frames, backend)
+        for key in TIME_KEYS:
+            best[key] = min(best[key], r[key])
+    return best
+
+def compare(results, base, tolerance, floor_ms):
+    """ベースラインより (1 + tolerance) 倍かつ floor_ms 以上遅くなった指標を (名前, 指標, 前, 今) で返す"""
+    slow = []
+    for name, res in results.items():
+        old = base.get(name)
+        if old is None:
+            continue
+        for key in TIME_KEYS:
+            if key not in old:
+                continue
+            if res[key] > old[key] * (1 + tolerance) and res[key] - old[key] > floor_ms:
+                slow.append((name, key, old[key], res[key]))
+    return slow
+
+def main():
+    ap = argparse.ArgumentParser(description="per-pattern frame time (update/draw percentiles, peak bullets, spawns/sec)")
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--repeat", type=int, default=3, help="各パターンをこの回数測って最小を採る")
+    ap.add_argument("--backend", default="numpy", choices=["python", "numpy"])
+    ap.add_argument("--patterns", nargs="*", help="対象パターン（省略時は全部）")
+    ap.add_argument("--save", metavar="PATH", help="結果をベースライン JSON として保存")
+    ap.add_argument("--compare", metavar="PATH", help="このベースラインより遅くなったパターンを示す")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="遅くなったとみなす比率（0.25 = 25%%）")
+    ap.add_argument("--floor-ms", type=float, default=0.05, help="これ未満の差はノイズとして無視（ms）")
+    args = ap.parse_args()
+
+    with open(PATTERNS_PATH, "r", encoding="utf-8") as f:
+        names = list(json.load(f)["patterns"].keys())
+    if args.patterns:
+        unknown = [n for n in args.patterns if n not in names]
+        if unknown:
+            ap.error(f"unknown pattern(s): {', '.join(unknown)}")
+        names = args.patterns
+
+    print(f"backend={args.backend} frames={args.frames} repeat={args.repeat}  (times in ms, best of repeat)")
+    print(f"{'pattern':>24} | {'upd p50':>8} {'p95':>8} {'p99':>8} | {'draw p50':>8} {'p95':>8} {'p99':>8} | {'peak':>6} {'spawn/s':>8}")
+    results = {}
+    for name in names:
+        r = results[name] = best_of(name, args.frames, args.backend, max(1, args.repeat))
+        print(f"{name:>24} | {r['update_p50']:8.3f} {r['update_p95']:8.3f} {r['update_p99']:8.3f} | "
+              f"{r['draw_p50']:8.3f} {r['draw_p95']:8.3f} {r['draw_p99']:8.3f} | "
+              f"{r['peak_bullets']:6d} {r['spawns_per_sec']:8.1f}")
+
+    if args.save:
+        doc = {
+            "meta": {
+                "backend": args.backend,
+                "frames": args.frames,
+                "repeat": args.repeat,
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+            },
+            "patterns": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+        print(f"saved baseline -> {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        meta = base.get("meta", {})
+        if meta.get("backend") != args.backend or meta.get("frames") != args.frames:
+            print(f"note: baseline was backend={meta.get('backend')} frames={meta.get('frames')}")
+        old = base["patterns"]
+        # 弾数は決定的なので、変わっていればパターンの挙動が変わっている
+        for name, r in results.items():
+            o = old.get(name)
+            if o is not None and o.get("peak_bullets") != r["peak_bullets"]:
+                print(f"changed: {name} peak_bullets {o.get('peak_bullets')} -> {r['peak_bullets']}")
+        slow = compare(results, old, args.tolerance, args.floor_ms)
+        for name, key, before, now in slow:
+            print(f"REGRESSION: {name} {key} {before:.3f} -> {now:.3f} ms (+{(now / before - 1) * 100 if before else float('inf'):.0f}%)")
+        if slow:
+            sys.exit(1)
+        print(f"no regressions vs {args.compare} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# bench_ring.py
+# 360発リング1回分の発射コストを「1発ずつ spawn（従来の Circular）」と
+# 「spawn_many でまとめて（現在の Circular）」で比べる。
+#
+#   python -m tools.bench_ring
+#   python -m tools.bench_ring --count 360 --volleys 500
+
+import argparse
+import math
+import time
+from core.bullet import BulletSystem
+from core.bullet_np import NumpyBulletSystem
+from core.patterns import Circular, deg2rad
+
+BACKENDS = {"python": BulletSystem, "numpy": NumpyBulletSystem}
+
+class _Em:
+    def __init__(self, bullets):
+        self.x, self.y = 135.0, 75.0
+        self.bullets = bullets
+
+def fire_loop(em, count, speed):
+    """従来の Circular.update_and_fire と同じ1発ずつの発射"""
+    step = 360 / count
+    for i in range(count):
+        a = deg2rad(i * step)
+        em.bullets.spawn(em.x, em.y, math.cos(a)*speed, math.sin(a)*speed, r=1, c=10)
+
+def bench(cls, count, volleys, batched):
+    bs = cls(270, 150, capacity=count, max_capacity=count)
+    em = _Em(bs)
+    pat = Circular(1.8, count, 360, cooldown=0)
+    spent = 0.0
+    for _ in range(volleys):
+        t0 = time.perf_counter()
+        if batched:
+            pat.update_and_fire(em, None)
+        else:
+            fire_loop(em, count, 1.8)
+        spent += time.perf_counter() - t0
+        bs.clear_all()   # 計測外: 次の1回のためにプールを空ける
+    return spent / volleys * 1e6   # us / volley
+
+def main():
+    ap = argparse.ArgumentParser(description="ring volley cost: spawn loop vs spawn_many")
+    ap.add_argument("--count", type=int, default=360)
+    ap.add_argument("--volleys", type=int, default=300)
+    args = ap.parse_args()
+
+    print(f"{args.count}-bullet ring, us/volley")
+    print(f"{'backend':<8} {'spawn loop':>11} {'spawn_many':>11} {'speedup':>8}")
+    for name, cls in BACKENDS.items():
+        before = bench(cls, args.count, args.volleys, batched=False)
+        after = bench(cls, args.count, args.volleys, batched=True)
+        print(f"{name:<8} {before:>11.1f} {after:>11.1f} {before/after:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# bench_spawn.py
+# BulletSystem.spawn の1発あたりコストを容量別に測る。
+# プールを 90% 埋めた状態で「寿命1フレームの弾を撃つ → update で回収」を繰り返し、
+# spawn にかかった時間だけを集計する（空き探索が O(1) なら容量に依らずほぼ一定になる）。
+#
+#   python -m tools.bench_spawn
+#   python -m tools.bench_spawn --capacities 512 4096 100000 --rounds 50
+
+import argparse
+import time
+from core.bullet import BulletSystem
+from core.bullet_np import NumpyBulletSystem
+
+BACKENDS = {"python": BulletSystem, "numpy": NumpyBulletSystem}
+DEFAULT_CAPACITIES = [512, 2048, 8192, 32768, 100000]
+
+def bench_spawn(cls, capacity, batch=256, rounds=20, fill=0.9):
+    bs = cls(270, 150, capacity=capacity, max_capacity=capacity)
+    # 居座り続ける弾でプールを埋める（速度0・寿命無制限）
+    for _ in range(min(int(capacity * fill), capacity - batch)):
+        bs.spawn(100.0, 75.0, 0.0, 0.0)
+    spent = 0.0
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for _ in range(batch):
+            bs.spawn(100.0, 75.0, 0.0, 0.0, life=1)
+        spent += time.perf_counter() - t0
+        bs.update()   # 寿命切れで回収（計測外）
+    return spent / (batch * rounds) * 1e6   # us / spawn
+
+def main():
+    ap = argparse.ArgumentParser(description="spawn cost per capacity")
+    ap.add_argument("--capacities", type=int, nargs="+", default=DEFAULT_CAPACITIES)
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    ap.add_argument("--batch", type=int, default=256)
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+
+    print(f"{'backend':<8} {'capacity':>9} {'us/spawn':>10}")
+    for name in args.backends:
+        for cap in args.capacities:
+            us = bench_spawn(BACKENDS[name], cap, batch=args.batch, rounds=args.rounds)
+            print(f"{name:<8} {cap:>9} {us:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# bench_vm.py
+# 発射元の数を増やしながら、パターンを進める処理の1フレーム時間を
+# 「従来のクラスを Emitter ごとに update_and_fire」と「PatternVM.step で全部まとめて」で比べる。
+# 弾は数えるだけの弾システムに撃つので、弾の移動・描画の時間は入らない（--backend で実物に撃つ）。
+#
+#   python -m tools.bench_vm
+#   python -m tools.bench_vm --emitters 1 10 50 200 --frames 600 --repeat 5
+#   python -m tools.bench_vm --patterns spinner circular_16 --backend numpy
+
+import argparse
+import json
+import time
+import numpy as np
+from core.emitter import Emitter
+from core.paths import PATTERNS_PATH
+from core.patterns import PatternFactory
+from core.vm import PatternVM
+from core.world import BULLET_BACKENDS
+
+GAME_W, GAME_H = 270, 150
+DEFAULT_PATTERNS = ("circular_16", "spinner", "aimed_5way_slow", "aimed_burst")
+
+class CountSink:
+    """spawn / spawn_many の弾数を数えるだけの弾システム"""
+    def __init__(self):
+        self.n = 0
+
+    def spawn(self, *args, **kw):
+        self.n += 1
+
+    def spawn_many(self, x, y, vx, vy, **kw):
+        self.n += np.size(vx)
+
+    def update(self, ctx=None):
+        pass
+
+    def clear_all(self):
+        pass
+
+def run(patterns, names, n, frames, use_vm, backend):
+    """n 個の発射元に names を順に割り当てて frames フレーム回し、(1フレームの ms の列, 弾数) を返す"""
+    bullets = CountSink() if backend is None else BULLET_BACKENDS[backend](GAME_W, GAME_H)
+    factory = PatternFactory(patterns, use_vm=use_vm)
+    vm = PatternVM(bullets) if use_vm else None
+    rng = np.random.default_rng(0)
+    ems = []
+    for k in range(n):
+        em = Emitter(float(rng.uniform(10, GAME_W - 10)), float(rng.uniform(10, 60)), bullets, patterns,
+                     factory=factory, vm=vm)
+        em.set_pattern(names[k % len(names)])
+        ems.append(em)
+    ctx = {"player_pos": (GAME_W / 2, GAME_H - 20)}
+    ms = np.empty(frames)
+    clock = time.perf_counter
+    for f in range(frames):
+        t0 = clock()
+        for em in ems:
+            em.update(ctx)
+        if vm is not None:
+            vm.step(ctx)
+        ms[f] = clock() - t0
+        bullets.update(ctx)
+    spawned = bullets.n if backend is None else bullets.stats.spawned
+    return ms * 1e3, spawned
+
+def main():
+    ap = argparse.ArgumentParser(description="pattern stepping cost vs number of emitters (classes vs PatternVM)")
+    ap.add_argument("--emitters", nargs="+", type=int, default=[1, 10, 50, 200])
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--repeat", type=int, default=3, help="この回数測って1フレームの平均が最小の回を採る")
+    ap.add_argument("--patterns", nargs="+", default=list(DEFAULT_PATTERNS), help="発射元に順に割り当てるパターン")
+    ap.add_argument("--backend", choices=["python", "numpy"], help="弾を実際のバックエンドに撃つ（省略時は数えるだけ）")
+    args = ap.parse_args()
+
+    with open(PATTERNS_PATH, "r", encoding="utf-8") as f:
+        patterns = json.load(f)["patterns"]
+    unknown = [p for p in args.patterns if p not in patterns]
+    if unknown:
+        ap.error(f"unknown pattern(s): {', '.join(unknown)}")
+
+    print(f"patterns={','.join(args.patterns)} frames={args.frames} bullets={args.backend or 'count only'}")
+    print(f"{'emitters':>8} | {'class ms':>9} {'us/em':>7} | {'vm ms':>9} {'us/em':>7} | {'speedup':>7} | {'bullets':>8}")
+    for n in args.emitters:
+        best = {}
+        for use_vm in (False, True):
+            for _ in range(max(1, args.repeat)):
+                ms, spawned = run(patterns, args.patterns, n, args.frames, use_vm, args.backend)
+                best[use_vm] = min(best.get(use_vm, (np.inf, 0)), (float(np.mean(ms)), spawned))
+        (ca, na), (cb, nb) = best[False], best[True]
+        if na != nb:
+            print(f"warning: {n} emitters spawned {na} (class) vs {nb} (vm)")
+        print(f"{n:8d} | {ca:9.4f} {ca * 1e3 / n:7.2f} | {cb:9.4f} {cb * 1e3 / n:7.2f} | "
+              f"{ca / cb:6.1f}x | {nb:8d}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# replay.py
+# main.py --record で記録した入力をヘッドレス・待ちなしで再生する。
+# 既定では記録時のバックエンドで回し、処理時間の重かったフレームをフェーズ別に示す（スパイクの再現用）。
+# --check を付けると複数のバックエンドを同じ入力で並べて回し、弾の状態が毎フレーム一致するか確かめる。
+#
+#   python -m tools.replay play.bprc
+#   python -m tools.replay play.bprc --backend python --top 10
+#   python -m tools.replay play.bprc --check python numpy --atol 1e-3 --rtol 1e-5
+
+import argparse
+import sys
+import time
+import numpy as np
+from core.record import Recording, data_digest, replay_world
+
+def run(rec, backend, top):
+    world = replay_world(rec, backend)
+    prof = world.prof
+    frames = len(rec)
+    ms = np.empty((frames, len(prof.phases)), dtype=np.float32)
+    t0 = time.perf_counter()
+    for k in range(frames):
+        world.update()
+        ms[k] = prof.ms[prof.row]
+    dt = time.perf_counter() - t0
+    total = ms.sum(axis=1)
+    print(f"backend={backend} frames={frames} in {dt:.3f}s ({frames / dt:.0f} fps)  "
+          f"peak={world.bullets.stats.high_water} hits={world.player.hits}")
+    print(f"frame ms: p50={np.percentile(total, 50):.3f} p99={np.percentile(total, 99):.3f} max={total.max():.3f}")
+    print(f"{'frame':>7} {'total':>8}  worst phase")
+    for k in np.argsort(total)[::-1][:top].tolist():
+        j = int(ms[k].argmax())
+        print(f"{k:7d} {total[k]:8.3f}  {prof.phases[j]} {ms[k, j]:.3f}")
+
+def unmatched(a, b, atol, rtol):
+    """
+    a と b の行（x, y, vx, vy, c）を、全部の列の差が atol + rtol * |a の値| 以内のものどうしで1対1に組む。
+    組めなかった a の行と b の行を返す（x で並べて、x がその範囲にある候補だけ調べる）
+    """
+    b = b[np.argsort(b[:, 0], kind="stable")]
+    bx = b[:, 0]
+    tol = atol + rtol * np.abs(a)
+    lo = np.searchsorted(bx, a[:, 0] - tol[:, 0], side="left").tolist()
+    hi = np.searchsorted(bx, a[:, 0] + tol[:, 0], side="right").tolist()
+    used = np.zeros(len(b), dtype=np.bool_)
+    miss = []
+    for i in range(len(a)):
+        for j in range(lo[i], hi[i]):
+            if not used[j] and (np.abs(b[j] - a[i]) <= tol[i]).all():
+                used[j] = True
+                break
+        else:
+            miss.append(i)
+    return a[miss], b[~used]
+
+def on_edge(rows, w, h, atol, rtol):
+    """rows がどれも画面外で消す境目（上下左右 4 の外側）から許容差以内にあるか"""
+    x, y = rows[:, 0], rows[:, 1]
+    def near_to(v, edge):
+        return np.abs(v - edge) <= atol + rtol * abs(edge)
+    near = near_to(x, -4) | near_to(x, w + 4) | near_to(y, -4) | near_to(y, h + 4)
+    return bool(near.all())
+
+def check(rec, backends, atol, every, rtol=0.0):
+    """
+    同じ入力で backends を並べて回し、弾の状態が食い違ったフレーム数を返す。
+    許容差（atol + rtol * |値|）が 0 なら snapshot の行どうしを完全一致で比べる。そうでなければ丸め差で
+    並び順が入れ替わりうるので、まず列（x, y, vx, vy, c）ごとに並べ替えた値どうしを比べ、合わなければ
+    行どうしを許容差以内で組む。組めずに余った弾がどれも画面外の境目から許容差以内なら
+    （丸め差で片方だけ消えるのが1フレームずれただけなので）食い違いに数えない
+    """
+    worlds = [replay_world(rec, b) for b in backends]
+    ref_name = backends[0]
+    bad = 0
+    for k in range(len(rec)):
+        for w in worlds:
+            w.update()
+        if k % every:
+            continue
+        ref = worlds[0].bullets.snapshot()
+        for name, w in zip(backends[1:], worlds[1:]):
+            s = w.bullets.snapshot()
+            if not (atol or rtol):
+                if s.shape != ref.shape:
+                    why = f"live {ref.shape[0]} vs {s.shape[0]}"
+                elif s.size and np.abs(s - ref).max() > 0:
+                    why = f"max diff {np.abs(s - ref).max():.2e}"
+                else:
+                    continue
+            else:
+                if s.shape == ref.shape:
+                    r = np.sort(ref, axis=0)
+                    if (np.abs(np.sort(s, axis=0) - r) <= atol + rtol * np.abs(r)).all():
+                        continue
+                ra, sa = unmatched(ref, s, atol, rtol)
+                if on_edge(np.concatenate([ra, sa]), w.bullets.w, w.bullets.h, atol, rtol):
+                    continue
+                why = f"live {ref.shape[0]} vs {s.shape[0]}, unmatched {len(ra)} vs {len(sa)}"
+            if not bad:
+                print(f"first divergence at frame {k}: {ref_name} vs {name}: {why}")
+            bad += 1
+    print(f"{len(rec)} frames, {bad} divergent checks ({' / '.join(backends)}, atol={atol}, rtol={rtol})")
+    return bad
+
+def main():
+    ap = argparse.ArgumentParser(description="headless replay of a recorded input file")
+    ap.add_argument("path")
+    ap.add_argument("--backend", choices=["python", "numpy"], help="記録時と違うバックエンドで回す")
+    ap.add_argument("--top", type=int, default=5, help="重かったフレームをいくつ示すか")
+    ap.add_argument("--check", nargs="+", choices=["python", "numpy"], metavar="BACKEND",
+                    help="並べて回し、弾の状態の一致を確かめるバックエンド（1つなら記録時のものと比べる）")
+    ap.add_argument("--atol", type=float, default=0.0, help="座標・速度の許容差（float32 と float64 の比較なら 1e-3 程度）")
+    ap.add_argument("--rtol", type=float, default=0.0,
+                    help="値の大きさに比例する許容差（float32 で積み足した座標は画面端で 1e-3 を超えてずれるので 1e-5 程度）")
+    ap.add_argument("--every", type=int, default=1, help="このフレームおきに比べる")
+    args = ap.parse_args()
+
+    rec = Recording.load(args.path)
+    if rec.data and rec.data != data_digest(rec.data.keys()):
+        print("warning: data files differ from the recording; replay may not match")
+    print(f"{args.path}: {len(rec)} frames, {len(rec.picks)} pattern picks, world={rec.world}")
+
+    if args.check:
+        backends = args.check
+        if len(backends) == 1:
+            backends = [rec.world.get("bullet_backend", "numpy")] + backends
+        if check(rec, backends, args.atol, max(1, args.every), args.rtol):
+            sys.exit(1)
+    else:
+        run(rec, args.backend or rec.world.get("bullet_backend", "numpy"), args.top)
+
+if __name__ == "__main__":
+    main()